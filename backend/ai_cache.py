@@ -0,0 +1,157 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import hashlib
+import json
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from config import Config
+from extensions import db
+from models import AICacheEntry
+
+
+class AICache:
+    """
+    Two-tier cache for LLM results: an in-process LRU in front of the
+    ai_cache table, so repeated generations survive restarts.
+    """
+
+    def __init__(self, namespace, memory_entries=None, max_rows=None, ttl_seconds=None):
+        self.namespace = namespace
+        self.enabled = Config.AI_CACHE_ENABLED
+        self.memory_entries = memory_entries or Config.AI_CACHE_MEMORY_ENTRIES
+        self.max_rows = max_rows or Config.AI_CACHE_MAX_ROWS
+        self.ttl = timedelta(seconds=ttl_seconds or Config.AI_CACHE_TTL_SECONDS)
+
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def make_key(self, **parts):
+        raw = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(f"{self.namespace}:{raw}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry[1]
+            if entry:
+                del self._memory[key]
+
+        value = self._db_get(key, now)
+        if value is None:
+            self._count("misses")
+            return None
+
+        self._count("db_hits")
+        self._remember(key, value, now + self.ttl)
+        return value
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+
+        expires_at = datetime.utcnow() + self.ttl
+        self._remember(key, value, expires_at)
+        self._db_set(key, value, expires_at)
+        self._count("stores")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_size"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["db_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["db_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    # ------------------ internals ------------------
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _db_available(self):
+        return has_app_context() and "sqlalchemy" in current_app.extensions
+
+    def _db_get(self, key, now):
+        if not self._db_available():
+            return None
+        try:
+            with self._session() as session:
+                row = session.get(AICacheEntry, key)
+                if not row or row.namespace != self.namespace:
+                    return None
+                if row.expires_at <= now:
+                    session.delete(row)
+                    return None
+                row.hits = (row.hits or 0) + 1
+                row.last_hit_at = now
+                return json.loads(row.payload)
+        except SQLAlchemyError as e:
+            current_app.logger.warning("AI cache read failed: %s", e)
+            return None
+
+    def _db_set(self, key, value, expires_at):
+        if not self._db_available():
+            return
+        try:
+            with self._session() as session:
+                now = datetime.utcnow()
+                row = session.get(AICacheEntry, key)
+                if row is None:
+                    row = AICacheEntry(key=key, namespace=self.namespace)
+                    session.add(row)
+                row.payload = json.dumps(value)
+                row.created_at = now
+                row.last_hit_at = now
+                row.expires_at = expires_at
+                session.flush()
+                self._evict(session, now)
+        except SQLAlchemyError as e:
+            current_app.logger.warning("AI cache write failed: %s", e)
+
+    @contextmanager
+    def _session(self):
+        # A session of its own, committed on success: the bookkeeping must not
+        # commit (or roll back) whatever the caller has pending in db.session
+        with Session(db.engine) as session, session.begin():
+            yield session
+
+    def _evict(self, session, now):
+        evicted = session.query(AICacheEntry).filter(AICacheEntry.expires_at <= now).delete(synchronize_session=False)
+
+        overflow = session.query(AICacheEntry).filter_by(namespace=self.namespace).count() - self.max_rows
+        if overflow > 0:
+            stale_keys = [
+                k for (k,) in session.query(AICacheEntry.key)
+                .filter_by(namespace=self.namespace)
+                .order_by(AICacheEntry.last_hit_at.asc())
+                .limit(overflow)
+            ]
+            evicted += (session.query(AICacheEntry).filter(AICacheEntry.key.in_(stale_keys))
+                        .delete(synchronize_session=False))
+
+        if evicted:
+            self._count("evictions", evicted)
+
+
+def normalize_place(value):
+    return " ".join((value or "").split()).lower()
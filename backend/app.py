@@ -1,27 +1,76 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import bcrypt
-from datetime import datetime
+import base64
+import hashlib
+from datetime import datetime, timedelta
 import json
 import os
+import time
+import uuid
 from dotenv import load_dotenv
-from groq import Groq
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.orm import defer, selectinload
 
 from extensions import db
+from database import configure as configure_database
 from config import Config
-from models import User, Trip
+from models import User, Trip, Destination, Job, ChatSession, version_tag
+from ai_cache import AICache, normalize_place
+from model_router import router, policy_version
+from plan_chunks import generate_in_chunks, should_chunk
+from singleflight import ai_calls
+from insights import get_destination_insights, travel_month, insights_store
+from inspiration import inspiration_feed, add_images
+from json_patch import apply_patch, PatchError
+from passwords import hash_password, check_password, check_unknown_email, needs_rehash, unknown_emails, HashingBusy
+from city_index import city_index
+from trip_search import trip_search
+from budget import budget_analytics
+from chat_sessions import add_message, build_context, max_message_chars
+from shared_trips import shared_trips
+from jobs import job_queue, QueueFull
+from http_cache import conditional, matches_if_match, with_validators
+from json_column import encode_json
+from metrics import metrics
+from rate_limit import rate_limiter, HEADERS as RATE_LIMIT_HEADERS
+from structured_output import create_json, parse_json, ITINERARY_SCHEMA
+from streaming import sse, iter_deltas, wants_stream, DayStreamParser
 
 load_dotenv()
 
 app = Flask(__name__)
 app.config.from_object(Config)
-CORS(app)
+CORS(app, expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"] + RATE_LIMIT_HEADERS)
 
 # Initialize extensions
+configure_database(app)
 db.init_app(app)
 
+job_queue.init_app(app)
+inspiration_feed.init_app(app)
+trip_search.init_app(app)
+job_queue.register("ai-plan", "/api/generate-ai-plan")
+job_queue.register("trip-insights", "/api/trip-insights")
+job_queue.register("inspiration", "/api/inspiration", method="GET")
+
+AI_PLAN_PROMPT_VERSION = 1
+ai_plan_cache = AICache("ai_plan")
+
+metrics.init_app(app)
+rate_limiter.init_app(app)
+rate_limiter.expensive("/api/chat")
+rate_limiter.expensive("/api/generate-ai-plan")
+rate_limiter.expensive("/api/trip-insights")
+rate_limiter.expensive("/api/jobs")
+
 # ------------------ USER AUTHENTICATION ------------------
 
+@app.errorhandler(HashingBusy)
+def hashing_busy(e):
+    response = jsonify({"error": "Server is busy, please try again"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
 @app.route("/api/register", methods=["POST"])
 def register():
     data = request.json
@@ -34,8 +83,7 @@ def register():
     if User.query.filter_by(email=data["email"]).first():
         return jsonify({"error": "User already exists"}), 409
     
-    password_bytes = data["password"].encode("utf-8")
-    hashed_password = bcrypt.hashpw(password_bytes, bcrypt.gensalt())
+    hashed_password = hash_password(data["password"])
     
     new_user = User(
         first_name=data["first_name"],
@@ -46,16 +94,17 @@ def register():
         country=data.get("country", ""),
         profile_photo=data.get("profile_photo", ""),
         password=hashed_password,
-        preferences=json.dumps({
+        preferences={
             "currency": "USD",
             "language": "en",
             "privacy": "public"
-        }),
-        saved_destinations=json.dumps([])
+        },
+        saved_destinations=[]
     )
     
     db.session.add(new_user)
     db.session.commit()
+    unknown_emails.discard(new_user.email)
     
     return jsonify({
         "message": "User registered successfully",
@@ -72,11 +121,15 @@ def login():
     user = User.query.filter_by(email=data["email"]).first()
     
     if not user:
+        if data["email"] not in unknown_emails:
+            check_unknown_email(data["password"])
+            unknown_emails.add(data["email"])
         return jsonify({"error": "Invalid email or password"}), 401
     
-    password_bytes = data["password"].encode("utf-8")
-    
-    if bcrypt.checkpw(password_bytes, user.password):
+    if check_password(data["password"], user.password):
+        if needs_rehash(user.password):
+            user.password = hash_password(data["password"])
+            db.session.commit()
         return jsonify({
             "message": "Login successful",
             "user": {
@@ -95,14 +148,23 @@ def login():
 @app.route("/api/user/<user_id>", methods=["GET"])
 def get_user(user_id):
     try:
-        user = User.query.get(int(user_id))
-        if not user:
-            return jsonify({"error": "User not found"}), 404
-        
-        return jsonify(user.to_dict()), 200
+        user_id = int(user_id)
     except ValueError:
         return jsonify({"error": "Invalid user ID"}), 400
 
+    version = db.session.query(User.updated_at, User.created_at).filter_by(id=user_id).first()
+    if not version:
+        return jsonify({"error": "User not found"}), 404
+    updated_at = version.updated_at or version.created_at
+    cached = conditional(version_tag(user_id, updated_at), updated_at)
+    if cached:
+        return cached
+
+    user = db.session.get(User, user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    return with_validators(jsonify(user.to_dict()), user.etag, user.updated_at or user.created_at), 200
+
 @app.route("/api/user/<user_id>", methods=["PUT"])
 def update_user(user_id):
     try:
@@ -117,7 +179,7 @@ def update_user(user_id):
                 setattr(user, field, data[field])
         
         if "preferences" in data:
-            user.preferences = json.dumps(data["preferences"])
+            user.preferences = data["preferences"]
             
         db.session.commit()
         return jsonify({"message": "Profile updated successfully"}), 200
@@ -144,14 +206,13 @@ def create_trip():
         start_date=data["start_date"],
         end_date=data["end_date"],
         cover_image=data.get("cover_image", ""),
-        destinations=json.dumps([]),
-        budget=json.dumps({
+        budget={
             "total": 0,
             "transport": 0,
             "stay": 0,
             "activities": 0,
             "food": 0
-        }),
+        },
         status="planning",
         visibility="private"
     )
@@ -164,24 +225,181 @@ def create_trip():
         "trip": new_trip.to_dict()
     }), 201
 
+def with_itinerary():
+    """Load destinations and their activities in two extra queries instead of one per row."""
+    return selectinload(Trip.destination_rows).selectinload(Destination.activities)
+
+def encode_trip_cursor(trip):
+    raw = f"{trip.created_at.isoformat()}|{trip.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_trip_cursor(cursor):
+    created_at, trip_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+    return datetime.fromisoformat(created_at), int(trip_id)
+
+def trips_response(trips, fields=None):
+    """JSON list with each trip's stored budget copied through instead of parsed and re-encoded."""
+    body = encode_json([trip.to_dict(fields, raw=True) for trip in trips])
+    return Response(body, mimetype="application/json")
+
 @app.route("/api/trips/user/<user_id>", methods=["GET"])
 def get_user_trips(user_id):
+    """
+    Optional query params:
+      limit, cursor      keyset pagination; the next cursor is sent in X-Next-Cursor
+      summary=1          card fields only (no destinations blob)
+      fields=a,b,c       explicit projection
+      status, visibility filters
+    """
+    try:
+        query = Trip.query.filter_by(user_id=int(user_id))
+    except ValueError:
+        return jsonify({"error": "Invalid user ID"}), 400
+
+    for column in ("status", "visibility"):
+        if request.args.get(column):
+            query = query.filter(getattr(Trip, column) == request.args[column])
+
+    # The listing changes only when a matching trip is added, removed or updated
+    count, last_updated, id_sum = query.with_entities(
+        func.count(Trip.id), func.max(Trip.updated_at), func.sum(Trip.id)
+    ).one()
+    list_version = hashlib.sha256(
+        f"{user_id}|{count}|{last_updated}|{id_sum}|{request.query_string.decode('latin-1')}".encode("utf-8")
+    ).hexdigest()[:32]
+    etag = f'"{list_version}"'
+    # ETag only: a deletion does not move max(updated_at), so If-Modified-Since can't be trusted here
+    cached = conditional(etag)
+    if cached:
+        return cached
+
+    fields = None
+    if request.args.get("fields"):
+        fields = [f.strip() for f in request.args["fields"].split(",") if f.strip()]
+    elif request.args.get("summary", "").lower() in ("1", "true"):
+        fields = Trip.SUMMARY_FIELDS
+    if fields is not None:
+        for column in ("destinations", "budget", "description"):
+            if column not in fields:
+                query = query.options(defer(getattr(Trip, column)))
+    if fields is None or "destinations" in fields:
+        query = query.options(with_itinerary())
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            created_at, trip_id = decode_trip_cursor(cursor)
+        except (ValueError, UnicodeDecodeError):
+            return jsonify({"error": "Invalid cursor"}), 400
+        query = query.filter(or_(
+            Trip.created_at < created_at,
+            and_(Trip.created_at == created_at, Trip.id < trip_id)
+        ))
+
+    query = query.order_by(Trip.created_at.desc(), Trip.id.desc())
+
+    limit = request.args.get("limit", type=int)
+    if limit is None and not cursor:
+        user_trips = query.all()
+        response = trips_response(user_trips, fields)
+        return with_validators(response, etag, last_updated), 200
+
+    limit = max(1, min(limit or 20, 100))
+    user_trips = query.limit(limit + 1).all()
+    response = trips_response(user_trips[:limit], fields)
+    if len(user_trips) > limit:
+        response.headers["X-Next-Cursor"] = encode_trip_cursor(user_trips[limit - 1])
+    return with_validators(response, etag, last_updated), 200
+
+@app.route("/api/trips/user/<user_id>/search", methods=["GET"])
+def search_user_trips(user_id):
+    """
+    Ranked full-text search over trip names, descriptions, places and
+    activities. Query params: q, limit, offset.
+    """
     try:
-        user_trips = Trip.query.filter_by(user_id=int(user_id)).order_by(Trip.created_at.desc()).all()
-        return jsonify([trip.to_dict() for trip in user_trips]), 200
+        user_id = int(user_id)
     except ValueError:
         return jsonify({"error": "Invalid user ID"}), 400
 
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+    offset = max(0, request.args.get("offset", 0, type=int))
+
+    hits = trip_search.search(user_id, query, limit=limit + 1, offset=offset)
+    trips = {trip.id: trip for trip in Trip.query
+             .options(defer(Trip.destinations))
+             .filter(Trip.id.in_([trip_id for trip_id, _, _ in hits[:limit]]))}
+
+    results = [
+        {"trip": trips[trip_id].to_dict(Trip.SUMMARY_FIELDS), "snippet": snippet, "score": score}
+        for trip_id, snippet, score in hits[:limit] if trip_id in trips
+    ]
+    return jsonify({
+        "query": query,
+        "results": results,
+        "next_offset": offset + limit if len(hits) > limit else None
+    }), 200
+
+@app.route("/api/trips/user/<user_id>/budget", methods=["GET"])
+def get_user_budget(user_id):
+    """Spend across a user's trips; optional from/to (YYYY-MM-DD) limit it to a date range."""
+    try:
+        query = Trip.query.filter_by(user_id=int(user_id))
+    except ValueError:
+        return jsonify({"error": "Invalid user ID"}), 400
+
+    date_from = request.args.get("from") or None
+    date_to = request.args.get("to") or None
+    for value in (date_from, date_to):
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                return jsonify({"error": "from and to must be YYYY-MM-DD"}), 400
+
+    # Only trips overlapping the range; dates are stored as ISO strings
+    if date_from:
+        query = query.filter(or_(Trip.end_date.is_(None), Trip.end_date >= date_from))
+    if date_to:
+        query = query.filter(or_(Trip.start_date.is_(None), Trip.start_date <= date_to))
+    if request.args.get("status"):
+        query = query.filter(Trip.status == request.args["status"])
+
+    trips = query.order_by(Trip.start_date, Trip.id).all()
+    return jsonify(budget_analytics.for_user(trips, date_from, date_to)), 200
+
 @app.route("/api/trips/<trip_id>", methods=["GET"])
 def get_trip(trip_id):
+    try:
+        trip_id = int(trip_id)
+    except ValueError:
+        return jsonify({"error": "Invalid trip ID"}), 400
+
+    # Check validators against one indexed column before loading the itinerary
+    updated_at = db.session.query(Trip.updated_at).filter_by(id=trip_id).first()
+    if not updated_at:
+        return jsonify({"error": "Trip not found"}), 404
+    cached = conditional(version_tag(trip_id, updated_at[0]), updated_at[0])
+    if cached:
+        return cached
+
+    trip = Trip.query.options(with_itinerary()).filter_by(id=trip_id).first()
+    if not trip:
+        return jsonify({"error": "Trip not found"}), 404
+    return with_validators(jsonify(trip.to_dict()), trip.etag, trip.updated_at), 200
+
+@app.route("/api/trips/<trip_id>/budget", methods=["GET"])
+def get_trip_budget(trip_id):
     try:
         trip = Trip.query.get(int(trip_id))
-        if not trip:
-            return jsonify({"error": "Trip not found"}), 404
-        
-        return jsonify(trip.to_dict()), 200
     except ValueError:
         return jsonify({"error": "Invalid trip ID"}), 400
+    if not trip:
+        return jsonify({"error": "Trip not found"}), 404
+    return jsonify(budget_analytics.for_trip(trip)), 200
 
 @app.route("/api/trips/<trip_id>", methods=["PUT"])
 def update_trip(trip_id):
@@ -197,9 +415,9 @@ def update_trip(trip_id):
                 setattr(trip, field, data[field])
         
         if "destinations" in data:
-            trip.destinations = json.dumps(data["destinations"])
+            trip.set_destinations(data["destinations"])
         if "budget" in data:
-            trip.budget = json.dumps(data["budget"])
+            trip.budget = data["budget"]
             
         db.session.commit()
         return jsonify({"message": "Trip updated successfully"}), 200
@@ -208,6 +426,71 @@ def update_trip(trip_id):
     except Exception as e:
         return jsonify({"error": f"Failed to update trip: {str(e)}"}), 400
 
+PATCHABLE_SCALAR_FIELDS = ["name", "description", "start_date", "end_date", "cover_image", "status", "visibility"]
+PATCHABLE_TRIP_FIELDS = PATCHABLE_SCALAR_FIELDS + ["destinations", "budget"]
+
+@app.route("/api/trips/<trip_id>", methods=["PATCH"])
+def patch_trip(trip_id):
+    """
+    Apply RFC 6902 operations (e.g. add /destinations/0/activities/-)
+    server-side. If-Match with the trip's ETag is required, so an edit made
+    from a stale copy is refused (412) instead of overwriting a newer one.
+    """
+    try:
+        trip = Trip.query.options(with_itinerary()).filter_by(id=int(trip_id)).first()
+    except ValueError:
+        return jsonify({"error": "Invalid trip ID"}), 400
+    if not trip:
+        return jsonify({"error": "Trip not found"}), 404
+
+    if "If-Match" not in request.headers:
+        response = jsonify({"error": "If-Match with the trip's ETag is required"})
+        response.headers["ETag"] = trip.etag
+        return response, 428
+    if not matches_if_match(trip.etag):
+        return precondition_failed(trip)
+
+    current = trip.to_dict(PATCHABLE_TRIP_FIELDS)
+    try:
+        patched = apply_patch(current, request.get_json(force=True))
+    except PatchError as e:
+        return jsonify({"error": str(e)}), 422
+
+    if not isinstance(patched, dict) or set(patched) != set(current):
+        return jsonify({"error": f"Only these fields can be patched: {', '.join(PATCHABLE_TRIP_FIELDS)}"}), 422
+    if not isinstance(patched["destinations"], list) or not isinstance(patched["budget"], dict):
+        return jsonify({"error": "destinations must be a list and budget an object"}), 422
+
+    # Claim the version we read; a concurrent writer makes this match no rows
+    claimed = db.session.execute(
+        update(Trip)
+        .where(Trip.id == trip.id, Trip.updated_at == trip.updated_at)
+        .values(updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        db.session.rollback()
+        return precondition_failed(db.session.get(Trip, trip.id))
+
+    for field in PATCHABLE_SCALAR_FIELDS:
+        if patched[field] != current[field]:
+            setattr(trip, field, patched[field])
+    if patched["destinations"] != current["destinations"]:
+        trip.set_destinations(patched["destinations"])
+    if patched["budget"] != current["budget"]:
+        trip.budget = patched["budget"]
+    trip.updated_at = datetime.utcnow()
+    db.session.commit()
+
+    response = jsonify({"message": "Trip updated successfully", "trip": trip.to_dict()})
+    response.headers["ETag"] = trip.etag
+    return response, 200
+
+def precondition_failed(trip):
+    response = jsonify({"error": "Trip was modified by someone else", "trip": trip.to_dict()})
+    response.headers["ETag"] = trip.etag
+    return response, 412
+
 @app.route("/api/trips/<trip_id>", methods=["DELETE"])
 def delete_trip(trip_id):
     try:
@@ -221,28 +504,55 @@ def delete_trip(trip_id):
     except ValueError:
         return jsonify({"error": "Invalid trip ID"}), 400
 
-# ------------------ AI TRIP PLANNING ------------------
-@app.route("/api/chat", methods=["POST"])
-def chat():
+# ------------------ SHARING ------------------
+
+@app.route("/api/trips/<trip_id>/share", methods=["POST"])
+def share_trip(trip_id):
     try:
-        data = request.json
-        user_message = data.get("message")
-        history = data.get("history", [])  # List of previous {"role": "user/system/assistant", "content": "..."}
-        
-        if not user_message:
-            return jsonify({"error": "Message required"}), 400
+        trip = Trip.query.get(int(trip_id))
+    except ValueError:
+        return jsonify({"error": "Invalid trip ID"}), 400
+    if not trip:
+        return jsonify({"error": "Trip not found"}), 404
+
+    share = shared_trips.publish(trip)
+    return jsonify({
+        "message": "Trip is now public",
+        "share_token": share.token,
+        "public_url": f"{Config.FRONTEND_URL.rstrip('/')}/shared/{share.token}"
+    }), 200
+
+@app.route("/api/trips/<trip_id>/share", methods=["DELETE"])
+def unshare_trip(trip_id):
+    try:
+        trip = Trip.query.get(int(trip_id))
+    except ValueError:
+        return jsonify({"error": "Invalid trip ID"}), 400
+    if not trip:
+        return jsonify({"error": "Trip not found"}), 404
 
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            return jsonify({"error": "API key missing"}), 500
+    shared_trips.revoke(trip)
+    return jsonify({"message": "Trip is now private"}), 200
 
-        client = Groq(api_key=api_key)
-        MODEL = "llama-3.3-70b-versatile"  # Or your preferred model
+@app.route("/api/shared/<token>", methods=["GET"])
+def get_shared_trip(token):
+    """Public read-only view, served from a snapshot so CDNs and browsers can cache it."""
+    shared = shared_trips.get(token)
+    if not shared:
+        return jsonify({"error": "This trip is not available or not public"}), 404
 
-        # System prompt for travel assistant
-        system_prompt = {
-            "role": "system",
-            "content": """You are a luxury travel concierge for GlobeTrotter. 
+    etag, body = shared
+    cache_control = f"public, max-age={Config.SHARED_TRIP_MAX_AGE}, stale-while-revalidate={Config.SHARED_TRIP_STALE_SECONDS}"
+    cached = conditional(etag, cache_control=cache_control)
+    if cached:
+        return cached
+    return with_validators(Response(body, mimetype="application/json"), etag, cache_control=cache_control), 200
+
+# ------------------ AI TRIP PLANNING ------------------
+# System prompt for travel assistant
+CHAT_SYSTEM_PROMPT = {
+    "role": "system",
+    "content": """You are a luxury travel concierge for GlobeTrotter. 
             Your goal is to provide high-end, bespoke travel advice.
             
             IMPORTANT FORMATTING RULES:
@@ -262,52 +572,185 @@ def chat():
             2. **Afternoon:** [Activity] - [Description]
             
             Make every response visually engaging and easy to read!"""
-        }
+}
+
+def open_chat(data):
+    """
+    Record the user's turn and build the model context. Returns
+    (messages, session_id, error) where error is a (body, status) pair;
+    session_id is None for legacy clients that send their own history.
+    Shared by the Flask route and the ASGI handler in asgi.py.
+    """
+    user_message = data.get("message")
+    history = data.get("history", [])  # List of previous {"role": "user/system/assistant", "content": "..."}
+
+    if not user_message:
+        return None, None, ({"error": "Message required"}, 400)
+    if len(user_message) > max_message_chars():
+        return None, None, ({"error": f"Message is too long (at most {max_message_chars()} characters)"}, 400)
+
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        return None, None, ({"error": "API key missing"}, 500)
+
+    session_id = data.get("session_id")
+    if session_id is None and "history" in data:
+        # Legacy clients resend the whole conversation every turn
+        return [CHAT_SYSTEM_PROMPT] + history + [{"role": "user", "content": user_message}], None, None
+
+    session = db.session.get(ChatSession, session_id) if session_id else None
+    if session_id and not session:
+        return None, None, ({"error": "Chat session not found"}, 404)
+    if not session:
+        try:
+            user_id = int(data["user_id"]) if data.get("user_id") else None
+        except (TypeError, ValueError):
+            return None, None, ({"error": "Invalid user ID"}, 400)
+        session = ChatSession(id=uuid.uuid4().hex, user_id=user_id)
+        db.session.add(session)
+    add_message(session.id, "user", user_message)
+    messages = build_context(session, CHAT_SYSTEM_PROMPT)
+    db.session.commit()
+    return messages, session.id, None
+
+def save_chat_reply(session_id, response):
+    add_message(session_id, "assistant", response)
+    db.session.commit()
+
+def chat_reply(response, session_id):
+    # Always return markdown formatted response
+    return {"response": response, "session_id": session_id} if session_id else {"response": response}
+
+@app.route("/api/chat", methods=["POST"])
+def chat():
+    try:
+        data = request.json
+        messages, session_id, error = open_chat(data)
+        if error:
+            return jsonify(error[0]), error[1]
 
-        # Build messages: system + history + new user message
-        messages = [system_prompt] + history + [{"role": "user", "content": user_message}]
+        if wants_stream():
+            return stream_chat(messages, session_id)
 
-        completion = client.chat.completions.create(
+        completion = router.complete(
+            "chat",
             messages=messages,
-            model=MODEL,
             temperature=0.7,
             max_tokens=2000
         )
 
         response = completion.choices[0].message.content.strip()
-
-        # Always return markdown formatted response
-        return jsonify({"response": response}), 200
+        if session_id:
+            save_chat_reply(session_id, response)
+        return jsonify(chat_reply(response, session_id)), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-@app.route("/api/generate-ai-plan", methods=["POST"])
-def generate_ai_plan():
-    try:
-        data = request.json
-        required_fields = ["city", "country", "startDate", "endDate"]
-        
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        city = data["city"]
-        country = data["country"]
-        start_date = data["startDate"]
-        end_date = data["endDate"]
-        trip_name = data.get("tripName", f"Trip to {city}")
-        description = data.get("description", "")
-        
-        # Date math for prompt
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
-        num_days = (end - start).days + 1
-        
-        api_key = os.getenv("GROQ_API_KEY")
-        client = Groq(api_key=api_key)
-        MODEL = "llama-3.3-70b-versatile"
-        
-        prompt = f"""
+
+def event_stream(generator):
+    return Response(
+        stream_with_context(generator),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def stream_chat(messages, session_id=None):
+    def generate():
+        try:
+            completion = router.complete(
+                "chat",
+                messages=messages,
+                temperature=0.7,
+                max_tokens=2000,
+                stream=True
+            )
+            parts = []
+            for delta in iter_deltas(completion):
+                parts.append(delta)
+                yield sse({"token": delta})
+            response = "".join(parts).strip()
+            if session_id:
+                save_chat_reply(session_id, response)
+            yield sse(chat_reply(response, session_id), event="done")
+        except Exception as e:
+            yield sse({"error": str(e)}, event="error")
+
+    return event_stream(generate())
+
+@app.route("/api/chat/sessions/<session_id>", methods=["GET"])
+def get_chat_session(session_id):
+    session = db.session.get(ChatSession, session_id)
+    if not session:
+        return jsonify({"error": "Chat session not found"}), 404
+    data = session.to_dict()
+    data["messages"] = [message.to_dict() for message in session.messages]
+    return jsonify(data), 200
+
+@app.route("/api/chat/sessions/<session_id>", methods=["DELETE"])
+def delete_chat_session(session_id):
+    session = db.session.get(ChatSession, session_id)
+    if not session:
+        return jsonify({"error": "Chat session not found"}), 404
+    db.session.delete(session)
+    db.session.commit()
+    return jsonify({"message": "Chat session deleted"}), 200
+
+AI_PLAN_MODEL = "llama-3.3-70b-versatile"
+AI_PLAN_SYSTEM_PROMPT = "You are a travel expert JSON generator."
+
+PLAN_DAY_SCHEMA = """{{
+      "dayNumber": {day_number},
+      "date": "{date}",
+      "title": "...",
+      "activities": [
+        {{
+          "time": "09:00 AM",
+          "title": "...",
+          "description": "...",
+          "duration": "2 hours",
+          "cost": 25,
+          "type": "...",
+          "location": "...",
+          "image_query": "specific descriptive query for a high-quality travel photo of this activity"
+        }}
+      ]
+    }}"""
+
+def plan_request(data):
+    """
+    Validate a generate-ai-plan body. Returns (plan, error); plan holds the
+    parsed trip fields, the cache key and the single-call prompt.
+    """
+    required_fields = ["city", "country", "startDate", "endDate"]
+
+    for field in required_fields:
+        if field not in data:
+            return None, ({"error": f"Missing required field: {field}"}, 400)
+
+    city = data["city"]
+    country = data["country"]
+    start_date = data["startDate"]
+    end_date = data["endDate"]
+    trip_name = data.get("tripName", f"Trip to {city}")
+    description = data.get("description", "")
+
+    # Date math for prompt
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    num_days = (end - start).days + 1
+
+    cache_key = ai_plan_cache.make_key(
+        city=normalize_place(city),
+        country=normalize_place(country),
+        num_days=num_days,
+        start_weekday=start.weekday(),
+        start_month=start.month,
+        description=normalize_place(description),
+        models=policy_version("itinerary", "plan-chunk", "plan-summary"),
+        prompt_version=AI_PLAN_PROMPT_VERSION
+    )
+
+    prompt = f"""
 Create a {num_days}-day trip plan for {city}, {country} from {start_date} to {end_date}.
 Trip Name: {trip_name}
 Description: {description}
@@ -343,173 +786,255 @@ Output ONLY valid JSON in this exact structure (no extra text or markdown):
   ]
 }}
 """
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are a travel expert JSON generator."},
-                {"role": "user", "content": prompt}
-            ],
-            model=MODEL,
+    return {
+        "city": city,
+        "country": country,
+        "start": start,
+        "end": end,
+        "num_days": num_days,
+        "trip_name": trip_name,
+        "description": description,
+        "cache_key": cache_key,
+        "messages": [
+            {"role": "system", "content": AI_PLAN_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+    }, None
+
+def restamp_plan(itinerary, plan):
+    return restamp_itinerary(itinerary, plan["trip_name"], plan["city"], plan["country"], plan["start"], plan["end"])
+
+def restamp_day(day, index, plan):
+    """One streamed day with the number and date restamp_plan would give it."""
+    day = dict(day)
+    day["dayNumber"] = index + 1
+    day["date"] = (plan["start"] + timedelta(days=index)).strftime("%Y-%m-%d")
+    return day
+
+@app.route("/api/generate-ai-plan", methods=["POST"])
+def generate_ai_plan():
+    try:
+        data = request.json
+        plan, error = plan_request(data)
+        if error:
+            return jsonify(error[0]), error[1]
+        cache_key = plan["cache_key"]
+
+        cached = ai_plan_cache.get(cache_key)
+        if cached is not None:
+            itinerary = restamp_plan(cached, plan)
+            if wants_stream():
+                return event_stream(replay_plan(itinerary))
+            return jsonify({"success": True, "itinerary": itinerary, "cached": True}), 200
+
+        if should_chunk(plan["num_days"]) and not wants_stream():
+            def generate_chunked():
+                itinerary = generate_chunked_plan(AI_PLAN_MODEL, plan)
+                ai_plan_cache.set(cache_key, itinerary)
+                return itinerary
+
+            itinerary = ai_calls.do("ai-plan", cache_key, generate_chunked)
+            return jsonify({"success": True, "itinerary": restamp_plan(itinerary, plan)}), 200
+
+        if wants_stream():
+            return event_stream(stream_plan(plan))
+
+        def generate():
+            itinerary, _ = create_json(
+                ITINERARY_SCHEMA, "itinerary",
+                size=plan["num_days"],
+                messages=plan["messages"],
+                temperature=0.7,
+                max_tokens=3000,
+            )
+            itinerary = continue_plan(itinerary, plan)
+            ai_plan_cache.set(cache_key, itinerary)
+            return itinerary
+
+        itinerary = ai_calls.do("ai-plan", cache_key, generate)
+        return jsonify({"success": True, "itinerary": restamp_plan(itinerary, plan)}), 200
+        
+    except Exception as e:
+        return jsonify({"error": "Failed to generate AI plan", "details": str(e)}), 500
+
+def chunked_plan_prompts(plan):
+    """(day_prompt(first_day, last_day), summary_prompt) for a long trip."""
+    city, country, start = plan["city"], plan["country"], plan["start"]
+    num_days, trip_name, description = plan["num_days"], plan["trip_name"], plan["description"]
+
+    def day_prompt(first_day, last_day):
+        first_date = (start + timedelta(days=first_day - 1)).strftime("%Y-%m-%d")
+        last_date = (start + timedelta(days=last_day - 1)).strftime("%Y-%m-%d")
+        return f"""
+This is part of a {num_days}-day trip to {city}, {country}.
+Trip Name: {trip_name}
+Description: {description}
+
+Plan ONLY days {first_day} to {last_day} ({first_date} to {last_date}). Avoid repeating
+the headline attractions another part of the trip would obviously cover on other days.
+
+Output ONLY valid JSON in this exact structure (no extra text or markdown):
+{{
+  "days": [
+    {PLAN_DAY_SCHEMA.format(day_number=first_day, date=first_date)}
+  ]
+}}
+"""
+
+    summary_prompt = f"""
+Summarize a {num_days}-day trip to {city}, {country}.
+Trip Name: {trip_name}
+Description: {description}
+
+Output ONLY valid JSON in this exact structure (no extra text or markdown):
+{{
+  "overview": "...",
+  "highlights": ["..."],
+  "estimatedBudget": {{ "total": 0, "transport": 0, "accommodation": 0, "food": 0, "activities": 0 }}
+}}
+"""
+    return day_prompt, summary_prompt
+
+def assemble_chunked_plan(plan, summary, days):
+    itinerary = {
+        "tripName": plan["trip_name"],
+        "city": plan["city"],
+        "country": plan["country"],
+        "overview": summary.get("overview", ""),
+        "highlights": summary.get("highlights", []),
+        "estimatedBudget": summary.get("estimatedBudget", {}),
+        "days": days
+    }
+    return restamp_plan(itinerary, plan)
+
+def missing_days(itinerary, plan):
+    """First day to generate when a plan came back short (e.g. cut off by max_tokens), else None."""
+    generated = len(itinerary.get("days", []))
+    if generated >= plan["num_days"]:
+        return None
+    metrics.plan_continuations.inc()
+    return generated + 1
+
+def continue_plan(itinerary, plan):
+    """Fill in only the missing days with day-range calls instead of regenerating the plan."""
+    first_day = missing_days(itinerary, plan)
+    if first_day is not None:
+        day_prompt, _ = chunked_plan_prompts(plan)
+        _, days = generate_in_chunks(
+            AI_PLAN_MODEL, AI_PLAN_SYSTEM_PROMPT, plan["num_days"], day_prompt, first_day=first_day
+        )
+        itinerary["days"] = itinerary.get("days", []) + days
+    return itinerary
+
+def generate_chunked_plan(model, plan):
+    """Generate a long trip as parallel day-range chunks plus a cheap overview call."""
+    day_prompt, summary_prompt = chunked_plan_prompts(plan)
+    summary, days = generate_in_chunks(model, AI_PLAN_SYSTEM_PROMPT, plan["num_days"], day_prompt, summary_prompt)
+    return assemble_chunked_plan(plan, summary, days)
+
+def replay_plan(itinerary):
+    for day in itinerary.get("days", []):
+        yield sse(day, event="day")
+    yield sse({"success": True, "itinerary": itinerary, "cached": True}, event="done")
+
+def stream_plan(plan):
+    """Emit each completed day object as soon as it parses, then the full plan."""
+    try:
+        completion = router.complete(
+            "itinerary",
+            size=plan["num_days"],
+            messages=plan["messages"],
             temperature=0.7,
             max_tokens=3000,
+            stream=True
         )
-        
-        response_text = chat_completion.choices[0].message.content.strip()
-        itinerary = json.loads(response_text)
-        
-        return jsonify({"success": True, "itinerary": itinerary}), 200
-        
+        parser = DayStreamParser()
+        parts = []
+        streamed = 0
+        for delta in iter_deltas(completion):
+            parts.append(delta)
+            for day in parser.feed(delta):
+                yield sse(restamp_day(day, streamed, plan), event="day")
+                streamed += 1
+
+        itinerary, _ = parse_json("".join(parts), ITINERARY_SCHEMA, "itinerary")
+        streamed = len(itinerary["days"])
+        itinerary = continue_plan(itinerary, plan)
+        restamped = restamp_plan(itinerary, plan)
+        for day in restamped["days"][streamed:]:
+            yield sse(day, event="day")
+        ai_plan_cache.set(plan["cache_key"], itinerary)
+        yield sse({"success": True, "itinerary": restamped}, event="done")
     except Exception as e:
-        return jsonify({"error": "Failed to generate AI plan", "details": str(e)}), 500
+        yield sse({"error": "Failed to generate AI plan", "details": str(e)}, event="error")
+
+def restamp_itinerary(itinerary, trip_name, city, country, start, end):
+    """Apply the caller's trip name, place spelling and dates to a cached itinerary."""
+    itinerary = json.loads(json.dumps(itinerary))
+    itinerary["tripName"] = trip_name
+    itinerary["city"] = city
+    itinerary["country"] = country
+    itinerary["startDate"] = start.strftime("%Y-%m-%d")
+    itinerary["endDate"] = end.strftime("%Y-%m-%d")
+    for index, day in enumerate(itinerary.get("days", [])):
+        day["dayNumber"] = index + 1
+        day["date"] = (start + timedelta(days=index)).strftime("%Y-%m-%d")
+    return itinerary
+
+@app.route("/api/ai-cache/stats", methods=["GET"])
+def ai_cache_stats():
+    return jsonify({
+        "ai_plan": ai_plan_cache.stats(),
+        "destination_insights": insights_store.stats(),
+        "coalescing": ai_calls.stats()
+    }), 200
+
+def ai_cache_metrics():
+    caches = {"ai_plan": ai_plan_cache, "destination_insights": insights_store}
+    return {(name, stat): value for name, cache in caches.items() for stat, value in cache.stats().items()}
+
+def coalescing_metrics():
+    stats = ai_calls.stats()
+    values = {(route, stat): value for route, counters in stats["by_route"].items() for stat, value in counters.items()}
+    values[("all", "in_flight")] = stats["in_flight"]
+    return values
+
+metrics.gauge("ai_cache", "AI result cache counters, size and hit rate", ["cache", "stat"], ai_cache_metrics)
+metrics.gauge("ai_coalescing", "Identical concurrent AI calls served by one upstream call", ["route", "stat"], coalescing_metrics)
+metrics.gauge("llm_model", "Live routing stats: latency EWMA per route, error rate and in-flight calls per model",
+              ["route", "model", "stat"], router.stats.gauges)
+metrics.gauge("job_queue_depth", "Background jobs queued or running", [], lambda: {(): job_queue.depth()})
+
+@app.route("/api/models/stats", methods=["GET"])
+def model_stats():
+    return jsonify(router.stats.snapshot()), 200
+
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/api/inspiration", methods=["GET"])
 def get_inspiration():
     """
-    Generate travel inspiration posts and tips using AI
+    Serve travel inspiration posts and tips from the pre-generated pool
     """
     try:
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            return jsonify({"error": "GROQ_API_KEY not configured"}), 500
-            
-        client = Groq(api_key=api_key)
-        MODEL = "openai/gpt-oss-120b"
-        
-        prompt = """
-        You are a travel editor for a global lifestyle magazine.
-        Generate 9 diverse travel inspiration posts and 4 quick travel tips.
-        
-        For each post, include:
-        - title (compelling, e.g., 'Secrets of the Amalfi Coast')
-        - category (Beach, Adventure, Culture, Food, Luxury, or Budget)
-        - excerpt (1-2 sentences of storytelling)
-        - author (fictional travel journalist name)
-        - readTime (e.g., '6 min read')
-        - views (a realistic number like '12.4K')
-        - query (a specific search term for an image, e.g., 'italy coastal village')
-        
-        For each tip, include:
-        - title
-        - description
-        - icon (a relevant emoji)
-        
-        Output ONLY valid JSON in this structure:
-        {
-            "posts": [
-                { "id": 1, "title": "...", "category": "...", "excerpt": "...", "author": "...", "readTime": "...", "views": "...", "query": "..." },
-                ...
-            ],
-            "tips": [
-                { "title": "...", "description": "...", "icon": "..." },
-                ...
-            ]
-        }
-        """
-
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a precise JSON generator. Always respond with only valid, parseable JSON."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model=MODEL,
-            temperature=0.8,
-            max_tokens=2500,
-        )
-
-        response_text = chat_completion.choices[0].message.content.strip()
-        data = json.loads(response_text)
-        
-        # Category-based high-quality Unsplash images (Fixed and fast)
-        category_images = {
-            "Beach": [
-                "https://images.unsplash.com/photo-1507525428034-b723cf961d3e",
-                "https://images.unsplash.com/photo-1519046904884-53103b34b206",
-                "https://images.unsplash.com/photo-1473116763249-2faaef81ccda"
-            ],
-            "Adventure": [
-                "https://images.unsplash.com/photo-1464822759023-fed622ff2c3b",
-                "https://images.unsplash.com/photo-1533240332313-0db49b459ad6",
-                "https://images.unsplash.com/photo-1501555088652-021faa106b9b"
-            ],
-            "Culture": [
-                "https://images.unsplash.com/photo-1524492707540-c50d87458ec2",
-                "https://images.unsplash.com/photo-1528127269322-539801943592",
-                "https://images.unsplash.com/photo-1533929736458-ca588d08c8be"
-            ],
-            "Food": [
-                "https://images.unsplash.com/photo-1504674900247-0877df9cc836",
-                "https://images.unsplash.com/photo-1476514525535-07fb3b4ae5f1",
-                "https://images.unsplash.com/photo-1482049016688-2d3e1b311543"
-            ],
-            "Luxury": [
-                "https://images.unsplash.com/photo-1566073771259-6a8506099945",
-                "https://images.unsplash.com/photo-1582719508461-905c673771fd",
-                "https://images.unsplash.com/photo-1571896349842-33c89424de2d"
-            ],
-            "Budget": [
-                "https://images.unsplash.com/photo-1523906834658-6e24ef2386f9",
-                "https://images.unsplash.com/photo-1506157786151-b8491531f063",
-                "https://images.unsplash.com/photo-1493246507139-91e8fad9978e"
-            ]
-        }
-        
-        # Add dynamic image URLs
-        import random
-        # Normalize keys to lowercase for robust matching
-        normalized_images = {k.lower(): v for k, v in category_images.items()}
-        # Add common variations
-        normalized_images["cultural"] = normalized_images["culture"]
-        
-        for i, post in enumerate(data['posts']):
-            cat = post.get('category', 'Culture').strip().lower()
-            
-            # Map common variations to strict categories
-            if "beach" in cat: cat = "beach"
-            elif "culture" in cat or "cultural" in cat: cat = "culture"
-            elif "food" in cat or "dining" in cat: cat = "food"
-            elif "luxury" in cat: cat = "luxury"
-            elif "budget" in cat: cat = "budget"
-            elif "adventure" in cat: cat = "adventure"
-            
-            img_list = normalized_images.get(cat, normalized_images["culture"])
-            base_url = random.choice(img_list)
-            post['image'] = f"{base_url}?auto=format&fit=crop&w=800&q=80"
-            
+        data = add_images(inspiration_feed.get())
         return jsonify(data), 200
     except Exception as e:
-        print(f"Error in get_inspiration: {e}")
+        app.logger.error("Error in get_inspiration: %s", e)
         return jsonify({"error": str(e)}), 500
 @app.route("/api/cities/search", methods=["GET"])
 def search_cities():
     query = request.args.get("q", "")
     region = request.args.get("region", "")
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+    sort = request.args.get("sort", "popularity")
     
-    # Mock city data - In production, use a real cities database
-    mock_cities = [
-        {"name": "Paris", "country": "France", "region": "Europe", "cost_index": 8, "popularity": 95},
-        {"name": "Tokyo", "country": "Japan", "region": "Asia", "cost_index": 9, "popularity": 90},
-        {"name": "New York", "country": "USA", "region": "North America", "cost_index": 9, "popularity": 92},
-        {"name": "Bali", "country": "Indonesia", "region": "Asia", "cost_index": 4, "popularity": 88},
-        {"name": "Barcelona", "country": "Spain", "region": "Europe", "cost_index": 6, "popularity": 89},
-        {"name": "Dubai", "country": "UAE", "region": "Middle East", "cost_index": 8, "popularity": 85},
-        {"name": "London", "country": "UK", "region": "Europe", "cost_index": 9, "popularity": 93},
-        {"name": "Bangkok", "country": "Thailand", "region": "Asia", "cost_index": 3, "popularity": 87},
-        {"name": "Rome", "country": "Italy", "region": "Europe", "cost_index": 7, "popularity": 91},
-        {"name": "Istanbul", "country": "Turkey", "region": "Europe", "cost_index": 5, "popularity": 84}
-    ]
-    
-    results = mock_cities
-    
-    if query:
-        results = [c for c in results if query.lower() in c["name"].lower() or query.lower() in c["country"].lower()]
-    
-    if region:
-        results = [c for c in results if c["region"] == region]
+    results, facets = city_index.search(query, region=region, limit=limit, sort=sort)
     
+    if request.args.get("facets", "").lower() in ("1", "true"):
+        return jsonify({"results": results, "facets": {"region": facets}}), 200
     return jsonify(results), 200
 
 # ------------------ ACTIVITIES ------------------
@@ -521,37 +1046,70 @@ def get_trip_insights():
         country = data.get("country")
         start_date = data.get("startDate")
         
-        api_key = os.getenv("GROQ_API_KEY")
-        client = Groq(api_key=api_key)
-        
-        prompt = f"""
-Provide travel insights for {city}, {country} starting {start_date}.
-Output ONLY valid JSON:
-{{
-  "packingList": ["item 1", "item 2", ...],
-  "weatherForecast": "...",
-  "localPhrases": [
-    {{"phrase": "...", "translation": "...", "pronunciation": "..."}}
-  ],
-  "proTips": ["tip 1", "tip 2", ...]
-}}
-"""
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are a travel consultant."},
-                {"role": "user", "content": prompt}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.7,
-            max_tokens=1000,
-        )
-        
-        response_text = chat_completion.choices[0].message.content.strip()
-        insights = json.loads(response_text)
+        insights = get_destination_insights(city, country, travel_month(start_date))
         return jsonify(insights), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# ------------------ BACKGROUND JOBS ------------------
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job():
+    data = request.json or {}
+    kind = data.get("kind")
+    if kind not in job_queue.routes:
+        return jsonify({"error": f"Unknown job kind. Use one of: {', '.join(job_queue.routes)}"}), 400
+
+    try:
+        job = job_queue.submit(kind, data.get("payload", {}))
+    except QueueFull as e:
+        response = jsonify({"error": "Too many pending jobs, try again later", "retry_after": e.retry_after})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events"
+    }), 202
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = db.session.get(Job, job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    if not db.session.get(Job, job_id):
+        return jsonify({"error": "Job not found"}), 404
+
+    def generate():
+        # Bounded, so a long job does not hold a request thread for its whole run;
+        # EventSource reconnects after `retry` ms and gets the current status again
+        deadline = time.monotonic() + Config.JOB_EVENTS_MAX_SECONDS
+        yield "retry: 1000\n\n"
+        last_status = None
+        while True:
+            generation = job_queue.generation()
+            db.session.expire_all()
+            job = db.session.get(Job, job_id)
+            if job.status != last_status:
+                last_status = job.status
+                yield sse(job.to_dict(), event=job.status)
+            if job.status in ("succeeded", "failed"):
+                return
+            db.session.rollback()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                yield sse({"status": job.status, "status_url": f"/api/jobs/{job_id}"}, event="reconnect")
+                return
+            job_queue.wait_for_change(generation, min(remaining, Config.JOB_EVENTS_POLL_SECONDS))
+
+    return event_stream(generate())
+
 @app.route("/api/trips/save-ai-plan", methods=["POST"])
 def save_ai_plan():
     try:
@@ -579,20 +1137,20 @@ def save_ai_plan():
             description=itinerary.get("overview", ""),
             start_date=itinerary.get("startDate"),
             end_date=itinerary.get("endDate"),
-            destinations=json.dumps([{
-                "city": itinerary.get("city"),
-                "country": itinerary.get("country"),
-                "start_date": itinerary.get("startDate"),
-                "end_date": itinerary.get("endDate"),
-                "activities": dest_activities,
-                "budget": 0,
-                "order": 0
-            }]),
-            budget=json.dumps(itinerary.get("estimatedBudget", {})),
+            budget=itinerary.get("estimatedBudget", {}),
             status="planning",
             visibility="private",
             ai_generated=True
         )
+        new_trip.set_destinations([{
+            "city": itinerary.get("city"),
+            "country": itinerary.get("country"),
+            "start_date": itinerary.get("startDate"),
+            "end_date": itinerary.get("endDate"),
+            "activities": dest_activities,
+            "budget": 0,
+            "order": 0
+        }])
         
         db.session.add(new_trip)
         db.session.commit()
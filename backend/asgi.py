@@ -0,0 +1,320 @@
+"""
+ASGI entry point:
+
+    uvicorn asgi:application --workers 4
+
+The slow AI routes (/api/chat, /api/generate-ai-plan, /api/trip-insights)
+run as coroutines on the event loop with AsyncGroq, so one worker keeps
+thousands of Groq calls in flight without a thread per request. Their
+SQL and cache lookups are short and run on a small thread pool. Every
+other route is the Flask app, served on a bounded thread pool through
+WSGIBridge, so the JSON contracts are the same as under a WSGI server.
+"""
+from urllib.parse import parse_qs
+import inspect
+import json
+import time
+
+import async_bridge
+from app import (
+    app as flask_app, ai_plan_cache, open_chat, save_chat_reply, chat_reply, plan_request, restamp_plan,
+    restamp_day,
+    chunked_plan_prompts, assemble_chunked_plan, missing_days, replay_plan, AI_PLAN_MODEL,
+    AI_PLAN_SYSTEM_PROMPT
+)
+from async_bridge import WSGIBridge, BodyTooLarge, ClientDisconnected, read_body, run_sync
+from insights import get_destination_insights_async, travel_month
+from json_column import dumps
+from metrics import metrics
+from model_router import router
+from rate_limit import rate_limiter, client_key, user_key, EXEMPT_PATHS, HEADERS as RATE_LIMIT_HEADERS
+from plan_chunks import generate_in_chunks_async, should_chunk
+from singleflight import ai_calls
+from streaming import sse, aiter_deltas, stream_requested, DayStreamParser
+from structured_output import create_json_async, parse_json, ITINERARY_SCHEMA
+
+async_bridge.init_app(flask_app)
+flask_bridge = WSGIBridge(flask_app.wsgi_app)
+
+EXPOSE_HEADERS = ", ".join(["ETag", "Last-Modified", "X-Next-Cursor"] + RATE_LIMIT_HEADERS)
+
+
+class Request:
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.client = (scope.get("client") or ("",))[0]
+        self.args = {name: values[0] for name, values in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+        self.headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope.get("headers", [])}
+        self.json = json.loads(body) if body else None
+
+    def user_id(self):
+        if self.headers.get("x-user-id"):
+            return self.headers["x-user-id"]
+        return self.json.get("user_id") if isinstance(self.json, dict) else None
+
+    def wants_stream(self):
+        return stream_requested(self.args.get("stream"), self.headers.get("accept"), self.json)
+
+
+async def _replay(events):
+    for event in events:
+        yield event
+
+
+# ------------------ AI routes ------------------
+
+async def chat(request):
+    try:
+        messages, session_id, error = await run_sync(open_chat, request.json)
+        if error:
+            return error
+
+        if request.wants_stream():
+            return stream_chat(messages, session_id)
+
+        completion = await router.complete_async(
+            "chat",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=2000
+        )
+        response = completion.choices[0].message.content.strip()
+        if session_id:
+            await run_sync(save_chat_reply, session_id, response)
+        return chat_reply(response, session_id), 200
+
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+
+async def stream_chat(messages, session_id):
+    try:
+        completion = await router.complete_async(
+            "chat",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=2000,
+            stream=True
+        )
+        parts = []
+        async for delta in aiter_deltas(completion):
+            parts.append(delta)
+            yield sse({"token": delta})
+        response = "".join(parts).strip()
+        if session_id:
+            await run_sync(save_chat_reply, session_id, response)
+        yield sse(chat_reply(response, session_id), event="done")
+    except Exception as e:
+        yield sse({"error": str(e)}, event="error")
+
+
+async def generate_ai_plan(request):
+    try:
+        plan, error = plan_request(request.json)
+        if error:
+            return error
+        cache_key = plan["cache_key"]
+
+        cached = await run_sync(ai_plan_cache.get, cache_key)
+        if cached is not None:
+            itinerary = restamp_plan(cached, plan)
+            if request.wants_stream():
+                return _replay(replay_plan(itinerary))
+            return {"success": True, "itinerary": itinerary, "cached": True}, 200
+
+        if should_chunk(plan["num_days"]) and not request.wants_stream():
+            async def generate_chunked():
+                day_prompt, summary_prompt = chunked_plan_prompts(plan)
+                summary, days = await generate_in_chunks_async(
+                    AI_PLAN_MODEL, AI_PLAN_SYSTEM_PROMPT, plan["num_days"], day_prompt, summary_prompt
+                )
+                itinerary = assemble_chunked_plan(plan, summary, days)
+                await run_sync(ai_plan_cache.set, cache_key, itinerary)
+                return itinerary
+
+            itinerary = await ai_calls.do_async("ai-plan", cache_key, generate_chunked)
+            return {"success": True, "itinerary": restamp_plan(itinerary, plan)}, 200
+
+        if request.wants_stream():
+            return stream_plan(plan)
+
+        async def generate():
+            itinerary, _ = await create_json_async(
+                ITINERARY_SCHEMA, "itinerary",
+                size=plan["num_days"],
+                messages=plan["messages"],
+                temperature=0.7,
+                max_tokens=3000,
+            )
+            itinerary = await continue_plan(itinerary, plan)
+            await run_sync(ai_plan_cache.set, cache_key, itinerary)
+            return itinerary
+
+        itinerary = await ai_calls.do_async("ai-plan", cache_key, generate)
+        return {"success": True, "itinerary": restamp_plan(itinerary, plan)}, 200
+
+    except Exception as e:
+        return {"error": "Failed to generate AI plan", "details": str(e)}, 500
+
+
+async def continue_plan(itinerary, plan):
+    first_day = missing_days(itinerary, plan)
+    if first_day is not None:
+        day_prompt, _ = chunked_plan_prompts(plan)
+        _, days = await generate_in_chunks_async(
+            AI_PLAN_MODEL, AI_PLAN_SYSTEM_PROMPT, plan["num_days"], day_prompt, first_day=first_day
+        )
+        itinerary["days"] = itinerary.get("days", []) + days
+    return itinerary
+
+
+async def stream_plan(plan):
+    """Emit each completed day object as soon as it parses, then the full plan."""
+    try:
+        completion = await router.complete_async(
+            "itinerary",
+            size=plan["num_days"],
+            messages=plan["messages"],
+            temperature=0.7,
+            max_tokens=3000,
+            stream=True
+        )
+        parser = DayStreamParser()
+        parts = []
+        streamed = 0
+        async for delta in aiter_deltas(completion):
+            parts.append(delta)
+            for day in parser.feed(delta):
+                yield sse(restamp_day(day, streamed, plan), event="day")
+                streamed += 1
+
+        itinerary, _ = parse_json("".join(parts), ITINERARY_SCHEMA, "itinerary")
+        streamed = len(itinerary["days"])
+        itinerary = await continue_plan(itinerary, plan)
+        restamped = restamp_plan(itinerary, plan)
+        for day in restamped["days"][streamed:]:
+            yield sse(day, event="day")
+        await run_sync(ai_plan_cache.set, plan["cache_key"], itinerary)
+        yield sse({"success": True, "itinerary": restamped}, event="done")
+    except Exception as e:
+        yield sse({"error": "Failed to generate AI plan", "details": str(e)}, event="error")
+
+
+async def trip_insights(request):
+    try:
+        data = request.json
+        insights = await get_destination_insights_async(
+            data.get("city"), data.get("country"), travel_month(data.get("startDate"))
+        )
+        return insights, 200
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+
+ROUTES = {
+    ("POST", "/api/chat"): chat,
+    ("POST", "/api/generate-ai-plan"): generate_ai_plan,
+    ("POST", "/api/trip-insights"): trip_insights,
+}
+
+
+# ------------------ ASGI plumbing ------------------
+
+def _headers(request, content_type, extra=(), headers=None):
+    headers = [(b"content-type", content_type)] + list(extra) + [
+        (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in (headers or {}).items()
+    ]
+    origin = request.headers.get("origin") if request else None
+    if origin:
+        # Same answer Flask-CORS gives the bridged routes
+        headers += [
+            (b"access-control-allow-origin", origin.encode("latin-1")),
+            (b"access-control-expose-headers", EXPOSE_HEADERS.encode("latin-1")),
+            (b"vary", b"Origin")
+        ]
+    return headers
+
+
+async def send_json(send, request, body, status, headers=None):
+    payload = (dumps(body) + "\n").encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": _headers(request, b"application/json", [(b"content-length", str(len(payload)).encode())], headers)
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def send_events(send, request, events, headers=None):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": _headers(request, b"text/event-stream; charset=utf-8",
+                            [(b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")], headers)
+    })
+    try:
+        async for event in events:
+            await send({"type": "http.response.body", "body": event.encode("utf-8"), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        await events.aclose()
+
+
+async def rate_limit(request):
+    """The Flask app's rate limiting (rate_limit.py) for the routes served here."""
+    if not rate_limiter.enabled or request.path in EXEMPT_PATHS:
+        return None
+    client = client_key(request.client)
+    # Set on this request's task, so the LLM usage of the handler is charged to it
+    rate_limiter.bind(client)
+    return await run_sync(rate_limiter.check, rate_limiter.kind(request.method, request.path), client,
+                          user_key(request.user_id()))
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    handler = ROUTES.get((scope["method"], scope["path"]))
+    try:
+        body = await read_body(receive)
+    except ClientDisconnected:
+        return
+    except BodyTooLarge:
+        return await send_json(send, None, {"error": "Request body too large"}, 413)
+
+    if handler is None:
+        return await flask_bridge(scope, receive, send, body=body)
+
+    started = time.perf_counter()
+    try:
+        request = Request(scope, body)
+    except ValueError:
+        return await send_json(send, None, {"error": "Invalid JSON body"}, 400)
+
+    decision = await rate_limit(request)
+    if decision is not None and not decision.allowed:
+        result = {"error": decision.error, "retry_after": decision.retry_after}, 429
+    else:
+        result = await handler(request)
+    headers = decision.headers if decision is not None else None
+
+    status = 200 if inspect.isasyncgen(result) else result[1]
+    metrics.http_latency.observe(time.perf_counter() - started, method=request.method, route=request.path, status=status)
+    if inspect.isasyncgen(result):
+        await send_events(send, request, result, headers)
+    else:
+        await send_json(send, request, *result, headers)
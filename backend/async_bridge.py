@@ -0,0 +1,180 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import asyncio
+import contextvars
+import io
+import sys
+import threading
+
+from config import Config
+
+_db_executor = ThreadPoolExecutor(max_workers=Config.ASGI_DB_WORKERS, thread_name_prefix="asgi-db")
+_app = None
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def init_app(app):
+    global _app
+    _app = app
+
+
+async def run_sync(fn, *args, **kwargs):
+    """
+    Run blocking work (SQL, the DB tier of the AI caches) from a coroutine on
+    a worker thread, inside an app context so db.session works as usual.
+    The caller's context variables (the rate-limit client) go with it.
+    """
+    def call():
+        if _app is None:
+            return fn(*args, **kwargs)
+        with _app.app_context():
+            return fn(*args, **kwargs)
+
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_db_executor, ctx.run, call)
+
+
+async def read_body(receive, limit=None):
+    limit = limit or Config.ASGI_MAX_BODY_BYTES
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnected()
+        body += message.get("body", b"")
+        if len(body) > limit:
+            raise BodyTooLarge()
+        if not message.get("more_body"):
+            return bytes(body)
+
+
+def wsgi_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1] or 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False
+    }
+    for name, value in scope.get("headers", []):
+        name, value = name.decode("latin-1"), value.decode("latin-1")
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+            continue
+        if name == "content-length":
+            continue
+        key = "HTTP_" + name.upper().replace("-", "_")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class WSGIBridge:
+    """
+    Serves ASGI http requests with a WSGI app. Each request runs start to
+    finish on one pool thread, because Flask's contexts and streamed
+    (stream_with_context) generators expect to stay on a single thread.
+    Body chunks reach the event loop through a small queue, so a slow
+    client holds back the generator instead of buffering the whole stream.
+    """
+
+    def __init__(self, wsgi_app, max_workers=None):
+        self.wsgi_app = wsgi_app
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.ASGI_WSGI_WORKERS, thread_name_prefix="asgi-wsgi"
+        )
+
+    async def __call__(self, scope, receive, send, body=None):
+        if body is None:
+            body = await read_body(receive)
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=8)
+        abandoned = threading.Event()
+        worker = loop.run_in_executor(self._executor, self._run, wsgi_environ(scope, body), loop, queue, abandoned)
+
+        finished = False
+        try:
+            while True:
+                kind, payload = await queue.get()
+                if kind == "start":
+                    status, headers = payload
+                    await send({"type": "http.response.start", "status": status, "headers": headers})
+                elif kind == "body":
+                    await send({"type": "http.response.body", "body": payload, "more_body": True})
+                elif kind == "error":
+                    finished = True
+                    raise payload
+                else:
+                    finished = True
+                    break
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            await worker
+        finally:
+            if not finished:
+                # The client went away mid-stream: stop the generator and let the thread finish
+                abandoned.set()
+                while not queue.empty():
+                    queue.get_nowait()
+
+    def _run(self, environ, loop, queue, abandoned):
+        def put(item):
+            if abandoned.is_set():
+                raise ClientDisconnected()
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    return future.result(timeout=1)
+                except FutureTimeout:
+                    if abandoned.is_set():
+                        future.cancel()
+                        raise ClientDisconnected()
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+            return lambda data: put(("body", data))
+
+        try:
+            iterable = self.wsgi_app(environ, start_response)
+            try:
+                started = False
+                for chunk in iterable:
+                    if not started:
+                        put(("start", (response["status"], response["headers"])))
+                        started = True
+                    if chunk:
+                        put(("body", chunk))
+                if not started:
+                    put(("start", (response["status"], response["headers"])))
+            finally:
+                close = getattr(iterable, "close", None)
+                if close is not None:
+                    close()
+        except ClientDisconnected:
+            return
+        except Exception as e:
+            if not abandoned.is_set():
+                put(("error", e))
+            return
+        put(("end", None))
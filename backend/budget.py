@@ -0,0 +1,201 @@
+from collections import OrderedDict, defaultdict
+from datetime import date, timedelta
+import threading
+
+from sqlalchemy import func
+
+from extensions import db
+from json_column import load_json
+from models import Activity
+
+CATEGORIES = ["transport", "stay", "food", "activities"]
+FIXED_CATEGORIES = ["transport", "stay", "food"]  # spread evenly over the trip's days
+
+# AI plans use "accommodation" for what the editor calls "stay"
+CATEGORY_ALIASES = {"stay": "accommodation"}
+
+IN_CLAUSE_CHUNK = 500
+# Per-day breakdowns stop here; costs on later days count as unscheduled, so totals are kept
+MAX_DAYS = 366
+
+
+def _money(value):
+    return round(float(value or 0), 2)
+
+
+def _planned(trip):
+    try:
+        budget = load_json(trip.budget, {})
+    except ValueError:
+        budget = {}
+    if not isinstance(budget, dict):
+        budget = {}
+
+    planned = {}
+    for category in CATEGORIES:
+        value = budget.get(category, budget.get(CATEGORY_ALIASES.get(category)))
+        planned[category] = _money(value) if isinstance(value, (int, float)) else 0.0
+    total = budget.get("total")
+    planned["total"] = _money(total) if isinstance(total, (int, float)) else None
+    return planned
+
+
+def _trip_dates(start_date, end_date):
+    try:
+        start = date.fromisoformat(start_date[:10])
+        end = date.fromisoformat(end_date[:10])
+    except (TypeError, ValueError):
+        return []
+    if end < start:
+        return []
+    return [(start + timedelta(days=i)).isoformat() for i in range(min((end - start).days + 1, MAX_DAYS))]
+
+
+class BudgetAnalytics:
+    """
+    Spend breakdowns per trip (by category and by day) and across a user's
+    trips. Activity costs are summed in SQL; each trip's breakdown is memoized
+    until its updated_at changes.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._memo = OrderedDict()  # trip id -> (updated_at, breakdown)
+        self._lock = threading.Lock()
+
+    def for_trip(self, trip):
+        return self.for_trips([trip])[0]
+
+    def for_trips(self, trips):
+        results = {}
+        missing = []
+        with self._lock:
+            for trip in trips:
+                entry = self._memo.get(trip.id)
+                if entry and entry[0] == trip.updated_at:
+                    self._memo.move_to_end(trip.id)
+                    results[trip.id] = entry[1]
+                else:
+                    missing.append(trip)
+
+        if missing:
+            costs = self._activity_costs([trip.id for trip in missing if not trip.destinations])
+            computed = {trip.id: (trip.updated_at, self._breakdown(trip, costs.get(trip.id)))
+                        for trip in missing}
+            with self._lock:
+                for trip_id, entry in computed.items():
+                    self._memo[trip_id] = entry
+                    self._memo.move_to_end(trip_id)
+                    results[trip_id] = entry[1]
+                while len(self._memo) > self.max_entries:
+                    self._memo.popitem(last=False)
+
+        return [results[trip.id] for trip in trips]
+
+    def for_user(self, trips, date_from=None, date_to=None):
+        """Totals across `trips`, counting only days inside [date_from, date_to]."""
+        categories = dict.fromkeys(CATEGORIES, 0.0)
+        by_month = defaultdict(float)
+        unscheduled = 0.0
+        per_trip = []
+
+        for trip, breakdown in zip(trips, self.for_trips(trips)):
+            days = [day for day in breakdown["per_day"]
+                    if day["date"] is None
+                    or ((not date_from or day["date"] >= date_from) and (not date_to or day["date"] <= date_to))]
+            trip_total = 0.0
+            for day in days:
+                for category in CATEGORIES:
+                    categories[category] += day[category]
+                trip_total += day["total"]
+                by_month[day["date"][:7] if day["date"] else "undated"] += day["total"]
+            if len(days) == len(breakdown["per_day"]):
+                unscheduled += breakdown["unscheduled_activities"]
+                trip_total += breakdown["unscheduled_activities"]
+                categories["activities"] += breakdown["unscheduled_activities"]
+
+            per_trip.append({
+                "trip_id": str(trip.id),
+                "name": trip.name,
+                "start_date": trip.start_date,
+                "end_date": trip.end_date,
+                "total": _money(trip_total)
+            })
+
+        return {
+            "from": date_from,
+            "to": date_to,
+            "trip_count": len(per_trip),
+            "total": _money(sum(categories.values())),
+            "categories": {category: _money(value) for category, value in categories.items()},
+            "unscheduled_activities": _money(unscheduled),
+            "by_month": {month: _money(value) for month, value in sorted(by_month.items())},
+            "trips": per_trip
+        }
+
+    def _activity_costs(self, trip_ids):
+        """{trip_id: {day: cost}} summed in the database."""
+        costs = defaultdict(dict)
+        for i in range(0, len(trip_ids), IN_CLAUSE_CHUNK):
+            rows = (db.session.query(Activity.trip_id, Activity.day, func.sum(Activity.cost))
+                    .filter(Activity.trip_id.in_(trip_ids[i:i + IN_CLAUSE_CHUNK]))
+                    .group_by(Activity.trip_id, Activity.day))
+            for trip_id, day, cost in rows:
+                costs[trip_id][day] = float(cost or 0)
+        return costs
+
+    @staticmethod
+    def _legacy_activity_costs(trip):
+        # Trips not yet moved to relational rows by migrate_destinations.py
+        costs = defaultdict(float)
+        for destination in trip.destinations_list():
+            for activity in destination.get("activities") or []:
+                cost = activity.get("cost")
+                day = activity.get("day")
+                if isinstance(cost, (int, float)) and not isinstance(cost, bool):
+                    costs[day if isinstance(day, int) else None] += cost
+        return costs
+
+    def _breakdown(self, trip, day_costs):
+        if day_costs is None:
+            day_costs = self._legacy_activity_costs(trip) if trip.destinations else {}
+
+        planned = _planned(trip)
+        itemised = sum(day_costs.values())
+        dates = _trip_dates(trip.start_date, trip.end_date)
+        scheduled_days = [day for day in day_costs if isinstance(day, int) and day > 0]
+        num_days = len(dates) or min(max(scheduled_days, default=1), MAX_DAYS)
+
+        per_day = []
+        for number in range(1, num_days + 1):
+            day = {"day": number, "date": dates[number - 1] if dates else None}
+            for category in FIXED_CATEGORIES:
+                day[category] = planned[category] / num_days
+            day["activities"] = day_costs.get(number, 0.0) if itemised else planned["activities"] / num_days
+            per_day.append(day)
+
+        unscheduled = itemised - sum(day["activities"] for day in per_day) if itemised else 0.0
+
+        categories = {category: planned[category] for category in FIXED_CATEGORIES}
+        categories["activities"] = itemised if itemised else planned["activities"]
+
+        for day in per_day:
+            day["total"] = _money(sum(day[category] for category in CATEGORIES))
+            for category in CATEGORIES:
+                day[category] = _money(day[category])
+
+        return {
+            "trip_id": str(trip.id),
+            "days": num_days,
+            "total": _money(sum(categories.values())),
+            "planned_total": planned["total"],
+            "per_day_average": _money(sum(categories.values()) / num_days),
+            "categories": {category: _money(value) for category, value in categories.items()},
+            "itemised_activities": _money(itemised),
+            "unscheduled_activities": _money(unscheduled),
+            "per_day": per_day,
+            "updated_at": trip.updated_at.isoformat() if trip.updated_at else None
+        }
+
+
+budget_analytics = BudgetAnalytics()
@@ -0,0 +1,79 @@
+from flask import current_app
+
+from config import Config
+from extensions import db
+from model_router import router
+from models import ChatMessage
+
+SUMMARY_PROMPT = """You maintain the running summary of a conversation between a traveller and a travel concierge.
+Merge the new turns into the existing summary. Keep destinations, dates, budget, party size,
+preferences and decisions already made; drop pleasantries. Reply with the summary only, at most 200 words."""
+
+MAX_SUMMARIZED_CHARS = 2000  # per message, when folding it into the summary
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token plus message overhead)."""
+    return len(text or "") // 4 + 4
+
+
+def max_message_chars(budget=None):
+    """The longest message whose estimate_tokens fits in the context budget on its own."""
+    return ((budget or Config.CHAT_CONTEXT_TOKENS) - 4) * 4
+
+
+def add_message(session_id, role, content):
+    message = ChatMessage(session_id=session_id, role=role, content=content, tokens=estimate_tokens(content))
+    db.session.add(message)
+    return message
+
+
+def summarize(previous, messages):
+    transcript = "\n".join(f"{m.role}: {m.content[:MAX_SUMMARIZED_CHARS]}" for m in messages)
+    completion = router.complete(
+        "chat-summary",
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Existing summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"}
+        ],
+        temperature=0.2,
+        max_tokens=Config.CHAT_SUMMARY_MAX_TOKENS
+    )
+    return completion.choices[0].message.content.strip()
+
+
+def build_context(session, system_prompt, budget=None):
+    """
+    Messages to send for the next turn: the system prompt, the rolling
+    summary and the most recent turns. Once the unsummarized turns exceed
+    `budget` tokens the oldest are folded into the summary until they fit in
+    half of it, so summarizing happens every few turns rather than every turn.
+    """
+    budget = budget or Config.CHAT_CONTEXT_TOKENS
+    recent = session.messages.filter(ChatMessage.id > (session.summarized_through or 0)).all()
+
+    if sum(m.tokens for m in recent) > budget:
+        keep = len(recent) - 1  # the newest message is always sent
+        kept_tokens = recent[-1].tokens
+        while keep > 0 and kept_tokens + recent[keep - 1].tokens <= budget // 2:
+            keep -= 1
+            kept_tokens += recent[keep].tokens
+
+        # Nothing to fold when the newest message alone is over the budget
+        folded = recent[:keep]
+        if folded:
+            try:
+                session.summary = summarize(session.summary, folded)
+            except Exception as e:
+                # Dropping the turns still keeps the request bounded
+                current_app.logger.warning("Chat summary failed for %s: %s", session.id, e)
+            session.summarized_through = folded[-1].id
+            recent = recent[keep:]
+
+    messages = [system_prompt]
+    if session.summary:
+        messages.append({"role": "system", "content": f"Summary of the conversation so far:\n{session.summary}"})
+    # open_chat turns away longer messages; this keeps other callers within the budget too
+    limit = max_message_chars(budget)
+    messages += [{"role": m.role, "content": m.content[:limit]} for m in recent]
+    return messages
@@ -0,0 +1,288 @@
+from bisect import bisect_left
+from collections import Counter, defaultdict
+import csv
+import heapq
+import itertools
+import math
+import os
+import pickle
+import re
+import unicodedata
+
+from config import Config
+
+# Used when no gazetteer file is configured
+DEFAULT_CITIES = [
+    {"name": "Paris", "country": "France", "region": "Europe", "cost_index": 8, "popularity": 95},
+    {"name": "Tokyo", "country": "Japan", "region": "Asia", "cost_index": 9, "popularity": 90},
+    {"name": "New York", "country": "USA", "region": "North America", "cost_index": 9, "popularity": 92},
+    {"name": "Bali", "country": "Indonesia", "region": "Asia", "cost_index": 4, "popularity": 88},
+    {"name": "Barcelona", "country": "Spain", "region": "Europe", "cost_index": 6, "popularity": 89},
+    {"name": "Dubai", "country": "UAE", "region": "Middle East", "cost_index": 8, "popularity": 85},
+    {"name": "London", "country": "UK", "region": "Europe", "cost_index": 9, "popularity": 93},
+    {"name": "Bangkok", "country": "Thailand", "region": "Asia", "cost_index": 3, "popularity": 87},
+    {"name": "Rome", "country": "Italy", "region": "Europe", "cost_index": 7, "popularity": 91},
+    {"name": "Istanbul", "country": "Turkey", "region": "Europe", "cost_index": 5, "popularity": 84}
+]
+
+INDEX_VERSION = 2
+
+# Match tiers, best first
+EXACT, NAME_PREFIX, WORD_PREFIX, COUNTRY_PREFIX, FUZZY = 4, 3, 2, 1, 0
+
+SHORT_PREFIX_LENGTH = 2
+SHORT_PREFIX_TOP = 200
+
+FUZZY_MIN_SIMILARITY = 0.25
+FUZZY_MAX_POSTINGS = 5000  # trigrams shared by more cities than this carry no signal
+
+SOUTH_AMERICA = {"AR", "BO", "BR", "CL", "CO", "EC", "FK", "GF", "GY", "PE", "PY", "SR", "UY", "VE"}
+MIDDLE_EAST = {"AE", "BH", "IL", "IQ", "IR", "JO", "KW", "LB", "OM", "PS", "QA", "SA", "SY", "YE"}
+
+
+def fold(text):
+    """Lower-case, strip accents and collapse punctuation to single spaces."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return " ".join(re.split(r"[^0-9a-z]+", text)).strip()
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CityIndex:
+    """
+    In-memory gazetteer index: a sorted key array for prefix autocomplete,
+    trigram postings for typo-tolerant matching, and region facets.
+    """
+
+    def __init__(self, cities):
+        self.cities = [dict(city) for city in cities]
+
+        entries = []
+        self._grams = defaultdict(list)
+        self._gram_counts = []
+        for city_id, city in enumerate(self.cities):
+            name = fold(city["name"])
+            entries.append((name, city_id, NAME_PREFIX))
+            words = name.split()
+            for i in range(1, len(words)):
+                entries.append((" ".join(words[i:]), city_id, WORD_PREFIX))
+            ascii_name = fold(city.get("ascii_name", ""))
+            if ascii_name and ascii_name != name:
+                entries.append((ascii_name, city_id, NAME_PREFIX))
+            entries.append((fold(city["country"]), city_id, COUNTRY_PREFIX))
+
+            grams = trigrams(name)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._grams[gram].append(city_id)
+
+        entries.sort()
+        self._keys = [key for key, _, _ in entries]
+        self._refs = [(city_id, tier) for _, city_id, tier in entries]
+        self._grams = dict(self._grams)
+        self._by_popularity = sorted(range(len(self.cities)), key=lambda i: -(self.cities[i].get("popularity") or 0))
+        self._region_counts = Counter(city["region"] for city in self.cities)
+        self._short_prefixes = self._rank_short_prefixes()
+
+    def _rank_short_prefixes(self):
+        """
+        One- and two-letter prefixes match a large slice of the gazetteer, so
+        their ranking and facets are computed once here instead of per keystroke.
+        """
+        ranked = {}
+        for length in range(1, SHORT_PREFIX_LENGTH + 1):
+            groups = defaultdict(dict)
+            for key, (city_id, tier) in zip(self._keys, self._refs):
+                if len(key) < length:
+                    continue
+                prefix = key[:length]
+                if tier == NAME_PREFIX and key == prefix:
+                    tier = EXACT
+                matches = groups[prefix]
+                if tier > matches.get(city_id, -1):
+                    matches[city_id] = tier
+
+            for prefix, matches in groups.items():
+                best = heapq.nlargest(SHORT_PREFIX_TOP, matches,
+                                      key=lambda i: (matches[i], self.cities[i].get("popularity") or 0))
+                facets = Counter(self.cities[i]["region"] for i in matches)
+                ranked[prefix] = (best, dict(facets), len(matches) <= SHORT_PREFIX_TOP)
+        return ranked
+
+    # ------------------ loading ------------------
+
+    @classmethod
+    def from_file(cls, path):
+        if path.endswith(".csv"):
+            return cls(read_csv(path))
+        return cls(read_geonames(path))
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Build the index from `path` (or DEFAULT_CITIES), reusing a prebuilt
+        `<path>.index.pickle` when it is newer than the source file.
+        """
+        if not path or not os.path.exists(path):
+            return cls(DEFAULT_CITIES)
+
+        prebuilt = f"{path}.index.pickle"
+        if os.path.exists(prebuilt) and os.path.getmtime(prebuilt) >= os.path.getmtime(path):
+            with open(prebuilt, "rb") as f:
+                version, index = pickle.load(f)
+            if version == INDEX_VERSION:
+                return index
+
+        index = cls.from_file(path)
+        try:
+            with open(prebuilt, "wb") as f:
+                pickle.dump((INDEX_VERSION, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError:
+            pass
+        return index
+
+    # ------------------ queries ------------------
+
+    def top(self, limit):
+        return [self._public(self.cities[i]) for i in self._by_popularity[:limit]]
+
+    def search(self, query, region="", limit=20, sort="popularity"):
+        """Return (results, region_facets) for an autocomplete query."""
+        query = fold(query)
+        if not query and sort != "cost":
+            # Browsing: walk the popularity order instead of ranking every city
+            best = (i for i in self._by_popularity if not region or self.cities[i]["region"] == region)
+            return [self._public(self.cities[i]) for i in itertools.islice(best, limit)], dict(self._region_counts)
+
+        if query in self._short_prefixes and sort != "cost":
+            best, facets, complete = self._short_prefixes[query]
+            if region:
+                best = [i for i in best if self.cities[i]["region"] == region]
+            if complete or len(best) >= limit:
+                return [self._public(self.cities[i]) for i in best[:limit]], facets
+
+        if not query:
+            matches = dict.fromkeys(range(len(self.cities)), EXACT)
+        else:
+            matches = self._prefix_matches(query)
+            if len(matches) < limit and len(query) >= 3:
+                for city_id in self._fuzzy_matches(query):
+                    matches.setdefault(city_id, FUZZY)
+
+        facets = Counter(self.cities[i]["region"] for i in matches)
+        if region:
+            matches = {i: tier for i, tier in matches.items() if self.cities[i]["region"] == region}
+
+        if sort == "cost":
+            rank = lambda i: (matches[i], -(self.cities[i].get("cost_index") or 99), self.cities[i].get("popularity") or 0)
+        else:
+            rank = lambda i: (matches[i], self.cities[i].get("popularity") or 0)
+
+        best = heapq.nlargest(limit, matches, key=rank)
+        return [self._public(self.cities[i]) for i in best], dict(facets)
+
+    def _prefix_matches(self, query):
+        matches = {}
+        start = bisect_left(self._keys, query)
+        end = bisect_left(self._keys, query + "\uffff", lo=start)
+        for position in range(start, end):
+            city_id, tier = self._refs[position]
+            if tier == NAME_PREFIX and self._keys[position] == query:
+                tier = EXACT
+            if tier > matches.get(city_id, -1):
+                matches[city_id] = tier
+        return matches
+
+    def _fuzzy_matches(self, query):
+        query_grams = trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            postings = self._grams.get(gram, ())
+            if len(postings) <= FUZZY_MAX_POSTINGS:
+                shared.update(postings)
+
+        for city_id, common in shared.items():
+            similarity = common / (len(query_grams) + self._gram_counts[city_id] - common)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                yield city_id
+
+    @staticmethod
+    def _public(city):
+        return {key: city.get(key) for key in ("name", "country", "region", "cost_index", "popularity")}
+
+
+# ------------------ gazetteer readers ------------------
+
+def _int_or_none(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def read_csv(path):
+    """CSV with a header row: name,country,region[,cost_index,popularity,ascii_name]."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {
+                "name": row["name"],
+                "country": row["country"],
+                "region": row.get("region") or "",
+                "cost_index": _int_or_none(row.get("cost_index")),
+                "popularity": _int_or_none(row.get("popularity")) or 0,
+                "ascii_name": row.get("ascii_name") or ""
+            }
+
+
+def _geonames_region(country_code, timezone):
+    continent = (timezone or "").split("/")[0]
+    if country_code in MIDDLE_EAST:
+        return "Middle East"
+    if continent == "America":
+        return "South America" if country_code in SOUTH_AMERICA else "North America"
+    if continent in ("Australia", "Pacific"):
+        return "Oceania"
+    if continent == "Indian":
+        return "Asia"
+    if continent == "Atlantic":
+        return "Europe"
+    return continent or "Other"
+
+
+def read_geonames(path):
+    """
+    GeoNames citiesNNNN.txt dump (tab separated). Country names are read
+    from a countryInfo.txt next to it when present, else ISO codes are used.
+    """
+    countries = {}
+    country_info = os.path.join(os.path.dirname(path), "countryInfo.txt")
+    if os.path.exists(country_info):
+        with open(country_info, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) > 4:
+                    countries[fields[0]] = fields[4]
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 18:
+                continue
+            population = _int_or_none(fields[14]) or 0
+            yield {
+                "name": fields[1],
+                "ascii_name": fields[2],
+                "country": countries.get(fields[8], fields[8]),
+                "region": _geonames_region(fields[8], fields[17]),
+                "cost_index": None,
+                "popularity": min(100, round(math.log10(population + 1) * 12.5)),
+            }
+
+
+city_index = CityIndex.load(Config.CITIES_PATH)
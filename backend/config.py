@@ -6,3 +6,114 @@ load_dotenv()
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")  # GET/HEAD reads go here when set
+
+    # Server databases (Postgres, MySQL): connection pool
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+    # SQLite: pragmas applied to every new connection
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+    # AI result cache (in-process LRU backed by the ai_cache table)
+    AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "1") == "1"
+    AI_CACHE_MEMORY_ENTRIES = int(os.getenv("AI_CACHE_MEMORY_ENTRIES", "256"))
+    AI_CACHE_MAX_ROWS = int(os.getenv("AI_CACHE_MAX_ROWS", "5000"))
+    AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+    # Shared Groq client (connection pool, timeouts and retry budget)
+    GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")  # e.g. a local stub server for load tests
+    GROQ_STUB_TRANSPORT = os.getenv("GROQ_STUB_TRANSPORT")  # "module:factory" returning an httpx transport
+    GROQ_POOL_SIZE = int(os.getenv("GROQ_POOL_SIZE", "20"))
+    GROQ_ASYNC_POOL_SIZE = int(os.getenv("GROQ_ASYNC_POOL_SIZE", "500"))  # per event loop (asgi.py)
+    GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "5"))
+    GROQ_READ_TIMEOUT = float(os.getenv("GROQ_READ_TIMEOUT", "60"))
+    GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "2"))
+    GROQ_BACKOFF_BASE = float(os.getenv("GROQ_BACKOFF_BASE", "0.5"))
+    GROQ_BACKOFF_MAX = float(os.getenv("GROQ_BACKOFF_MAX", "8"))
+    GROQ_REQUEST_DEADLINE = float(os.getenv("GROQ_REQUEST_DEADLINE", "90"))
+
+    # Long itineraries are split into day-range chunks generated in parallel
+    AI_PLAN_CHUNK_THRESHOLD = int(os.getenv("AI_PLAN_CHUNK_THRESHOLD", "5"))  # 0 disables chunking
+    AI_PLAN_CHUNK_DAYS = int(os.getenv("AI_PLAN_CHUNK_DAYS", "3"))
+    AI_PLAN_CHUNK_WORKERS = int(os.getenv("AI_PLAN_CHUNK_WORKERS", "8"))
+    AI_PLAN_SUMMARY_MODEL = os.getenv("AI_PLAN_SUMMARY_MODEL", "llama-3.1-8b-instant")
+
+    # Model routing (model_router.py): per-endpoint model preferences, hedging and fallback
+    ROUTER_LARGE_MODEL = os.getenv("ROUTER_LARGE_MODEL", "llama-3.3-70b-versatile")
+    ROUTER_FAST_MODEL = os.getenv("ROUTER_FAST_MODEL", "llama-3.1-8b-instant")
+    ROUTER_SHORT_TRIP_DAYS = int(os.getenv("ROUTER_SHORT_TRIP_DAYS", "3"))  # plans this short go to the fast model
+    ROUTER_HEDGE_AFTER = float(os.getenv("ROUTER_HEDGE_AFTER", "4"))  # streamed calls: seconds without a first token; 0 disables hedging
+    ROUTER_HEDGE_WORKERS = int(os.getenv("ROUTER_HEDGE_WORKERS", "32"))
+    ROUTER_RATE_LIMIT_COOLDOWN = float(os.getenv("ROUTER_RATE_LIMIT_COOLDOWN", "30"))  # when Groq sends no Retry-After
+    ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5"))
+    ROUTER_SWITCH_RATIO = float(os.getenv("ROUTER_SWITCH_RATIO", "2"))  # prefer an alternate this much faster
+    ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "5"))
+    ROUTER_EWMA_ALPHA = float(os.getenv("ROUTER_EWMA_ALPHA", "0.2"))
+    ROUTER_EXPLORE_RATE = float(os.getenv("ROUTER_EXPLORE_RATE", "0.05"))  # requests that ignore error rates and latency (not cooldowns), so demoted models recover
+
+    # Rate limiting (rate_limit.py): token buckets per client IP, and per user
+    # too when the request names one. RATE_LIMIT_STORE points every worker at
+    # one SQLite file; unset keeps the buckets in process.
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+    RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE")
+    RATE_LIMIT_CRUD_PER_MINUTE = float(os.getenv("RATE_LIMIT_CRUD_PER_MINUTE", "120"))  # 0 disables a bucket
+    RATE_LIMIT_CRUD_BURST = int(os.getenv("RATE_LIMIT_CRUD_BURST", "60"))
+    RATE_LIMIT_AI_PER_MINUTE = float(os.getenv("RATE_LIMIT_AI_PER_MINUTE", "6"))
+    RATE_LIMIT_AI_BURST = int(os.getenv("RATE_LIMIT_AI_BURST", "10"))
+    LLM_DAILY_TOKEN_QUOTA = int(os.getenv("LLM_DAILY_TOKEN_QUOTA", "200000"))  # per client IP and UTC day; 0 disables it
+
+    # Background job queue for slow AI routes
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "32"))
+    JOB_EVENTS_MAX_SECONDS = float(os.getenv("JOB_EVENTS_MAX_SECONDS", "30"))  # then the client is told to reconnect
+    JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_SECONDS", "5"))  # re-read for jobs run by another worker
+
+    # Pre-generated inspiration feed
+    INSPIRATION_POOL_SIZE = int(os.getenv("INSPIRATION_POOL_SIZE", "6"))
+    INSPIRATION_MAX_AGE_SECONDS = int(os.getenv("INSPIRATION_MAX_AGE_SECONDS", str(6 * 3600)))
+    INSPIRATION_REFRESH_SECONDS = int(os.getenv("INSPIRATION_REFRESH_SECONDS", "3600"))
+    INSPIRATION_BACKGROUND_REFRESH = os.getenv("INSPIRATION_BACKGROUND_REFRESH", "1") == "1"
+
+    # Seasonal destination insights (keyed by city, country and month)
+    INSIGHTS_TTL_SECONDS = int(os.getenv("INSIGHTS_TTL_SECONDS", str(90 * 24 * 3600)))
+
+    # Password hashing
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 2)))  # hashes running at once
+    BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", "64"))
+    UNKNOWN_EMAIL_TTL_SECONDS = int(os.getenv("UNKNOWN_EMAIL_TTL_SECONDS", "30"))
+
+    # City search gazetteer: a CSV (name,country,region,...) or a GeoNames citiesNNNN.txt dump
+    CITIES_PATH = os.getenv("CITIES_PATH")
+
+    # Server-side chat sessions: recent turns are sent verbatim up to this many
+    # (estimated) tokens, older turns are folded into a rolling summary
+    CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "3000"))
+    CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "llama-3.1-8b-instant")
+    CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", "400"))
+
+    # Public shared-trip links
+    FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
+    SHARED_TRIP_MAX_AGE = int(os.getenv("SHARED_TRIP_MAX_AGE", "300"))  # browsers and CDNs
+    SHARED_TRIP_STALE_SECONDS = int(os.getenv("SHARED_TRIP_STALE_SECONDS", "86400"))  # stale-while-revalidate
+    SHARED_TRIP_MEMO_SECONDS = float(os.getenv("SHARED_TRIP_MEMO_SECONDS", "10"))  # in-process, before re-checking the trip version
+
+    # Slow-request log (0 disables it); a sample of requests is stack-profiled so slow ones can be explained
+    SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "0"))
+    SLOW_REQUEST_PROFILE_RATE = float(os.getenv("SLOW_REQUEST_PROFILE_RATE", "0.1"))
+    SLOW_REQUEST_PROFILE_INTERVAL = float(os.getenv("SLOW_REQUEST_PROFILE_INTERVAL", "0.005"))
+
+    # ASGI entry point (asgi.py): AI routes run on the event loop, everything
+    # else is served by the Flask app on a bounded thread pool
+    ASGI_WSGI_WORKERS = int(os.getenv("ASGI_WSGI_WORKERS", "32"))
+    ASGI_DB_WORKERS = int(os.getenv("ASGI_DB_WORKERS", "16"))  # blocking SQL/cache work of the async handlers
+    ASGI_MAX_BODY_BYTES = int(os.getenv("ASGI_MAX_BODY_BYTES", str(10 * 1024 * 1024)))
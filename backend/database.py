@@ -0,0 +1,80 @@
+import sqlite3
+
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+
+REPLICA_BIND = "replica"
+READ_ONLY_METHODS = ("GET", "HEAD")
+
+
+def engine_options(url):
+    """Pool settings for server databases; SQLite is tuned per connection instead (see set_sqlite_pragmas)."""
+    if not url or url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": Config.DB_POOL_SIZE,
+        "max_overflow": Config.DB_MAX_OVERFLOW,
+        "pool_recycle": Config.DB_POOL_RECYCLE,
+        "pool_timeout": Config.DB_POOL_TIMEOUT,
+        "pool_pre_ping": Config.DB_POOL_PRE_PING
+    }
+
+
+def configure(app):
+    """Engine options and the optional read replica, set before db.init_app(app)."""
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(Config.SQLALCHEMY_DATABASE_URI))
+    if Config.DATABASE_REPLICA_URL:
+        binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+        binds[REPLICA_BIND] = dict(engine_options(Config.DATABASE_REPLICA_URL), url=Config.DATABASE_REPLICA_URL)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets readers run alongside a writer, synchronous=NORMAL is safe with
+    WAL, and busy_timeout makes concurrent writers wait instead of failing
+    with "database is locked".
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={Config.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={Config.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(Config.SQLITE_CACHE_SIZE_KB)}")
+    cursor.execute(f"PRAGMA mmap_size={int(Config.SQLITE_MMAP_SIZE)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+class RoutingSession(Session):
+    """
+    Sends reads made while handling GET/HEAD requests to the read replica
+    when one is configured. Everything else uses the primary, and so does
+    the rest of a request once it has flushed, so it reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica(clause):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self, clause):
+        if self._flushing or self.info.get("wrote"):
+            return False
+        if clause is not None and getattr(clause, "is_dml", False):
+            return False
+        if not has_request_context() or request.method not in READ_ONLY_METHODS:
+            return False
+        return REPLICA_BIND in self._db.engines
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary(session, flush_context):
+    session.info["wrote"] = True
+
+
+event.listen(Engine, "connect", set_sqlite_pragmas)
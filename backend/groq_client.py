@@ -0,0 +1,203 @@
+import asyncio
+import importlib
+import json
+import random
+import threading
+import time
+import weakref
+
+import groq
+import httpx
+from groq import AsyncGroq, Groq
+
+from config import Config
+from metrics import metrics
+from rate_limit import rate_limiter
+
+_client = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncGroq
+_transport = None
+_lock = threading.Lock()
+
+RETRYABLE_ERRORS = (groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def set_transport(transport):
+    """
+    Route every Groq call through a custom httpx transport (e.g.
+    httpx.MockTransport for load tests). Pass None to restore the network.
+    """
+    global _transport
+    with _lock:
+        _transport = transport
+        _reset()
+
+
+def _load_stub_transport():
+    module_name, _, factory = Config.GROQ_STUB_TRANSPORT.partition(":")
+    return getattr(importlib.import_module(module_name), factory or "transport")()
+
+
+def _reset():
+    global _client
+    if _client is not None:
+        _client.close()
+    _client = None
+    _async_clients.clear()
+
+
+def _transport_for_new_client():
+    # Caller holds _lock
+    if _transport is None and Config.GROQ_STUB_TRANSPORT:
+        return _load_stub_transport()
+    return _transport
+
+
+def _client_options(transport, pool_size):
+    return {
+        "limits": httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        "timeout": httpx.Timeout(Config.GROQ_READ_TIMEOUT, connect=Config.GROQ_CONNECT_TIMEOUT),
+        "transport": transport
+    }
+
+
+def get_client():
+    """Return the process-wide Groq client, creating it on first use."""
+    global _client
+    if _client is not None:
+        return _client
+
+    with _lock:
+        if _client is None:
+            transport = _transport_for_new_client()
+            _client = Groq(
+                api_key=Config.GROQ_API_KEY or ("stub" if transport else None),
+                base_url=Config.GROQ_BASE_URL,
+                max_retries=0,  # retries are handled by create_completion
+                http_client=httpx.Client(**_client_options(transport, Config.GROQ_POOL_SIZE))
+            )
+    return _client
+
+
+def get_async_client():
+    """AsyncGroq for the running event loop; its connection pool belongs to that loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        with _lock:
+            transport = _transport_for_new_client()
+            client = _async_clients[loop] = AsyncGroq(
+                api_key=Config.GROQ_API_KEY or ("stub" if transport else None),
+                base_url=Config.GROQ_BASE_URL,
+                max_retries=0,  # retries are handled by create_completion_async
+                http_client=httpx.AsyncClient(**_client_options(transport, Config.GROQ_ASYNC_POOL_SIZE))
+            )
+    return client
+
+
+def _attempt_timeout(remaining):
+    return httpx.Timeout(min(Config.GROQ_READ_TIMEOUT, remaining), connect=Config.GROQ_CONNECT_TIMEOUT)
+
+
+def _backoff(attempt):
+    return random.uniform(0, min(Config.GROQ_BACKOFF_MAX, Config.GROQ_BACKOFF_BASE * 2 ** attempt))
+
+
+def _record_success(model, started, completion, stream):
+    # Streams report usage on their last chunk (see streaming.iter_deltas)
+    usage = None if stream else getattr(completion, "usage", None)
+    metrics.record_completion(model, time.monotonic() - started, "ok", usage)
+    rate_limiter.charge(usage)
+
+
+def create_completion(deadline=None, retryable=RETRYABLE_ERRORS, **kwargs):
+    """
+    chat.completions.create with bounded, jittered retries. The whole call
+    (including backoff sleeps) must finish within `deadline` seconds.
+    """
+    deadline = deadline or Config.GROQ_REQUEST_DEADLINE
+    expires = time.monotonic() + deadline
+    attempt = 0
+    model = kwargs.get("model")
+
+    while True:
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            metrics.groq_requests.inc(model=model, outcome="DeadlineExceeded")
+            raise DeadlineExceeded(f"Groq request exceeded its {deadline:.0f}s deadline")
+
+        started = time.monotonic()
+        try:
+            completion = get_client().chat.completions.create(timeout=_attempt_timeout(remaining), **kwargs)
+        except Exception as e:
+            metrics.record_completion(model, time.monotonic() - started, type(e).__name__)
+            if not isinstance(e, retryable) or attempt >= Config.GROQ_MAX_RETRIES:
+                raise
+            sleep_for = _backoff(attempt)
+            if time.monotonic() + sleep_for >= expires:
+                raise
+            time.sleep(sleep_for)
+            attempt += 1
+        else:
+            _record_success(model, started, completion, kwargs.get("stream"))
+            return completion
+
+
+async def create_completion_async(deadline=None, retryable=RETRYABLE_ERRORS, **kwargs):
+    """create_completion for the ASGI app: same retry and deadline policy, awaiting AsyncGroq."""
+    deadline = deadline or Config.GROQ_REQUEST_DEADLINE
+    expires = time.monotonic() + deadline
+    attempt = 0
+    model = kwargs.get("model")
+
+    while True:
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            metrics.groq_requests.inc(model=model, outcome="DeadlineExceeded")
+            raise DeadlineExceeded(f"Groq request exceeded its {deadline:.0f}s deadline")
+
+        started = time.monotonic()
+        try:
+            completion = await get_async_client().chat.completions.create(timeout=_attempt_timeout(remaining), **kwargs)
+        except Exception as e:
+            metrics.record_completion(model, time.monotonic() - started, type(e).__name__)
+            if not isinstance(e, retryable) or attempt >= Config.GROQ_MAX_RETRIES:
+                raise
+            sleep_for = _backoff(attempt)
+            if time.monotonic() + sleep_for >= expires:
+                raise
+            await asyncio.sleep(sleep_for)
+            attempt += 1
+        else:
+            _record_success(model, started, completion, kwargs.get("stream"))
+            return completion
+
+
+def stub_transport(reply="{}", latency=0.0):
+    """
+    A local stand-in for the Groq API, for load tests:
+    GROQ_STUB_TRANSPORT=groq_client:stub_transport
+    """
+    def handler(request):
+        if latency:
+            time.sleep(latency)
+        body = json.loads(request.content or b"{}")
+        usage = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        base = {"id": "stub", "created": int(time.time()), "model": body.get("model", "stub")}
+
+        if body.get("stream"):
+            chunk = dict(base, object="chat.completion.chunk", choices=[
+                {"index": 0, "delta": {"role": "assistant", "content": reply}, "finish_reason": "stop"}
+            ])
+            content = f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n"
+            return httpx.Response(200, content=content.encode(), headers={"content-type": "text/event-stream"})
+
+        return httpx.Response(200, json=dict(base, object="chat.completion", usage=usage, choices=[
+            {"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}
+        ]))
+
+    return httpx.MockTransport(handler)
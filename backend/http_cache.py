@@ -0,0 +1,49 @@
+from datetime import timezone
+
+from flask import request, Response
+
+
+def _http_date(value):
+    # Timestamps are stored as naive UTC
+    return value.replace(tzinfo=timezone.utc, microsecond=0) if value else None
+
+
+def not_modified(etag, last_modified=None, cache_control="no-cache"):
+    """
+    Return a 304 response when the request's validators still match, else
+    None. If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    """
+    if request.if_none_match:
+        if not request.if_none_match.contains_weak(etag.strip('"')):
+            return None
+    elif not (request.if_modified_since and last_modified
+              and _http_date(last_modified) <= request.if_modified_since):
+        return None
+    return with_validators(Response(status=304), etag, last_modified, cache_control)
+
+
+def with_validators(response, etag, last_modified=None, cache_control="no-cache"):
+    """Attach ETag/Last-Modified; no-cache makes browsers revalidate instead of guessing freshness."""
+    response.set_etag(etag.strip('"'))
+    if last_modified:
+        response.last_modified = _http_date(last_modified)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def matches_if_match(etag):
+    """
+    Whether the request's If-Match lists `etag` (or is "*"). It may name
+    several tags; they are compared weakly, as in not_modified.
+    """
+    if request.if_match.star_tag:
+        return True
+    return request.if_match.contains_weak(etag.strip('"'))
+
+
+def conditional(etag, last_modified=None, cache_control="no-cache"):
+    """304 if the client is up to date, an empty 200 for HEAD, else None."""
+    response = not_modified(etag, last_modified, cache_control)
+    if response is None and request.method == "HEAD":
+        response = with_validators(Response(status=200), etag, last_modified, cache_control)
+    return response
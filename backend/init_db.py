@@ -1,8 +1,19 @@
+from sqlalchemy import inspect, text
+
 from app import app
 from extensions import db
+from models import Trip
 
 with app.app_context():
     # Create all tables
     db.create_all()
+    # create_all skips indexes on tables that already exist
+    for index in Trip.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    # nor columns added to existing tables
+    if "updated_at" not in {column["name"] for column in inspect(db.engine).get_columns("users")}:
+        db.session.execute(text("ALTER TABLE users ADD COLUMN updated_at TIMESTAMP"))
+        db.session.execute(text("UPDATE users SET updated_at = created_at"))
+        db.session.commit()
     print("✅ Database tables created successfully!")
-    print("📊 Tables: users, trips")
+    print("📊 Tables: users, trips, destinations, activities, ai_cache, jobs, inspiration_sets, trip_shares, chat_sessions, chat_messages")
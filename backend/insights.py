@@ -0,0 +1,104 @@
+from datetime import datetime
+import calendar
+
+from ai_cache import AICache, normalize_place
+from async_bridge import run_sync
+from config import Config
+from model_router import policy_version
+from singleflight import ai_calls
+from structured_output import create_json, create_json_async, INSIGHTS_SCHEMA
+
+PROMPT_VERSION = 1  # Bump when the prompt changes to invalidate stored insights
+
+insights_store = AICache("destination_insights", ttl_seconds=Config.INSIGHTS_TTL_SECONDS)
+
+
+def travel_month(start_date):
+    try:
+        return datetime.strptime(start_date, "%Y-%m-%d").month
+    except (TypeError, ValueError):
+        return datetime.utcnow().month
+
+
+def insights_messages(city, country, month):
+    prompt = f"""
+Provide travel insights for {city}, {country} for a trip in {calendar.month_name[month]}.
+Output ONLY valid JSON:
+{{
+  "packingList": ["item 1", "item 2", ...],
+  "weatherForecast": "...",
+  "localPhrases": [
+    {{"phrase": "...", "translation": "...", "pronunciation": "..."}}
+  ],
+  "proTips": ["tip 1", "tip 2", ...]
+}}
+"""
+    return [
+        {"role": "system", "content": "You are a travel consultant."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def generate_insights(city, country, month):
+    insights, _ = create_json(
+        INSIGHTS_SCHEMA, "insights",
+        messages=insights_messages(city, country, month),
+        temperature=0.7,
+        max_tokens=1000,
+    )
+    return insights
+
+
+async def generate_insights_async(city, country, month):
+    insights, _ = await create_json_async(
+        INSIGHTS_SCHEMA, "insights",
+        messages=insights_messages(city, country, month),
+        temperature=0.7,
+        max_tokens=1000,
+    )
+    return insights
+
+
+def _insights_key(city, country, month):
+    key_parts = (normalize_place(city), normalize_place(country), month)
+    key = insights_store.make_key(
+        city=key_parts[0], country=key_parts[1], month=month,
+        models=policy_version("insights"), prompt_version=PROMPT_VERSION
+    )
+    return key_parts, key
+
+
+def get_destination_insights(city, country, month, refresh=False):
+    """
+    Insights depend on the destination and the season, not the exact date,
+    so they are stored per (city, country, month) and generated at most once.
+    """
+    key_parts, key = _insights_key(city, country, month)
+
+    if not refresh:
+        insights = insights_store.get(key)
+        if insights is not None:
+            return insights
+
+    def generate():
+        insights = generate_insights(city, country, month)
+        insights_store.set(key, insights)
+        return insights
+
+    return ai_calls.do("trip-insights", key_parts, generate)
+
+
+async def get_destination_insights_async(city, country, month):
+    """get_destination_insights for the ASGI app; the cache lookups run on a worker thread."""
+    key_parts, key = _insights_key(city, country, month)
+
+    insights = await run_sync(insights_store.get, key)
+    if insights is not None:
+        return insights
+
+    async def generate():
+        insights = await generate_insights_async(city, country, month)
+        await run_sync(insights_store.set, key, insights)
+        return insights
+
+    return await ai_calls.do_async("trip-insights", key_parts, generate)
@@ -0,0 +1,247 @@
+from datetime import datetime, timedelta
+import json
+import random
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+from config import Config
+from extensions import db
+from model_router import policy_version
+from models import InspirationSet
+from singleflight import ai_calls
+from structured_output import create_json, INSPIRATION_SCHEMA
+
+PROMPT_VERSION = 1
+
+PROMPT = """
+You are a travel editor for a global lifestyle magazine.
+Generate 9 diverse travel inspiration posts and 4 quick travel tips.
+
+For each post, include:
+- title (compelling, e.g., 'Secrets of the Amalfi Coast')
+- category (Beach, Adventure, Culture, Food, Luxury, or Budget)
+- excerpt (1-2 sentences of storytelling)
+- author (fictional travel journalist name)
+- readTime (e.g., '6 min read')
+- views (a realistic number like '12.4K')
+- query (a specific search term for an image, e.g., 'italy coastal village')
+
+For each tip, include:
+- title
+- description
+- icon (a relevant emoji)
+
+Output ONLY valid JSON in this structure:
+{
+    "posts": [
+        { "id": 1, "title": "...", "category": "...", "excerpt": "...", "author": "...", "readTime": "...", "views": "...", "query": "..." },
+        ...
+    ],
+    "tips": [
+        { "title": "...", "description": "...", "icon": "..." },
+        ...
+    ]
+}
+"""
+
+# Category-based high-quality Unsplash images (Fixed and fast)
+CATEGORY_IMAGES = {
+    "Beach": [
+        "https://images.unsplash.com/photo-1507525428034-b723cf961d3e",
+        "https://images.unsplash.com/photo-1519046904884-53103b34b206",
+        "https://images.unsplash.com/photo-1473116763249-2faaef81ccda"
+    ],
+    "Adventure": [
+        "https://images.unsplash.com/photo-1464822759023-fed622ff2c3b",
+        "https://images.unsplash.com/photo-1533240332313-0db49b459ad6",
+        "https://images.unsplash.com/photo-1501555088652-021faa106b9b"
+    ],
+    "Culture": [
+        "https://images.unsplash.com/photo-1524492707540-c50d87458ec2",
+        "https://images.unsplash.com/photo-1528127269322-539801943592",
+        "https://images.unsplash.com/photo-1533929736458-ca588d08c8be"
+    ],
+    "Food": [
+        "https://images.unsplash.com/photo-1504674900247-0877df9cc836",
+        "https://images.unsplash.com/photo-1476514525535-07fb3b4ae5f1",
+        "https://images.unsplash.com/photo-1482049016688-2d3e1b311543"
+    ],
+    "Luxury": [
+        "https://images.unsplash.com/photo-1566073771259-6a8506099945",
+        "https://images.unsplash.com/photo-1582719508461-905c673771fd",
+        "https://images.unsplash.com/photo-1571896349842-33c89424de2d"
+    ],
+    "Budget": [
+        "https://images.unsplash.com/photo-1523906834658-6e24ef2386f9",
+        "https://images.unsplash.com/photo-1506157786151-b8491531f063",
+        "https://images.unsplash.com/photo-1493246507139-91e8fad9978e"
+    ]
+}
+
+
+def generate_inspiration():
+    inspiration, _ = create_json(
+        INSPIRATION_SCHEMA, "inspiration",
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a precise JSON generator. Always respond with only valid, parseable JSON."
+            },
+            {
+                "role": "user",
+                "content": PROMPT
+            }
+        ],
+        temperature=0.8,
+        max_tokens=2500,
+    )
+    return inspiration
+
+
+def add_images(data):
+    """Return a copy of an inspiration set with a category image on every post."""
+    data = json.loads(json.dumps(data))
+
+    # Normalize keys to lowercase for robust matching
+    normalized_images = {k.lower(): v for k, v in CATEGORY_IMAGES.items()}
+    # Add common variations
+    normalized_images["cultural"] = normalized_images["culture"]
+
+    for post in data.get('posts', []):
+        cat = post.get('category', 'Culture').strip().lower()
+
+        # Map common variations to strict categories
+        if "beach" in cat: cat = "beach"
+        elif "culture" in cat or "cultural" in cat: cat = "culture"
+        elif "food" in cat or "dining" in cat: cat = "food"
+        elif "luxury" in cat: cat = "luxury"
+        elif "budget" in cat: cat = "budget"
+        elif "adventure" in cat: cat = "adventure"
+
+        img_list = normalized_images.get(cat, normalized_images["culture"])
+        base_url = random.choice(img_list)
+        post['image'] = f"{base_url}?auto=format&fit=crop&w=800&q=80"
+
+    return data
+
+
+class InspirationFeed:
+    """
+    A rotating pool of pre-generated inspiration sets. Requests are served
+    from memory; stale pools are refreshed in the background and the last
+    good sets keep being served when generation fails.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pool = []  # [(created_at, data)], oldest first
+        self._loaded = False
+        self._refreshing = False
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        if Config.INSPIRATION_BACKGROUND_REFRESH:
+            threading.Thread(target=self._refresh_loop, name="inspiration-refresher", daemon=True).start()
+
+    def get(self):
+        if not self._loaded:
+            self._load()
+        if not self._pool:
+            self.refresh()
+        elif self._is_stale():
+            self._refresh_async()
+        return random.choice(self._pool)[1]
+
+    def refresh(self):
+        """Generate one new set and rotate it into the pool."""
+        models = policy_version("inspiration")
+        data = ai_calls.do("inspiration", (models, PROMPT_VERSION), generate_inspiration)
+        created_at = datetime.utcnow()
+
+        try:
+            db.session.add(InspirationSet(payload=json.dumps(data), model=models, prompt_version=PROMPT_VERSION, created_at=created_at))
+            keep = [row_id for (row_id,) in db.session.query(InspirationSet.id)
+                    .filter_by(prompt_version=PROMPT_VERSION)
+                    .order_by(InspirationSet.created_at.desc())
+                    .limit(Config.INSPIRATION_POOL_SIZE)]
+            InspirationSet.query.filter(~InspirationSet.id.in_(keep)).delete(synchronize_session=False)
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.warning("Could not store inspiration set: %s", e)
+
+        with self._lock:
+            self._pool = (self._pool + [(created_at, data)])[-Config.INSPIRATION_POOL_SIZE:]
+        return data
+
+    # ------------------ internals ------------------
+
+    def _load(self):
+        try:
+            rows = (InspirationSet.query
+                    .filter_by(prompt_version=PROMPT_VERSION)
+                    .order_by(InspirationSet.created_at.desc())
+                    .limit(Config.INSPIRATION_POOL_SIZE)
+                    .all())
+            with self._lock:
+                self._pool = [(row.created_at, json.loads(row.payload)) for row in reversed(rows)]
+            self._loaded = True
+        except SQLAlchemyError as e:
+            # Left unloaded, so a later get() tries again (e.g. the warm-up ran before init_db.py)
+            db.session.rollback()
+            current_app.logger.warning("Could not load inspiration pool: %s", e)
+
+    def _is_stale(self):
+        newest = self._pool[-1][0]
+        return datetime.utcnow() - newest > timedelta(seconds=Config.INSPIRATION_MAX_AGE_SECONDS)
+
+    def _refresh_async(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_context, name="inspiration-revalidate", daemon=True).start()
+
+    def _refresh_in_context(self):
+        try:
+            with self.app.app_context():
+                self.refresh()
+        except Exception as e:
+            self.app.logger.warning("Inspiration refresh failed, serving last good sets: %s", e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _refresh_once(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        self._refresh_in_context()
+
+    def _warm(self):
+        # At startup: load the stored sets, and generate one now if there are
+        # none fresh, so the first request is not the one that waits for it
+        try:
+            with self.app.app_context():
+                if not self._loaded:
+                    self._load()
+        except Exception as e:
+            self.app.logger.warning("Could not warm the inspiration pool: %s", e)
+        if not self._pool or self._is_stale():
+            self._refresh_once()
+
+    def _refresh_loop(self):
+        self._warm()
+        while True:
+            time.sleep(Config.INSPIRATION_REFRESH_SECONDS)
+            self._refresh_once()
+
+
+inspiration_feed = InspirationFeed()
@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import json
+import threading
+import uuid
+
+from config import Config
+from extensions import db
+from models import Job
+from rate_limit import current_client, REPLAY_CLIENT
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """
+    Runs slow AI routes on a bounded worker pool instead of the WSGI request
+    thread. Each job replays the original route inside its own request
+    context, so results keep exactly the same JSON contract.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.routes = {}
+        self._executor = None
+        self._pending = 0
+        self._avg_seconds = 10.0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._generation = 0  # bumped on every status change, so watchers never miss one
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = Config.JOB_WORKERS
+        self.max_pending = Config.JOB_MAX_PENDING
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+
+    def register(self, kind, path, method="POST"):
+        self.routes[kind] = (path, method)
+
+    def _retry_after(self):
+        # Caller holds self._lock
+        waves = self._pending / max(self.workers, 1)
+        return max(1, int(waves * self._avg_seconds))
+
+    def submit(self, kind, payload=None):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFull(self._retry_after())
+            self._pending += 1
+
+        try:
+            job = Job(id=uuid.uuid4().hex, kind=kind, status="queued", payload=json.dumps(payload or {}))
+            db.session.add(job)
+            db.session.commit()
+            self._executor.submit(self._run, job.id, current_client())
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job
+
+    def depth(self):
+        with self._lock:
+            return self._pending
+
+    def generation(self):
+        with self._changed:
+            return self._generation
+
+    def wait_for_change(self, generation, timeout):
+        """
+        Block until a job run by this process changes status after
+        `generation` was read, or `timeout` passes (jobs run by another
+        worker are only seen by re-reading the table).
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: self._generation != generation, timeout)
+
+    def _notify(self):
+        with self._changed:
+            self._generation += 1
+            self._changed.notify_all()
+
+    def _run(self, job_id, client=None):
+        started = datetime.utcnow()
+        try:
+            with self.app.app_context():
+                job = db.session.get(Job, job_id)
+                job.status = "running"
+                job.started_at = started
+                db.session.commit()
+                self._notify()
+
+                path, method = self.routes[job.kind]
+                payload = json.loads(job.payload or "{}")
+                payload.pop("stream", None)
+
+                try:
+                    with self.app.test_request_context(
+                        path, method=method, json=payload if method != "GET" else None,
+                        query_string=payload if method == "GET" else None,
+                        environ_base={REPLAY_CLIENT: client} if client else None
+                    ):
+                        response = self.app.full_dispatch_request()
+                    job.result_status = response.status_code
+                    job.result = response.get_data(as_text=True)
+                    job.status = "succeeded" if response.status_code < 400 else "failed"
+                except Exception as e:
+                    db.session.rollback()
+                    job.status = "failed"
+                    job.error = str(e)
+
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                self._notify()
+        finally:
+            elapsed = (datetime.utcnow() - started).total_seconds()
+            with self._lock:
+                self._pending -= 1
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+
+
+job_queue = JobQueue()
@@ -0,0 +1,97 @@
+import json
+
+from sqlalchemy.types import Text, TypeDecorator
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+
+def loads(text):
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except ValueError:
+            pass  # e.g. NaN, which the stdlib accepts
+    return json.loads(text)
+
+
+def dumps(value):
+    """Compact JSON with sorted keys, matching Flask's jsonify ordering."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+class RawJSON(str):
+    """
+    JSON text as loaded from a JSONText column. It is still a str, so code
+    that treats the column as text keeps working, but parsed() decodes it at
+    most once. Assigning a new value to the attribute replaces the object,
+    which drops the cached parse with it.
+    """
+
+    def parsed(self):
+        try:
+            return self._parsed
+        except AttributeError:
+            self._parsed = loads(self)
+            return self._parsed
+
+
+class JSONText(TypeDecorator):
+    """
+    JSON stored in a TEXT column. Python values are encoded with the fast
+    codec on write (RawJSON is written as is) and rows load as RawJSON.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, RawJSON):
+            return value
+        return dumps(value)
+
+    def process_result_value(self, value, dialect):
+        return RawJSON(value) if value is not None else None
+
+
+def load_json(value, default=None):
+    """Parsed value of a JSONText attribute; the result is shared, so treat it as read-only."""
+    if value is None or value == "":
+        return default
+    if isinstance(value, RawJSON):
+        return value.parsed()
+    return value  # assigned as a Python object and not yet reloaded
+
+
+def as_raw(value, default=None):
+    """The attribute as RawJSON text, for encode_json() to splice in without parsing."""
+    if value is None or value == "":
+        return RawJSON(dumps(default))
+    if isinstance(value, RawJSON):
+        return value
+    return RawJSON(dumps(value))
+
+
+def encode_json(value):
+    """
+    dumps() that copies RawJSON values verbatim. Only dict values directly
+    under the top level (or under a top-level list) are checked, which covers
+    lists of to_dict(raw=True) results.
+    """
+    if isinstance(value, RawJSON):
+        return str(value)
+    if isinstance(value, list):
+        return "[" + ",".join(encode_json(item) for item in value) + "]"
+    if isinstance(value, dict):
+        return "{" + ",".join(
+            f"{dumps(str(key))}:{item if isinstance(item, RawJSON) else dumps(item)}"
+            for key, item in sorted(value.items(), key=lambda pair: str(pair[0]))
+        ) + "}"
+    return dumps(value)
@@ -0,0 +1,110 @@
+import copy
+
+
+class PatchError(Exception):
+    pass
+
+
+def _parse_pointer(path):
+    if path == "":
+        return []
+    if not isinstance(path, str) or not path.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer: {path!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")]
+
+
+def _index(container, token, for_add=False):
+    if token == "-" and for_add:
+        return len(container)
+    if not token.isdigit() or (token.startswith("0") and token != "0"):
+        raise PatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not for_add):
+        raise PatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _resolve(document, tokens):
+    target = document
+    for token in tokens:
+        if isinstance(target, list):
+            target = target[_index(target, token)]
+        elif isinstance(target, dict):
+            if token not in target:
+                raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+            target = target[token]
+        else:
+            raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+    return target
+
+
+def _add(document, tokens, value):
+    if not tokens:
+        return value
+    parent = _resolve(document, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, list):
+        parent.insert(_index(parent, key, for_add=True), value)
+    elif isinstance(parent, dict):
+        parent[key] = value
+    else:
+        raise PatchError(f"Cannot add to a scalar at /{'/'.join(tokens)}")
+    return document
+
+
+def _remove(document, tokens):
+    if not tokens:
+        raise PatchError("Cannot remove the whole document")
+    parent = _resolve(document, tokens[:-1])
+    key = tokens[-1]
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, key))
+    if isinstance(parent, dict) and key in parent:
+        return parent.pop(key)
+    raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+
+
+def apply_patch(document, operations):
+    """
+    Apply RFC 6902 operations to a copy of `document` and return it.
+    Raises PatchError if any operation fails; the input is never modified.
+    """
+    if not isinstance(operations, list):
+        raise PatchError("A JSON Patch must be a list of operations")
+
+    document = copy.deepcopy(document)
+    for operation in operations:
+        if not isinstance(operation, dict) or "op" not in operation or "path" not in operation:
+            raise PatchError("Every operation needs 'op' and 'path'")
+
+        op = operation["op"]
+        tokens = _parse_pointer(operation["path"])
+
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"'{op}' requires a value")
+
+        if op == "add":
+            document = _add(document, tokens, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            _remove(document, tokens)
+        elif op == "replace":
+            _resolve(document, tokens)  # must already exist
+            if tokens:
+                _remove(document, tokens)
+            document = _add(document, tokens, copy.deepcopy(operation["value"]))
+        elif op in ("move", "copy"):
+            source = _parse_pointer(operation.get("from"))
+            if op == "move":
+                if tokens[:len(source)] == source and tokens != source:
+                    raise PatchError("Cannot move a value into one of its children")
+                value = _remove(document, source)
+            else:
+                value = copy.deepcopy(_resolve(document, source))
+            document = _add(document, tokens, value)
+        elif op == "test":
+            if _resolve(document, tokens) != operation["value"]:
+                raise PatchError(f"Test failed at {operation['path']}")
+        else:
+            raise PatchError(f"Unsupported operation: {op!r}")
+
+    return document
@@ -0,0 +1,308 @@
+from collections import Counter as Tally
+import random
+import sys
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [count per bucket..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', bound)])} {count}")
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {round(series[-2], 6)}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, key)} {series[-1]}")
+        return lines
+
+
+class Gauges:
+    """Values read at scrape time from a callback returning {(label values...): number}."""
+
+    def __init__(self, name, help, labels, collect):
+        self.name, self.help, self.label_names, self.collect = name, help, tuple(labels), collect
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class StackSampler:
+    """
+    Low-overhead sampling profiler: a background thread snapshots the stacks
+    of the request threads that were picked for profiling.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._threads = {}  # thread id -> Tally of stacks
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._started = False
+
+    def start(self, thread_id):
+        with self._lock:
+            self._threads[thread_id] = Tally()
+            self._active.set()
+            if not self._started:
+                self._started = True
+                threading.Thread(target=self._run, name="stack-sampler", daemon=True).start()
+
+    def stop(self, thread_id):
+        with self._lock:
+            stacks = self._threads.pop(thread_id, None)
+            if not self._threads:
+                self._active.clear()
+            return stacks
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._threads:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, stacks in self._threads.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[self._signature(frame)] += 1
+
+    @staticmethod
+    def _signature(frame, depth=6):
+        parts = []
+        while frame is not None and len(parts) < depth:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+            frame = frame.f_back
+        return " <- ".join(parts)
+
+
+class Metrics:
+    """
+    Request, SQL and Groq instrumentation rendered in the Prometheus text
+    format. SQL statements are counted per request so N+1 patterns show up
+    as large db_queries_per_request values for a route.
+    """
+
+    def __init__(self):
+        self.collectors = []
+        self.http_latency = self.add(Histogram(
+            "http_request_duration_seconds", "Time to build the response", ["method", "route", "status"]))
+        self.http_queries = self.add(Histogram(
+            "db_queries_per_request", "SQL statements executed per request", ["route"], QUERY_COUNT_BUCKETS))
+        self.http_sql_time = self.add(Histogram(
+            "db_time_per_request_seconds", "Time spent in SQL per request", ["route"]))
+        self.sql_latency = self.add(Histogram(
+            "db_query_duration_seconds", "Latency of individual SQL statements", ["route"]))
+        self.groq_latency = self.add(Histogram(
+            "groq_request_duration_seconds", "Latency of Groq API calls (per attempt)", ["model", "outcome"]))
+        self.groq_requests = self.add(Counter(
+            "groq_requests_total", "Groq API calls by model and outcome (ok or error type)", ["model", "outcome"]))
+        self.groq_tokens = self.add(Counter(
+            "groq_tokens_total", "Tokens reported in completion.usage", ["model", "kind"]))
+        self.groq_prompt_tokens = self.add(Histogram(
+            "groq_prompt_tokens", "Prompt tokens per Groq call", ["model"], TOKEN_BUCKETS))
+        self.slow_requests = self.add(Counter(
+            "http_slow_requests_total", "Requests slower than SLOW_REQUEST_SECONDS", ["route"]))
+        self.json_parses = self.add(Counter(
+            "llm_json_parses_total", "Structured model outputs by result (ok, repaired, failed)", ["kind", "result"]))
+        self.json_repairs = self.add(Counter(
+            "llm_json_repairs_total", "Local fixes applied to model JSON before it validated", ["kind", "repair"]))
+        self.plan_continuations = self.add(Counter(
+            "llm_plan_continuations_total", "Follow-up calls for the days missing from a cut-off plan", []))
+        self.model_hedges = self.add(Counter(
+            "llm_hedged_requests_total", "Requests duplicated to an alternate model, by which one answered", ["route", "winner"]))
+        self.model_fallbacks = self.add(Counter(
+            "llm_model_fallbacks_total", "Requests moved to the next model after an error", ["route", "model", "reason"]))
+        self.rate_limited = self.add(Counter(
+            "http_rate_limited_total", "Requests refused with 429 by the rate limiter (crud, ai or quota)", ["limit"]))
+        self.quota_tokens = self.add(Counter(
+            "llm_quota_tokens_total", "Tokens charged to per-IP daily quotas", []))
+        self.gauge("llm_json_repair_rate", "Share of structured outputs that needed a local repair",
+                   ["kind"], self._json_repair_rate)
+        self.sampler = None
+
+    def add(self, collector):
+        self.collectors.append(collector)
+        return collector
+
+    def gauge(self, name, help, labels, collect):
+        self.add(Gauges(name, help, labels, collect))
+
+    def init_app(self, app):
+        self.app = app
+        if Config.SLOW_REQUEST_SECONDS > 0 and Config.SLOW_REQUEST_PROFILE_RATE > 0:
+            self.sampler = StackSampler(Config.SLOW_REQUEST_PROFILE_INTERVAL)
+        event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def render(self):
+        lines = []
+        for collector in self.collectors:
+            lines.extend(collector.render())
+        return "\n".join(lines) + "\n"
+
+    # ------------------ Groq ------------------
+
+    def record_completion(self, model, seconds, outcome="ok", usage=None):
+        model = model or "unknown"
+        self.groq_latency.observe(seconds, model=model, outcome=outcome)
+        self.groq_requests.inc(model=model, outcome=outcome)
+        if usage is not None:
+            self.record_usage(model, usage)
+
+    def record_usage(self, model, usage):
+        prompt = getattr(usage, "prompt_tokens", None) or 0
+        completion = getattr(usage, "completion_tokens", None) or 0
+        self.groq_tokens.inc(prompt, model=model, kind="prompt")
+        self.groq_tokens.inc(completion, model=model, kind="completion")
+        self.groq_prompt_tokens.observe(prompt, model=model)
+
+    def record_json_parse(self, kind, result, repairs=()):
+        self.json_parses.inc(kind=kind, result=result)
+        for repair in repairs:
+            self.json_repairs.inc(kind=kind, repair=repair)
+
+    def _json_repair_rate(self):
+        totals, repaired = {}, {}
+        with self.json_parses._lock:
+            for (kind, result), count in self.json_parses._values.items():
+                totals[kind] = totals.get(kind, 0) + count
+                if result == "repaired":
+                    repaired[kind] = repaired.get(kind, 0) + count
+        return {(kind,): round(repaired.get(kind, 0) / total, 4) for kind, total in totals.items()}
+
+    # ------------------ requests and SQL ------------------
+
+    @staticmethod
+    def _route():
+        rule = request.url_rule
+        return rule.rule if rule is not None else "unmatched"
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_seconds = 0.0
+        g.metrics_profiled = self.sampler is not None and random.random() < Config.SLOW_REQUEST_PROFILE_RATE
+        if g.metrics_profiled:
+            self.sampler.start(threading.get_ident())
+
+    def _after_request(self, response):
+        self._finish(response.status_code)
+        return response
+
+    def _teardown_request(self, exc):
+        # after_request is skipped when a view's exception propagates (debug,
+        # testing, PROPAGATE_EXCEPTIONS); such requests are counted as 500s here
+        self._finish(500)
+
+    def _finish(self, status):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        route = self._route()
+        self.http_latency.observe(elapsed, method=request.method, route=route, status=status)
+        self.http_queries.observe(g.sql_queries, route=route)
+        self.http_sql_time.observe(g.sql_seconds, route=route)
+
+        stacks = self.sampler.stop(threading.get_ident()) if g.get("metrics_profiled") else None
+        if Config.SLOW_REQUEST_SECONDS > 0 and elapsed >= Config.SLOW_REQUEST_SECONDS:
+            self.slow_requests.inc(route=route)
+            self._log_slow(route, elapsed, status, stacks)
+
+    def _log_slow(self, route, elapsed, status, stacks):
+        message = [f"Slow request {request.method} {request.path} ({route}) -> {status} in {elapsed:.3f}s, "
+                   f"{g.sql_queries} SQL statements in {g.sql_seconds:.3f}s"]
+        if stacks:
+            total = sum(stacks.values())
+            message.append(f"Sampled profile ({total} samples):")
+            for stack, count in stacks.most_common(5):
+                message.append(f"  {count / total:6.1%}  {stack}")
+        self.app.logger.warning("\n".join(message))
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("metrics_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        if has_request_context():
+            route = self._route()
+            if "sql_queries" in g:
+                g.sql_queries += 1
+                g.sql_seconds += elapsed
+        else:
+            route = "background"
+        self.sql_latency.observe(elapsed, route=route)
+
+
+metrics = Metrics()
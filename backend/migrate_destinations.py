@@ -0,0 +1,40 @@
+import json
+
+from app import app
+from extensions import db
+from models import Trip
+
+BATCH_SIZE = 200
+
+with app.app_context():
+    db.create_all()
+
+    migrated = skipped = 0
+    while True:
+        trips = (Trip.query
+                 .filter(Trip.destinations.isnot(None))
+                 .order_by(Trip.id)
+                 .offset(skipped)
+                 .limit(BATCH_SIZE)
+                 .all())
+        if not trips:
+            break
+
+        for trip in trips:
+            try:
+                destinations = json.loads(trip.destinations)
+            except ValueError:
+                destinations = None
+            if not isinstance(destinations, list):
+                print(f"⚠️  Trip {trip.id}: destinations is not a JSON list, left as is")
+                skipped += 1
+                continue
+            trip.set_destinations(destinations)
+            trip.updated_at = Trip.updated_at  # a backfill is not a user edit
+            migrated += 1
+
+        db.session.commit()
+
+    print(f"✅ Moved destinations of {migrated} trips into the destinations/activities tables")
+    if skipped:
+        print(f"⚠️  {skipped} trips skipped")
@@ -0,0 +1,444 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+import asyncio
+import contextvars
+import random
+import threading
+import time
+
+import groq
+
+from config import Config
+from groq_client import create_completion, create_completion_async, DeadlineExceeded
+from metrics import metrics
+
+# Rate limits are not retried on the same model: the router moves on instead
+ROUTED_RETRYABLE = (groq.APIConnectionError, groq.InternalServerError)
+FALLBACK_ERRORS = (groq.RateLimitError, groq.APIConnectionError, groq.InternalServerError, DeadlineExceeded)
+
+
+class _HedgeFailed(Exception):
+    def __init__(self, errors):
+        super().__init__(str(errors[0]))
+        self.errors = errors
+
+
+# Only hedged streams use the pool; _slots keeps them from queueing for a thread,
+# since time spent waiting for one would count against ROUTER_HEDGE_AFTER
+_executor = ThreadPoolExecutor(max_workers=Config.ROUTER_HEDGE_WORKERS, thread_name_prefix="model-hedge")
+_slots = threading.BoundedSemaphore(Config.ROUTER_HEDGE_WORKERS)
+
+
+class Policy:
+    """
+    Models for one endpoint, in order of preference. `small_model` goes
+    first for requests of at most `small_max` (e.g. trip days); `hedge`
+    enables a duplicate request to the next model when a streamed call has
+    not produced a token within ROUTER_HEDGE_AFTER.
+    """
+
+    def __init__(self, models, small_model=None, small_max=None, hedge=False):
+        self.models = list(dict.fromkeys(models))
+        self.small_model = small_model
+        self.small_max = small_max
+        self.hedge = hedge
+
+
+POLICIES = {
+    "chat": Policy([Config.ROUTER_LARGE_MODEL, Config.ROUTER_FAST_MODEL], hedge=True),
+    "chat-summary": Policy([Config.CHAT_SUMMARY_MODEL, Config.ROUTER_LARGE_MODEL]),
+    "itinerary": Policy([Config.ROUTER_LARGE_MODEL, Config.ROUTER_FAST_MODEL],
+                        small_model=Config.ROUTER_FAST_MODEL, small_max=Config.ROUTER_SHORT_TRIP_DAYS, hedge=True),
+    "plan-chunk": Policy([Config.ROUTER_LARGE_MODEL, Config.ROUTER_FAST_MODEL]),
+    "plan-summary": Policy([Config.AI_PLAN_SUMMARY_MODEL, Config.ROUTER_LARGE_MODEL]),
+    "insights": Policy([Config.ROUTER_FAST_MODEL, Config.ROUTER_LARGE_MODEL], hedge=True),
+    "inspiration": Policy(["openai/gpt-oss-120b", Config.ROUTER_LARGE_MODEL]),
+}
+DEFAULT_POLICY = Policy([Config.ROUTER_LARGE_MODEL, Config.ROUTER_FAST_MODEL])
+
+
+def policy_version(*routes):
+    """
+    Names the models `routes` may be served by, for AI cache keys and labels.
+    Any of them may have answered a cached call, so a policy change (e.g. a
+    new ROUTER_LARGE_MODEL) starts fresh entries instead of reusing old ones.
+    """
+    parts = []
+    for route in routes:
+        policy = POLICIES.get(route, DEFAULT_POLICY)
+        models = "+".join(policy.models)
+        if policy.small_model:
+            models += f";{policy.small_model}<={policy.small_max}"
+        parts.append(f"{route}={models}")
+    return ",".join(parts)
+
+
+class ModelStats:
+    """
+    Live per-model health: latency EWMAs per (route, model), since prompt
+    sizes differ by route, and an error-rate EWMA plus a rate-limit
+    cooldown per model. Streams record time to the first token and other
+    calls time to the full response, kept apart: only the first is
+    compared across models, since a bigger model writes more slowly.
+    """
+
+    def __init__(self, alpha=None):
+        self.alpha = alpha or Config.ROUTER_EWMA_ALPHA
+        self._latency = {}  # (route, model, "first_token" | "response") -> [ewma seconds, samples]
+        self._models = {}  # model -> {"requests", "errors", "error_rate", "in_flight", "cooldown_until"}
+        self._lock = threading.Lock()
+
+    def _model(self, model):
+        # Caller holds _lock
+        return self._models.setdefault(model, {
+            "requests": 0, "errors": 0, "error_rate": 0.0, "in_flight": 0, "cooldown_until": 0.0
+        })
+
+    def started(self, model):
+        with self._lock:
+            self._model(model)["in_flight"] += 1
+
+    def finished(self, route, model, seconds, ok, first_token=False):
+        with self._lock:
+            entry = self._model(model)
+            entry["in_flight"] -= 1
+            entry["requests"] += 1
+            entry["errors"] += 0 if ok else 1
+            entry["error_rate"] += self.alpha * ((0.0 if ok else 1.0) - entry["error_rate"])
+            if ok:
+                key = (route, model, "first_token" if first_token else "response")
+                latency = self._latency.get(key)
+                if latency is None:
+                    self._latency[key] = [seconds, 1]
+                else:
+                    latency[0] += self.alpha * (seconds - latency[0])
+                    latency[1] += 1
+
+    def abandoned(self, model):
+        # A cancelled hedge loser says nothing about the model's health
+        with self._lock:
+            self._model(model)["in_flight"] -= 1
+
+    def cool_down(self, model, seconds):
+        with self._lock:
+            entry = self._model(model)
+            entry["cooldown_until"] = max(entry["cooldown_until"], time.monotonic() + seconds)
+
+    def cooling_down(self, model):
+        with self._lock:
+            entry = self._models.get(model)
+            return entry is not None and entry["cooldown_until"] > time.monotonic()
+
+    def healthy(self, model):
+        with self._lock:
+            entry = self._models.get(model)
+            if entry is None:
+                return True
+            if entry["cooldown_until"] > time.monotonic():
+                return False
+            return entry["requests"] < Config.ROUTER_MIN_SAMPLES or entry["error_rate"] <= Config.ROUTER_MAX_ERROR_RATE
+
+    def latency(self, route, model):
+        """Time to the first token on `route`, once there are enough streamed samples."""
+        with self._lock:
+            latency = self._latency.get((route, model, "first_token"))
+        if latency is None or latency[1] < Config.ROUTER_MIN_SAMPLES:
+            return None
+        return latency[0]
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            models = {model: dict(entry, error_rate=round(entry["error_rate"], 4),
+                                  cooldown_seconds=round(max(0.0, entry["cooldown_until"] - now), 1))
+                      for model, entry in self._models.items()}
+            latency = {f"{route}:{model}:{kind}": {"latency_seconds": round(value, 4), "samples": samples}
+                       for (route, model, kind), (value, samples) in self._latency.items()}
+        for entry in models.values():
+            del entry["cooldown_until"]
+        return {"models": models, "latency": latency}
+
+    def gauges(self):
+        with self._lock:
+            values = {(route, model, f"{kind}_seconds"): round(value, 4)
+                      for (route, model, kind), (value, _) in self._latency.items()}
+            for model, entry in self._models.items():
+                values[("all", model, "error_rate")] = round(entry["error_rate"], 4)
+                values[("all", model, "in_flight")] = entry["in_flight"]
+        return values
+
+
+class _PeekedStream:
+    """A completion stream whose first content chunk has already arrived."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._iterator = iter(stream)
+        self._head = []
+        for chunk in self._iterator:
+            self._head.append(chunk)
+            if chunk.choices and chunk.choices[0].delta.content:
+                break
+
+    def __iter__(self):
+        yield from self._head
+        yield from self._iterator
+
+    def close(self):
+        self._stream.close()
+
+
+class _AsyncPeekedStream:
+    def __init__(self, stream):
+        self._stream = stream
+        self._iterator = stream.__aiter__()
+        self._head = []
+
+    async def peek(self):
+        async for chunk in self._iterator:
+            self._head.append(chunk)
+            if chunk.choices and chunk.choices[0].delta.content:
+                break
+        return self
+
+    async def __aiter__(self):
+        for chunk in self._head:
+            yield chunk
+        async for chunk in self._iterator:
+            yield chunk
+
+    async def close(self):
+        await self._stream.close()
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return Config.ROUTER_RATE_LIMIT_COOLDOWN
+
+
+class ModelRouter:
+    """
+    Picks the model for each Groq call from the endpoint's policy and the
+    live stats: rate-limited or failing models are skipped, and the first
+    choice gives way to an alternate whose first token has come much
+    sooner on this route. Streamed calls on interactive routes hedge: if
+    the first model has not produced a token within ROUTER_HEDGE_AFTER, the
+    next one is asked too and the first to answer wins. Rate-limit, connection and server errors fall
+    through to the next model.
+    """
+
+    def __init__(self):
+        self.stats = ModelStats()
+
+    def candidates(self, route, size=None, model=None):
+        """Models to try, best first. `model` is the caller's preference, `size` e.g. the trip length."""
+        policy = POLICIES.get(route, DEFAULT_POLICY)
+        models = list(policy.models)
+        if policy.small_model and size is not None and size <= policy.small_max:
+            models.insert(0, policy.small_model)
+        if model:
+            models.insert(0, model)
+        models = list(dict.fromkeys(models))
+
+        if random.random() < Config.ROUTER_EXPLORE_RATE:
+            # Policy order despite error rates and latency, so demoted models get new samples; a
+            # rate-limited model would only fail again, so it stays last until its cooldown ends
+            return [m for m in models if not self.stats.cooling_down(m)] + [m for m in models if self.stats.cooling_down(m)]
+        models = [m for m in models if self.stats.healthy(m)] + [m for m in models if not self.stats.healthy(m)]
+        if len(models) > 1:
+            first, alternate = self.stats.latency(route, models[0]), self.stats.latency(route, models[1])
+            if first and alternate and first > Config.ROUTER_SWITCH_RATIO * alternate:
+                models[0], models[1] = models[1], models[0]
+        return models
+
+    def _hedge_after(self, route, kwargs):
+        # A whole completion takes far longer than a first token, so only streams hedge
+        policy = POLICIES.get(route, DEFAULT_POLICY)
+        if not policy.hedge or not kwargs.get("stream") or Config.ROUTER_HEDGE_AFTER <= 0:
+            return None
+        return Config.ROUTER_HEDGE_AFTER
+
+    def _fell_back(self, route, model, error):
+        if isinstance(error, groq.RateLimitError):
+            self.stats.cool_down(model, _retry_after(error))
+            reason = "rate_limit"
+        else:
+            reason = type(error).__name__
+        metrics.model_fallbacks.inc(route=route, model=model, reason=reason)
+
+    # ------------------ threads (Flask) ------------------
+
+    def complete(self, route, size=None, model=None, **kwargs):
+        """create_completion routed by `route`'s policy; stream=True returns an iterable of chunks."""
+        models = self.candidates(route, size, model)
+        hedge_after = self._hedge_after(route, kwargs)
+        error = None
+        index = 0
+        while index < len(models):
+            candidate = models[index]
+            alternate = models[index + 1] if hedge_after and index + 1 < len(models) else None
+            try:
+                if alternate is None:
+                    return self._call(route, candidate, kwargs)
+                return self._hedged(route, candidate, alternate, hedge_after, kwargs)
+            except _HedgeFailed as e:
+                error = self._both_fell_back(route, candidate, alternate, e)
+                index += 2
+            except FALLBACK_ERRORS as e:
+                self._fell_back(route, candidate, e)
+                error = e
+                index += 1
+        raise error
+
+    def _both_fell_back(self, route, model, alternate, failure):
+        self._fell_back(route, model, failure.errors[0])
+        self._fell_back(route, alternate, failure.errors[1])
+        return failure.errors[0]
+
+    def _call(self, route, model, kwargs):
+        started = time.monotonic()
+        self.stats.started(model)
+        ok = False
+        try:
+            result = create_completion(model=model, retryable=ROUTED_RETRYABLE, **kwargs)
+            if kwargs.get("stream"):
+                result = _PeekedStream(result)
+            ok = True
+            return result
+        finally:
+            self.stats.finished(route, model, time.monotonic() - started, ok, first_token=bool(kwargs.get("stream")))
+
+    def _hedged(self, route, model, alternate, hedge_after, kwargs):
+        first = _start(self._call, route, model, kwargs)
+        if first is None:
+            # Every hedge thread is busy: make the call here, unhedged
+            return self._call(route, model, kwargs)
+        try:
+            return first.result(timeout=hedge_after)
+        except FutureTimeout:
+            pass
+
+        second = _start(self._call, route, alternate, kwargs)
+        if second is None:
+            return first.result()
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winners = [future for future in done if future.exception() is None]
+            if winners:
+                metrics.model_hedges.inc(route=route, winner="primary" if winners[0] is first else "hedge")
+                for future in list(pending) + winners[1:]:
+                    _drop(future)
+                return winners[0].result()
+        raise _hedge_failure(first.exception(), second.exception())
+
+    # ------------------ event loop (asgi.py) ------------------
+
+    async def complete_async(self, route, size=None, model=None, **kwargs):
+        models = self.candidates(route, size, model)
+        hedge_after = self._hedge_after(route, kwargs)
+        error = None
+        index = 0
+        while index < len(models):
+            candidate = models[index]
+            alternate = models[index + 1] if hedge_after and index + 1 < len(models) else None
+            try:
+                if alternate is None:
+                    return await self._call_async(route, candidate, kwargs)
+                return await self._hedged_async(route, candidate, alternate, hedge_after, kwargs)
+            except _HedgeFailed as e:
+                error = self._both_fell_back(route, candidate, alternate, e)
+                index += 2
+            except FALLBACK_ERRORS as e:
+                self._fell_back(route, candidate, e)
+                error = e
+                index += 1
+        raise error
+
+    async def _call_async(self, route, model, kwargs):
+        started = time.monotonic()
+        self.stats.started(model)
+        try:
+            result = await create_completion_async(model=model, retryable=ROUTED_RETRYABLE, **kwargs)
+            if kwargs.get("stream"):
+                result = await _AsyncPeekedStream(result).peek()
+        except asyncio.CancelledError:
+            self.stats.abandoned(model)
+            raise
+        except Exception:
+            self.stats.finished(route, model, time.monotonic() - started, False)
+            raise
+        self.stats.finished(route, model, time.monotonic() - started, True, first_token=bool(kwargs.get("stream")))
+        return result
+
+    async def _hedged_async(self, route, model, alternate, hedge_after, kwargs):
+        first = asyncio.ensure_future(self._call_async(route, model, kwargs))
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done:
+            return first.result()
+
+        second = asyncio.ensure_future(self._call_async(route, alternate, kwargs))
+        pending = {first, second}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [task for task in done if task.exception() is None]
+                if winners:
+                    metrics.model_hedges.inc(route=route, winner="primary" if winners[0] is first else "hedge")
+                    for task in winners[1:]:
+                        await _discard_async(task.result())
+                    return winners[0].result()
+            raise _hedge_failure(first.exception(), second.exception())
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+def _hedge_failure(first_error, second_error):
+    # Fall back past both models only when both errors are ones worth falling back on
+    for error in (first_error, second_error):
+        if not isinstance(error, FALLBACK_ERRORS):
+            return error
+    return _HedgeFailed([first_error, second_error])
+
+
+def _start(fn, *args):
+    """Run fn on a hedge thread that is free now, or return None when there is none."""
+    if not _slots.acquire(blocking=False):
+        return None
+
+    def run():
+        try:
+            return fn(*args)
+        finally:
+            _slots.release()
+
+    # Copy the context so the hedge threads charge the caller's quota (rate_limit.py)
+    return _executor.submit(contextvars.copy_context().run, run)
+
+
+def _drop(future):
+    # The losing side of a hedge: a call that has not started is never made
+    if future.cancel():
+        _slots.release()
+    else:
+        future.add_done_callback(_discard)
+
+
+def _discard(future):
+    # Close the loser's stream if it opened one
+    if future.exception() is None:
+        close = getattr(future.result(), "close", None)
+        if close is not None:
+            close()
+
+
+async def _discard_async(result):
+    close = getattr(result, "close", None)
+    if close is not None:
+        await close()
+
+
+router = ModelRouter()
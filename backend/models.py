@@ -2,6 +2,8 @@ from extensions import db
 from datetime import datetime
 import json
 
+from json_column import JSONText, load_json, as_raw
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -14,12 +16,17 @@ class User(db.Model):
     city = db.Column(db.String(100))
     country = db.Column(db.String(100))
     profile_photo = db.Column(db.String(500))
-    preferences = db.Column(db.Text)  # Store as JSON string
-    saved_destinations = db.Column(db.Text)  # Store as JSON string
+    preferences = db.Column(JSONText)
+    saved_destinations = db.Column(JSONText)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     trips = db.relationship("Trip", backref="user", cascade="all, delete-orphan", lazy=True)
 
+    @property
+    def etag(self):
+        return version_tag(self.id, self.updated_at or self.created_at)
+
     def to_dict(self):
         return {
             '_id': str(self.id),
@@ -30,8 +37,8 @@ class User(db.Model):
             'city': self.city or '',
             'country': self.country or '',
             'profile_photo': self.profile_photo or '',
-            'preferences': json.loads(self.preferences) if self.preferences else {"currency": "USD", "language": "en", "privacy": "public"},
-            'saved_destinations': json.loads(self.saved_destinations) if self.saved_destinations else []
+            'preferences': load_json(self.preferences, {"currency": "USD", "language": "en", "privacy": "public"}),
+            'saved_destinations': load_json(self.saved_destinations, [])
         }
 
 class Trip(db.Model):
@@ -44,28 +51,290 @@ class Trip(db.Model):
     start_date = db.Column(db.String(20))
     end_date = db.Column(db.String(20))
     cover_image = db.Column(db.String(500))
-    destinations = db.Column(db.Text)  # Store as JSON string
-    budget = db.Column(db.Text)  # Store as JSON string
+    destinations = db.Column(JSONText)  # Legacy, moved into destination_rows by migrate_destinations.py
+    budget = db.Column(JSONText)
     status = db.Column(db.String(50), default='planning')
     visibility = db.Column(db.String(20), default='private')
     ai_generated = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    def to_dict(self):
-        return {
+    destination_rows = db.relationship("Destination", backref="trip", cascade="all, delete-orphan",
+                                       order_by="Destination.position", lazy=True)
+    share = db.relationship("TripShare", backref="trip", cascade="all, delete-orphan", uselist=False, lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_trips_user_created', 'user_id', 'created_at', 'id'),
+    )
+
+    # Card fields for list views; skips the (potentially large) destinations blob
+    SUMMARY_FIELDS = ['_id', 'user_id', 'name', 'description', 'start_date', 'end_date', 'cover_image',
+                      'budget', 'status', 'visibility', 'ai_generated', 'created_at', 'updated_at']
+
+    def to_dict(self, fields=None, raw=False):
+        """raw=True leaves stored JSON unparsed (RawJSON) for json_column.encode_json()."""
+        wants = lambda name: fields is None or name in fields
+        budget = as_raw if raw else load_json
+        data = {
             '_id': str(self.id),
             'user_id': str(self.user_id),
             'name': self.name,
-            'description': self.description or '',
+            'description': (self.description or '') if wants('description') else None,
             'start_date': self.start_date,
             'end_date': self.end_date,
             'cover_image': self.cover_image or '',
-            'destinations': json.loads(self.destinations) if self.destinations else [],
-            'budget': json.loads(self.budget) if self.budget else {"total": 0, "transport": 0, "stay": 0, "activities": 0, "food": 0},
+            'destinations': self.destinations_list(raw) if wants('destinations') else None,
+            'budget': budget(self.budget, {"total": 0, "transport": 0, "stay": 0, "activities": 0, "food": 0}) if wants('budget') else None,
             'status': self.status,
             'visibility': self.visibility,
             'ai_generated': self.ai_generated,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+        if fields is not None:
+            data = {key: value for key, value in data.items() if key in fields}
+        return data
+
+    def destinations_list(self, raw=False):
+        if self.destinations:
+            return as_raw(self.destinations) if raw else load_json(self.destinations)
+        return [destination.to_dict() for destination in self.destination_rows]
+
+    def set_destinations(self, destinations):
+        """
+        Sync rows with the wire format position by position. Unchanged rows
+        are not written, so appending one activity inserts a single row.
+        """
+        destinations = destinations or []
+        rows = [] if self.destinations else list(self.destination_rows)
+        for position, data in enumerate(destinations):
+            if position == len(rows):
+                rows.append(Destination())
+            rows[position].assign(data, position, self)
+        self.destination_rows = rows[:len(destinations)]
+        self.destinations = None
+        # Row-only edits leave the trips row untouched, so bump its version here
+        self.updated_at = datetime.utcnow()
+
+    @property
+    def etag(self):
+        """Version tag for optimistic concurrency, derived from updated_at."""
+        return version_tag(self.id, self.updated_at)
+
+def version_tag(row_id, updated_at):
+    """Strong ETag for a row; callers can build it from two columns without loading the row."""
+    stamp = updated_at.isoformat() if updated_at else ''
+    return f'"{row_id}-{stamp}"'
+
+def _number(value):
+    """Numbers go into typed columns; anything else is kept verbatim in `extra`."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _plain_number(value):
+    return int(value) if value is not None and float(value).is_integer() else value
+
+class Destination(db.Model):
+    __tablename__ = 'destinations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    trip_id = db.Column(db.Integer, db.ForeignKey('trips.id'), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    city = db.Column(db.String(100))
+    country = db.Column(db.String(100))
+    start_date = db.Column(db.String(20))
+    end_date = db.Column(db.String(20))
+    budget = db.Column(db.Float)
+    extra = db.Column(db.JSON)  # Any other keys sent by clients
+
+    activities = db.relationship("Activity", backref="destination", cascade="all, delete-orphan",
+                                 order_by="Activity.position", lazy=True)
+
+    TEXT_FIELDS = ['city', 'country', 'start_date', 'end_date']
+    NUMBER_FIELDS = ['budget']
+
+    def assign(self, data, position, trip):
+        self.position = position
+        values = dict.fromkeys(self.TEXT_FIELDS + self.NUMBER_FIELDS)
+        extra = {}
+        for key, value in data.items():
+            if key == 'activities':
+                continue
+            if key in self.TEXT_FIELDS and isinstance(value, str):
+                values[key] = value
+            elif key in self.NUMBER_FIELDS and _number(value):
+                values[key] = value
+            else:
+                # Explicit nulls stay in extra too, so to_dict returns them as null rather than dropping the key
+                extra[key] = value
+        for key, value in values.items():
+            setattr(self, key, value)
+        self.extra = extra or None
+
+        activities = data.get('activities') or []
+        rows = list(self.activities)
+        for index, activity in enumerate(activities):
+            if index == len(rows):
+                rows.append(Activity(trip=trip))
+            rows[index].assign(activity, index)
+        self.activities = rows[:len(activities)]
+
+    def to_dict(self):
+        data = {key: getattr(self, key) for key in self.TEXT_FIELDS if getattr(self, key) is not None}
+        if self.budget is not None:
+            data['budget'] = _plain_number(self.budget)
+        data.update(self.extra or {})
+        data['activities'] = [activity.to_dict() for activity in self.activities]
+        return data
+
+class Activity(db.Model):
+    __tablename__ = 'activities'
+
+    id = db.Column(db.Integer, primary_key=True)
+    destination_id = db.Column(db.Integer, db.ForeignKey('destinations.id'), nullable=False, index=True)
+    trip_id = db.Column(db.Integer, db.ForeignKey('trips.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    day = db.Column(db.Integer)
+    name = db.Column(db.String(300))
+    time = db.Column(db.String(50))
+    duration = db.Column(db.JSON)  # "2 hours" from the AI planner, a number of hours from the editor
+    cost = db.Column(db.Float)
+    type = db.Column(db.String(50))
+    description = db.Column(db.Text)
+    location = db.Column(db.String(300))
+    extra = db.Column(db.JSON)  # Any other keys sent by clients
+
+    trip = db.relationship("Trip")
+
+    __table_args__ = (
+        db.Index('ix_activities_trip_day', 'trip_id', 'day'),
+    )
+
+    TEXT_FIELDS = ['name', 'time', 'type', 'description', 'location']
+    NUMBER_FIELDS = ['day', 'cost']
+
+    def assign(self, data, position):
+        self.position = position
+        values = dict.fromkeys(self.TEXT_FIELDS + self.NUMBER_FIELDS + ['duration'])
+        extra = {}
+        for key, value in data.items():
+            if key in self.TEXT_FIELDS and isinstance(value, str):
+                values[key] = value
+            elif key in self.NUMBER_FIELDS and _number(value) and (key != 'day' or float(value).is_integer()):
+                values[key] = value
+            elif key == 'duration' and value is not None:
+                values[key] = value
+            else:
+                extra[key] = value
+        for key, value in values.items():
+            setattr(self, key, value)
+        self.extra = extra or None
+
+    def to_dict(self):
+        data = {key: getattr(self, key) for key in self.TEXT_FIELDS if getattr(self, key) is not None}
+        if self.day is not None:
+            data['day'] = self.day
+        if self.duration is not None:
+            data['duration'] = self.duration
+        if self.cost is not None:
+            data['cost'] = _plain_number(self.cost)
+        data.update(self.extra or {})
+        return data
+
+class TripShare(db.Model):
+    __tablename__ = 'trip_shares'
+
+    token = db.Column(db.String(32), primary_key=True)
+    trip_id = db.Column(db.Integer, db.ForeignKey('trips.id'), nullable=False, unique=True)
+    snapshot = db.Column(db.Text)  # Sanitized public JSON, served verbatim
+    etag = db.Column(db.String(64))
+    trip_version = db.Column(db.DateTime)  # Trip.updated_at the snapshot was built from
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AICacheEntry(db.Model):
+    __tablename__ = 'ai_cache'
+
+    key = db.Column(db.String(64), primary_key=True)
+    namespace = db.Column(db.String(50), nullable=False, index=True)
+    payload = db.Column(db.Text, nullable=False)  # Store as JSON string
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_hit_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='queued', index=True)  # queued, running, succeeded, failed
+    payload = db.Column(db.Text)  # Store as JSON string
+    result = db.Column(db.Text)  # Store as JSON string
+    result_status = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'result': json.loads(self.result) if self.result else None,
+            'result_status': self.result_status,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class InspirationSet(db.Model):
+    __tablename__ = 'inspiration_sets'
+
+    id = db.Column(db.Integer, primary_key=True)
+    payload = db.Column(db.Text, nullable=False)  # Store as JSON string
+    model = db.Column(db.String(100))
+    prompt_version = db.Column(db.Integer, default=1)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class ChatSession(db.Model):
+    __tablename__ = 'chat_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    summary = db.Column(db.Text)  # Rolling summary of turns that left the context window
+    summarized_through = db.Column(db.Integer, default=0)  # Last ChatMessage.id folded into the summary
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    messages = db.relationship("ChatMessage", backref="session", cascade="all, delete-orphan",
+                               order_by="ChatMessage.id", lazy="dynamic")
+
+    def to_dict(self):
+        return {
+            'session_id': self.id,
+            'user_id': str(self.user_id) if self.user_id else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class ChatMessage(db.Model):
+    __tablename__ = 'chat_messages'
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.String(32), db.ForeignKey('chat_sessions.id'), nullable=False)
+    role = db.Column(db.String(20), nullable=False)  # user, assistant
+    content = db.Column(db.Text, nullable=False)
+    tokens = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_chat_messages_session_id', 'session_id', 'id'),
+    )
+
+    def to_dict(self):
+        return {
+            'role': self.role,
+            'content': self.content,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
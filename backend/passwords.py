@@ -0,0 +1,97 @@
+import threading
+import time
+
+import bcrypt
+
+from config import Config
+
+# bcrypt releases the GIL while hashing, so it runs on the request thread
+# itself (handing it to a pool would still leave that thread waiting).
+# _hashing caps how many cores a login storm uses; _slots caps how many
+# requests may wait for one before the rest are turned away.
+_hashing = threading.BoundedSemaphore(Config.BCRYPT_WORKERS)
+_slots = threading.BoundedSemaphore(Config.BCRYPT_WORKERS + Config.BCRYPT_MAX_QUEUE)
+_dummy_hash = None
+_dummy_lock = threading.Lock()
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise HashingBusy("Too many password checks in progress")
+    try:
+        with _hashing:
+            return fn(*args)
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    return _run(lambda: bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=Config.BCRYPT_ROUNDS)))
+
+
+def check_password(password, hashed):
+    return _run(bcrypt.checkpw, password.encode("utf-8"), hashed)
+
+
+def check_unknown_email(password):
+    """Spend a real check's time on an email with no user, so timing does not tell which emails exist."""
+    global _dummy_hash
+    with _dummy_lock:
+        if _dummy_hash is None:
+            _dummy_hash = bcrypt.hashpw(b"unknown-email", bcrypt.gensalt(rounds=Config.BCRYPT_ROUNDS))
+    return check_password(password, _dummy_hash)
+
+
+def needs_rehash(hashed):
+    """True when the stored hash was made with a different work factor."""
+    try:
+        return int(hashed.split(b"$")[2]) != Config.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
+class UnknownEmailCache:
+    """
+    Short-lived negative cache of emails that had no user. It is only
+    consulted after the users table missed, to skip the check_unknown_email
+    cost for repeated attempts, so a stale entry (say, for an email just
+    registered through another worker) never turns away a real user.
+    """
+
+    def __init__(self, ttl_seconds=None, max_entries=10000):
+        self.ttl = ttl_seconds if ttl_seconds is not None else Config.UNKNOWN_EMAIL_TTL_SECONDS
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, email):
+        with self._lock:
+            expires_at = self._entries.get(email)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._entries[email]
+                return False
+            return True
+
+    def add(self, email):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.monotonic()
+                self._entries = {e: t for e, t in self._entries.items() if t >= now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[email] = time.monotonic() + self.ttl
+
+    def discard(self, email):
+        with self._lock:
+            self._entries.pop(email, None)
+
+
+unknown_emails = UnknownEmailCache()
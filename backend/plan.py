@@ -1,18 +1,33 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-from groq import Groq
-import os
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from extensions import db
+from database import configure as configure_database
+from config import Config
+from models import AICacheEntry
+from ai_cache import AICache, normalize_place
+from plan_chunks import generate_in_chunks, should_chunk
+from structured_output import create_json, StructuredOutputError, ITINERARY_SCHEMA
 
 load_dotenv()
 
 app = Flask(__name__)
+app.config.from_object(Config)
 CORS(app) # Enable CORS for all routes
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# The persistent cache tier is only available when a database is configured
+if Config.SQLALCHEMY_DATABASE_URI:
+    configure_database(app)
+    db.init_app(app)
+    with app.app_context():
+        AICacheEntry.__table__.create(db.engine, checkfirst=True)
 
 MODEL = "llama-3.3-70b-versatile"  # Fast and excellent for structured output
+PROMPT_VERSION = 1
+
+itinerary_cache = AICache("itinerary")
 
 @app.route("/itinerary", methods=["POST"])
 def generate_itinerary():
@@ -54,6 +69,32 @@ def generate_itinerary():
     if num_days < 1 or num_days > 30:
         return jsonify({"error": "Invalid date range (must be 1-30 days)"}), 400
 
+    cache_key = itinerary_cache.make_key(
+        city=normalize_place(city),
+        country=normalize_place(country),
+        num_days=num_days,
+        start_weekday=start.weekday(),
+        start_month=start.month,
+        model=MODEL,
+        prompt_version=PROMPT_VERSION
+    )
+    cached = itinerary_cache.get(cache_key)
+    if cached is not None:
+        return jsonify({
+            "success": True,
+            "itinerary": restamp_itinerary(cached, city, country, start, end),
+            "model": MODEL,
+            "cached": True
+        })
+
+    if should_chunk(num_days):
+        try:
+            itinerary = generate_chunked_itinerary(city, country, start, end, num_days)
+            itinerary_cache.set(cache_key, itinerary)
+            return jsonify({"success": True, "itinerary": itinerary, "model": MODEL})
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+
     # Build dynamic prompt
     prompt = f"""
 You are an expert travel planner.
@@ -90,7 +131,8 @@ Output ONLY valid JSON in this exact structure (no extra text or markdown):
 - Ensure JSON is perfectly valid and parseable
 """
     try:
-        chat_completion = client.chat.completions.create(
+        parsed_json, _ = create_json(
+            ITINERARY_SCHEMA, "itinerary",
             messages=[
                 {
                     "role": "system",
@@ -102,38 +144,94 @@ Output ONLY valid JSON in this exact structure (no extra text or markdown):
                 }
             ],
             model=MODEL,
+            size=num_days,
             temperature=0.7,
             max_tokens=2048,
         )
-
-        response_text = chat_completion.choices[0].message.content.strip()
-
-        # Return both raw and parsed (if possible)
-        try:
-            import json
-            parsed_json = json.loads(response_text)
-            return jsonify({
-                "success": True,
-                "itinerary": parsed_json,
-                "model": MODEL
-            })
-        except json.JSONDecodeError:
-            # Fallback: return raw if parsing fails (rare with good prompt)
-            return jsonify({
-                "success": True,
-                "itinerary_raw": response_text,
-                "warning": "Response not perfect JSON - check formatting",
-                "model": MODEL
-            })
+        itinerary_cache.set(cache_key, parsed_json)
+        return jsonify({
+            "success": True,
+            "itinerary": parsed_json,
+            "model": MODEL
+        })
+
+    except StructuredOutputError as e:
+        # Fallback: return raw if even the tolerant parser gives up
+        return jsonify({
+            "success": True,
+            "itinerary_raw": e.text,
+            "warning": "Response not perfect JSON - check formatting",
+            "model": MODEL
+        })
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def generate_chunked_itinerary(city, country, start, end, num_days):
+    """Generate long trips as parallel day-range chunks and merge them in order."""
+    def day_prompt(first_day, last_day):
+        first_date = start + timedelta(days=first_day - 1)
+        last_date = start + timedelta(days=last_day - 1)
+        return f"""
+You are an expert travel planner.
+
+This is part of a {num_days}-day trip to {city}, {country}.
+Plan ONLY days {first_day} to {last_day} ({first_date.strftime("%Y-%m-%d")} to {last_date.strftime("%Y-%m-%d")}).
+
+Output ONLY valid JSON in this exact structure (no extra text or markdown):
+
+{{
+  "days": [
+    {{
+      "day": "Day {first_day}: {first_date.strftime("%B")} {first_date.day}",
+      "activities": [
+        {{"id": 1, "time": "10:00 AM", "title": "Activity Title", "description": "Short description"}},
+        ...
+      ]
+    }},
+    ...
+  ]
+}}
+
+- Each day should have 3–5 activities
+- For 'title', use specific, real-world place names that are easily searchable on Google Maps
+- Time in 12-hour format with AM/PM
+"""
+
+    _, days = generate_in_chunks(
+        MODEL,
+        "You are a precise JSON generator. Always output only valid JSON with no explanations.",
+        num_days,
+        day_prompt
+    )
+    return restamp_itinerary({"days": days}, city, country, start, end)
+
+
+def restamp_itinerary(itinerary, city, country, start, end):
+    """Apply the caller's place spelling and dates to a cached itinerary."""
+    itinerary = dict(itinerary)
+    itinerary["city"] = city
+    itinerary["country"] = country
+    itinerary["startDate"] = start.strftime("%Y-%m-%d")
+    itinerary["endDate"] = end.strftime("%Y-%m-%d")
+    days = []
+    for index, day in enumerate(itinerary.get("days", [])):
+        date = start + timedelta(days=index)
+        days.append(dict(day, day=f"Day {index + 1}: {date.strftime('%B')} {date.day}"))
+    itinerary["days"] = days
+    return itinerary
+
+
 @app.route("/health", methods=["GET"])
 def health():
     return jsonify({"status": "ok", "service": "Dynamic Travel Itinerary API"})
 
 
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(itinerary_cache.stats())
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,140 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+
+from config import Config
+from metrics import metrics
+from structured_output import create_json, create_json_async, StructuredOutputError, DAYS_SCHEMA, PLAN_SUMMARY_SCHEMA
+
+_executor = ThreadPoolExecutor(max_workers=Config.AI_PLAN_CHUNK_WORKERS, thread_name_prefix="plan-chunk")
+
+TOKENS_PER_DAY = 700
+CHUNK_RETRIES = 2  # extra rounds for chunks that came back with fewer days than asked
+
+
+def should_chunk(num_days):
+    return 0 < Config.AI_PLAN_CHUNK_THRESHOLD < num_days
+
+
+def day_ranges(num_days, chunk_days=None, first_day=1):
+    """Split first_day..num_days into inclusive (first_day, last_day) ranges."""
+    chunk_days = max(1, chunk_days or Config.AI_PLAN_CHUNK_DAYS)
+    return [(first, min(first + chunk_days - 1, num_days)) for first in range(first_day, num_days + 1, chunk_days)]
+
+
+def _json_request(model, system_prompt, prompt, max_tokens, temperature):
+    return {
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+
+
+def complete_json(model, system_prompt, prompt, max_tokens, temperature=0.7, schema=DAYS_SCHEMA, kind="plan-chunk"):
+    value, _ = create_json(schema, kind, **_json_request(model, system_prompt, prompt, max_tokens, temperature))
+    return value
+
+
+async def complete_json_async(model, system_prompt, prompt, max_tokens, temperature=0.7, schema=DAYS_SCHEMA,
+                              kind="plan-chunk"):
+    value, _ = await create_json_async(schema, kind, **_json_request(model, system_prompt, prompt, max_tokens, temperature))
+    return value
+
+
+def _chunk_tokens(first, last):
+    return min(3000, TOKENS_PER_DAY * (last - first + 1))
+
+
+def _collect(days, ranges, chunks):
+    """
+    Store each chunk's days in `days` by day number. Returns the ranges
+    that came back short, starting at their first missing day, so they can
+    be asked for again the way continue_plan fills in a cut-off plan.
+    """
+    short = []
+    for (first, last), chunk in zip(ranges, chunks):
+        got = chunk.get("days", [])[:last - first + 1]
+        for offset, day in enumerate(got):
+            days[first + offset] = day
+        if first + len(got) <= last:
+            short.append((first + len(got), last))
+    if short:
+        metrics.plan_continuations.inc(len(short))
+    return short
+
+
+def _join_days(days, short):
+    # A short plan would be renumbered and re-dated by restamp_itinerary, shifting every later day
+    if short:
+        first, last = short[0]
+        raise StructuredOutputError(f"Model left out days {first}-{last} of the plan")
+    return [days[number] for number in sorted(days)]
+
+
+def _submit_chunks(model, system_prompt, day_prompt, ranges):
+    return [
+        _executor.submit(
+            contextvars.copy_context().run, complete_json, model, system_prompt, day_prompt(first, last),
+            _chunk_tokens(first, last)
+        )
+        for first, last in ranges
+    ]
+
+
+def _chunk_calls(model, system_prompt, day_prompt, ranges):
+    return [
+        complete_json_async(model, system_prompt, day_prompt(first, last), _chunk_tokens(first, last))
+        for first, last in ranges
+    ]
+
+
+def generate_in_chunks(model, system_prompt, num_days, day_prompt, summary_prompt=None, first_day=1):
+    """
+    Generate every day range concurrently and return (summary, days).
+    `day_prompt(first_day, last_day)` must ask for {"days": [...]};
+    `summary_prompt`, if given, runs as one cheap call on the summary model.
+    A `first_day` above 1 fills in the rest of a plan that was cut short.
+    """
+    ranges = day_ranges(num_days, first_day=first_day)
+    chunk_futures = _submit_chunks(model, system_prompt, day_prompt, ranges)
+    summary_future = None
+    if summary_prompt:
+        summary_future = _executor.submit(
+            contextvars.copy_context().run, complete_json, Config.AI_PLAN_SUMMARY_MODEL, system_prompt, summary_prompt, 600,
+            schema=PLAN_SUMMARY_SCHEMA, kind="plan-summary"
+        )
+
+    days = {}
+    short = _collect(days, ranges, [future.result() for future in chunk_futures])
+    for _ in range(CHUNK_RETRIES):
+        if not short:
+            break
+        retries = _submit_chunks(model, system_prompt, day_prompt, short)
+        short = _collect(days, short, [future.result() for future in retries])
+
+    summary = summary_future.result() if summary_future else {}
+    return summary, _join_days(days, short)
+
+
+async def generate_in_chunks_async(model, system_prompt, num_days, day_prompt, summary_prompt=None, first_day=1):
+    """generate_in_chunks on the event loop: the chunk calls are gathered instead of pooled."""
+    ranges = day_ranges(num_days, first_day=first_day)
+    calls = _chunk_calls(model, system_prompt, day_prompt, ranges)
+    if summary_prompt:
+        calls.append(complete_json_async(Config.AI_PLAN_SUMMARY_MODEL, system_prompt, summary_prompt, 600,
+                                         schema=PLAN_SUMMARY_SCHEMA, kind="plan-summary"))
+
+    results = await asyncio.gather(*calls)
+    summary = results.pop() if summary_prompt else {}
+
+    days = {}
+    short = _collect(days, ranges, results)
+    for _ in range(CHUNK_RETRIES):
+        if not short:
+            break
+        short = _collect(days, short, await asyncio.gather(*_chunk_calls(model, system_prompt, day_prompt, short)))
+    return summary, _join_days(days, short)
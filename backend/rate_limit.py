@@ -0,0 +1,300 @@
+from collections import namedtuple
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+import math
+import sqlite3
+import threading
+import time
+
+from flask import g, jsonify, request
+
+from config import Config
+from metrics import metrics
+
+# WSGI environ key a replayed job carries its submitter's client key in (jobs.py)
+REPLAY_CLIENT = "globetrotter.rate_limit_client"
+EXEMPT_PATHS = {"/api/health", "/api/metrics"}
+HEADERS = ["Retry-After", "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset",
+           "X-Quota-Limit", "X-Quota-Remaining"]
+
+# Buckets idle this long are full again (at the default rates) and can be forgotten
+IDLE_SECONDS = 3600
+MAX_MEMORY_KEYS = 10000
+PRUNE_EVERY = 1000
+
+# The client the current request is charged to; set per request, read when usage comes back
+_client = ContextVar("rate_limit_client", default=None)
+
+Decision = namedtuple("Decision", ["allowed", "error", "retry_after", "headers"])
+
+
+def client_key(remote_addr):
+    return f"ip:{remote_addr or 'unknown'}"
+
+
+def user_key(user_id):
+    return f"user:{user_id}" if user_id not in (None, "") else None
+
+
+def current_client():
+    return _client.get()
+
+
+def _day(now):
+    """The UTC day `now` falls in, and the seconds until the next one starts."""
+    moment = datetime.utcfromtimestamp(now)
+    midnight = datetime(moment.year, moment.month, moment.day) + timedelta(days=1)
+    return moment.date().isoformat(), (midnight - moment).total_seconds()
+
+
+def _usage_tokens(usage):
+    total = getattr(usage, "total_tokens", None)
+    if total is None:
+        total = (getattr(usage, "prompt_tokens", None) or 0) + (getattr(usage, "completion_tokens", None) or 0)
+    return total or 0
+
+
+class Bucket:
+    def __init__(self, name, per_minute, burst):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.capacity = burst
+
+    def take(self, tokens, updated, now):
+        """Refill for the time since `updated`, then spend one token. Returns (allowed, tokens, wait)."""
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+        if tokens >= 1:
+            return True, tokens - 1, 0.0
+        return False, tokens, (1 - tokens) / self.rate
+
+    def reset_after(self, tokens):
+        return math.ceil((self.capacity - tokens) / self.rate)
+
+
+class MemoryStore:
+    """Buckets and daily usage for this process only."""
+
+    def __init__(self):
+        self._buckets = {}  # (bucket, key) -> (tokens, updated)
+        self._usage = {}  # (key, day) -> tokens
+        self._day = None
+        self._lock = threading.Lock()
+
+    def take(self, bucket, key, now):
+        with self._lock:
+            tokens, updated = self._buckets.get((bucket.name, key), (bucket.capacity, now))
+            allowed, tokens, wait = bucket.take(tokens, updated, now)
+            self._buckets[(bucket.name, key)] = (tokens, now)
+            if len(self._buckets) > MAX_MEMORY_KEYS:
+                self._buckets = {
+                    name: state for name, state in self._buckets.items() if now - state[1] < IDLE_SECONDS
+                }
+        return allowed, tokens, wait
+
+    def used(self, key, day):
+        with self._lock:
+            return self._usage.get((key, day), 0)
+
+    def charge(self, key, day, tokens):
+        with self._lock:
+            if day != self._day:
+                self._usage = {name: used for name, used in self._usage.items() if name[1] == day}
+                self._day = day
+            self._usage[(key, day)] = self._usage.get((key, day), 0) + tokens
+
+
+class SQLiteStore:
+    """
+    Buckets and daily usage in one SQLite file, so every worker process on
+    the host draws from the same buckets. Each take is a short BEGIN
+    IMMEDIATE transaction; WAL keeps the quota reads from blocking it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            "bucket TEXT NOT NULL, key TEXT NOT NULL, tokens REAL NOT NULL, updated REAL NOT NULL, "
+            "PRIMARY KEY (bucket, key))"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_usage ("
+            "key TEXT NOT NULL, day TEXT NOT NULL, tokens INTEGER NOT NULL, "
+            "PRIMARY KEY (key, day))"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=Config.SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, bucket, key, now):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM rate_buckets WHERE bucket = ? AND key = ?", (bucket.name, key)
+            ).fetchone()
+            tokens, updated = row or (bucket.capacity, now)
+            allowed, tokens, wait = bucket.take(tokens, updated, now)
+            conn.execute(
+                "INSERT INTO rate_buckets (bucket, key, tokens, updated) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (bucket, key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (bucket.name, key, tokens, now)
+            )
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM rate_buckets WHERE updated < ?", (now - IDLE_SECONDS,))
+                conn.execute("DELETE FROM token_usage WHERE day < ?", (_day(now)[0],))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, tokens, wait
+
+    def used(self, key, day):
+        row = self._conn().execute("SELECT tokens FROM token_usage WHERE key = ? AND day = ?", (key, day)).fetchone()
+        return row[0] if row else 0
+
+    def charge(self, key, day, tokens):
+        self._conn().execute(
+            "INSERT INTO token_usage (key, day, tokens) VALUES (?, ?, ?) "
+            "ON CONFLICT (key, day) DO UPDATE SET tokens = tokens + excluded.tokens",
+            (key, day, tokens)
+        )
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limits per client IP, and per user as well when the
+    request names one, with a cheap "crud" bucket for most routes and a
+    small "ai" bucket for the routes registered with expensive(). AI routes
+    also check a daily token quota, charged from completion.usage by
+    groq_client and streaming as the calls finish, so one request can run
+    a little past the quota but the next one is refused. User ids are not
+    authenticated, so the quota is kept per IP: naming another user can
+    neither spend their quota nor dodge your own.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.store = None
+        self.buckets = {}
+        self.daily_tokens = 0
+        self.expensive_routes = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = Config.RATE_LIMIT_ENABLED
+        self.store = SQLiteStore(Config.RATE_LIMIT_STORE) if Config.RATE_LIMIT_STORE else MemoryStore()
+        self.buckets = {
+            name: Bucket(name, per_minute, burst)
+            for name, per_minute, burst in (
+                ("crud", Config.RATE_LIMIT_CRUD_PER_MINUTE, Config.RATE_LIMIT_CRUD_BURST),
+                ("ai", Config.RATE_LIMIT_AI_PER_MINUTE, Config.RATE_LIMIT_AI_BURST)
+            )
+            if per_minute > 0
+        }
+        self.daily_tokens = Config.LLM_DAILY_TOKEN_QUOTA
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def expensive(self, path, method="POST"):
+        self.expensive_routes.add((method, path))
+
+    def kind(self, method, path):
+        return "ai" if (method, path) in self.expensive_routes else "crud"
+
+    def bind(self, client):
+        """Charge the LLM usage of the rest of this context to `client`."""
+        _client.set(client)
+
+    def check(self, kind, client, user=None, now=None):
+        """Take a `kind` token from `client` (an IP key) and from `user` if given; the quota is `client`'s."""
+        now = now or time.time()
+        headers = {}
+        if kind == "ai" and self.daily_tokens:
+            day, next_day = _day(now)
+            remaining = max(0, self.daily_tokens - self.store.used(client, day))
+            headers["X-Quota-Limit"] = str(self.daily_tokens)
+            headers["X-Quota-Remaining"] = str(remaining)
+            if not remaining:
+                metrics.rate_limited.inc(limit="quota")
+                return self._refused(headers, next_day, "Daily AI token quota used up, try again tomorrow")
+
+        bucket = self.buckets.get(kind)
+        if bucket is None:
+            return Decision(True, None, 0, headers)
+        allowed, tokens, wait = self.store.take(bucket, client, now)
+        if allowed and user is not None:
+            # Only once the IP's bucket allows it, so a refused request does not drain the user's too
+            allowed, left, wait = self.store.take(bucket, user, now)
+            tokens = min(tokens, left)
+        headers["X-RateLimit-Limit"] = str(bucket.capacity)
+        headers["X-RateLimit-Remaining"] = str(int(tokens))
+        headers["X-RateLimit-Reset"] = str(bucket.reset_after(tokens))
+        if not allowed:
+            metrics.rate_limited.inc(limit=kind)
+            return self._refused(headers, wait, "Too many requests, please slow down")
+        return Decision(True, None, 0, headers)
+
+    @staticmethod
+    def _refused(headers, wait, error):
+        retry_after = max(1, math.ceil(wait))
+        headers["Retry-After"] = str(retry_after)
+        return Decision(False, error, retry_after, headers)
+
+    def charge(self, usage):
+        client = _client.get()
+        if not self.enabled or not self.daily_tokens or client is None or usage is None:
+            return
+        tokens = _usage_tokens(usage)
+        if tokens:
+            self.store.charge(client, _day(time.time())[0], tokens)
+            metrics.quota_tokens.inc(tokens)
+
+    def _request_user(self):
+        user_id = request.headers.get("X-User-Id") or (request.view_args or {}).get("user_id")
+        if not user_id and request.is_json:
+            body = request.get_json(silent=True)
+            if isinstance(body, dict):
+                user_id = body.get("user_id")
+        return user_key(user_id)
+
+    def _before_request(self):
+        # Set on every request rather than reset in teardown: teardown runs
+        # before a streamed response has finished (and reported its usage)
+        self.bind(None)
+        if not self.enabled or request.method == "OPTIONS" or request.path in EXEMPT_PATHS:
+            return None
+
+        replayed = request.environ.get(REPLAY_CLIENT)
+        if replayed:
+            # A queued job: its bucket was charged when it was submitted
+            self.bind(replayed)
+            return None
+
+        client = client_key(request.remote_addr)
+        self.bind(client)
+        decision = self.check(self.kind(request.method, request.path), client, self._request_user())
+        g.rate_limit = decision
+        if not decision.allowed:
+            return jsonify({"error": decision.error, "retry_after": decision.retry_after}), 429
+        return None
+
+    def _after_request(self, response):
+        decision = g.pop("rate_limit", None)
+        if decision is not None:
+            response.headers.update(decision.headers)
+        return response
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+import hashlib
+import json
+import secrets
+import threading
+import time
+
+from sqlalchemy.orm import selectinload
+
+from config import Config
+from extensions import db
+from models import Trip, TripShare, Destination
+
+# What anonymous viewers get; owner ids, budgets and status stay private
+PUBLIC_FIELDS = ['name', 'description', 'start_date', 'end_date', 'cover_image', 'destinations', 'ai_generated']
+
+
+class SharedTrips:
+    """
+    Share tokens and the public, read-only view of a trip. The public JSON is
+    rendered once per trip version and stored in trip_shares; reads serve it
+    verbatim from a small in-process memo and only re-check the trip's
+    updated_at every SHARED_TRIP_MEMO_SECONDS.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._memo = OrderedDict()  # token -> (checked_at, etag, body)
+        self._lock = threading.Lock()
+
+    def publish(self, trip):
+        """Make the trip public and return its share, creating the token on first use."""
+        trip.visibility = "public"
+        if trip.share is None:
+            trip.share = TripShare(token=secrets.token_urlsafe(16))
+        db.session.commit()
+        self._rebuild(trip.share.token)
+        return trip.share
+
+    def revoke(self, trip):
+        if trip.share is not None:
+            self._forget(trip.share.token)
+            trip.share = None
+        trip.visibility = "private"
+        db.session.commit()
+
+    def get(self, token):
+        """(etag, body) of the public snapshot, or None if the link is unknown or private."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._memo.get(token)
+        if entry and now - entry[0] < Config.SHARED_TRIP_MEMO_SECONDS:
+            return entry[1], entry[2]
+
+        row = (db.session.query(TripShare.trip_version, TripShare.etag, Trip.updated_at, Trip.visibility)
+               .join(Trip, Trip.id == TripShare.trip_id)
+               .filter(TripShare.token == token).first())
+        if row is None or row.visibility != "public":
+            self._forget(token)
+            return None
+
+        if row.trip_version == row.updated_at and row.etag:
+            if entry and entry[1] == row.etag:
+                body = entry[2]
+            else:
+                body = db.session.query(TripShare.snapshot).filter_by(token=token).scalar()
+            etag = row.etag
+        else:
+            etag, body = self._rebuild(token)
+
+        with self._lock:
+            self._memo[token] = (now, etag, body)
+            self._memo.move_to_end(token)
+            while len(self._memo) > self.max_entries:
+                self._memo.popitem(last=False)
+        return etag, body
+
+    def _rebuild(self, token):
+        share = db.session.get(TripShare, token)
+        trip = (Trip.query.options(selectinload(Trip.destination_rows).selectinload(Destination.activities))
+                .filter_by(id=share.trip_id).one())
+        data = trip.to_dict(PUBLIC_FIELDS)
+        data['shared_by'] = trip.user.first_name if trip.user else None
+
+        share.snapshot = json.dumps(data, separators=(",", ":"), sort_keys=True)
+        share.etag = f'"{hashlib.sha256(share.snapshot.encode("utf-8")).hexdigest()[:32]}"'
+        share.trip_version = trip.updated_at
+        db.session.commit()
+        return share.etag, share.snapshot
+
+    def _forget(self, token):
+        with self._lock:
+            self._memo.pop(token, None)
+
+
+shared_trips = SharedTrips()
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while one call for a key is in
+    flight, other callers wait for it and share its result (or exception)
+    instead of issuing a duplicate upstream request.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._async_calls = {}  # same keys, for coroutines on the event loop
+        self._lock = threading.Lock()
+        self._counters = {}  # namespace -> {"calls": n, "deduplicated": n}
+
+    def do(self, namespace, key, fn):
+        flight_key = (namespace, key)
+        with self._lock:
+            counters = self._counters.setdefault(namespace, {"calls": 0, "deduplicated": 0})
+            call = self._calls.get(flight_key)
+            if call is not None:
+                counters["deduplicated"] += 1
+                leader = False
+            else:
+                call = self._calls[flight_key] = _Call()
+                counters["calls"] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[flight_key]
+            call.done.set()
+
+    async def do_async(self, namespace, key, fn):
+        """do() for coroutine functions: followers await the leader's future."""
+        flight_key = (namespace, key)
+        with self._lock:
+            counters = self._counters.setdefault(namespace, {"calls": 0, "deduplicated": 0})
+            future = self._async_calls.get(flight_key)
+            if future is not None:
+                counters["deduplicated"] += 1
+                leader = False
+            else:
+                future = self._async_calls[flight_key] = asyncio.get_running_loop().create_future()
+                counters["calls"] += 1
+                leader = True
+
+        if not leader:
+            # shield: a follower disconnecting must not cancel the shared call
+            return await asyncio.shield(future)
+
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # mark retrieved when there are no followers
+            raise
+        finally:
+            with self._lock:
+                del self._async_calls[flight_key]
+
+    def stats(self):
+        with self._lock:
+            stats = {namespace: dict(counters) for namespace, counters in self._counters.items()}
+            in_flight = len(self._calls) + len(self._async_calls)
+        return {
+            "in_flight": in_flight,
+            "calls": sum(c["calls"] for c in stats.values()),
+            "deduplicated": sum(c["deduplicated"] for c in stats.values()),
+            "by_route": stats
+        }
+
+
+ai_calls = SingleFlight()
@@ -0,0 +1,115 @@
+import json
+
+from flask import request
+
+from metrics import metrics
+from rate_limit import rate_limiter
+
+
+def sse(data, event=None):
+    """Format one Server-Sent Events message."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+def _delta(chunk):
+    # Groq reports usage on the final chunk
+    usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+    if usage is not None:
+        metrics.record_usage(chunk.model, usage)
+        rate_limiter.charge(usage)
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content
+
+
+def iter_deltas(completion_stream):
+    """Yield the text pieces of a Groq stream=True completion."""
+    for chunk in completion_stream:
+        content = _delta(chunk)
+        if content:
+            yield content
+
+
+async def aiter_deltas(completion_stream):
+    """iter_deltas for an AsyncGroq stream."""
+    async for chunk in completion_stream:
+        content = _delta(chunk)
+        if content:
+            yield content
+
+
+def stream_requested(stream_arg, accept, body):
+    if (stream_arg or "").lower() in ("1", "true"):
+        return True
+    if "text/event-stream" in (accept or ""):
+        return True
+    return isinstance(body, dict) and body.get("stream") is True
+
+
+def wants_stream():
+    return stream_requested(request.args.get("stream"), request.headers.get("Accept"), request.get_json(silent=True))
+
+
+class DayStreamParser:
+    """
+    Incrementally scans a streamed itinerary JSON document and returns each
+    object of the top-level "days" array as soon as its closing brace arrives.
+    """
+
+    def __init__(self, array_key="days"):
+        self.array_key = array_key
+        self.buffer = ""
+        self.pos = 0
+        self.in_array = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.item_start = None
+        self.finished = False
+
+    def feed(self, text):
+        self.buffer += text
+        items = []
+
+        if not self.in_array and not self.finished:
+            marker = self.buffer.find(f'"{self.array_key}"', self.pos)
+            if marker == -1:
+                return items
+            bracket = self.buffer.find("[", marker)
+            if bracket == -1:
+                return items
+            self.in_array = True
+            self.pos = bracket + 1
+
+        while self.in_array and self.pos < len(self.buffer):
+            char = self.buffer[self.pos]
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                if self.depth == 0:
+                    self.item_start = self.pos
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0 and self.item_start is not None:
+                    try:
+                        items.append(json.loads(self.buffer[self.item_start:self.pos + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self.item_start = None
+            elif char == "]" and self.depth == 0:
+                self.in_array = False
+                self.finished = True
+
+            self.pos += 1
+
+        return items
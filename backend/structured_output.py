@@ -0,0 +1,289 @@
+import re
+
+import groq
+
+from json_column import loads
+from metrics import metrics
+from model_router import router
+
+JSON_MODE = {"type": "json_object"}
+
+# A small JSON Schema subset: type, required, properties, items.
+# Invalid array items and optional properties are dropped; a missing or
+# mistyped required property fails the parse.
+ACTIVITY_SCHEMA = {
+    "type": "object",
+    "required": ["title"],
+    "properties": {
+        "time": {"type": "string"},
+        "title": {"type": "string"},
+        "description": {"type": "string"},
+        "cost": {"type": "number"},
+        "location": {"type": "string"},
+        "image_query": {"type": "string"}
+    }
+}
+
+DAY_SCHEMA = {
+    "type": "object",
+    "required": ["activities"],
+    "properties": {
+        "title": {"type": "string"},
+        "activities": {"type": "array", "items": ACTIVITY_SCHEMA}
+    }
+}
+
+DAYS_SCHEMA = {
+    "type": "object",
+    "required": ["days"],
+    "properties": {"days": {"type": "array", "items": DAY_SCHEMA}}
+}
+
+ITINERARY_SCHEMA = {
+    "type": "object",
+    "required": ["days"],
+    "properties": {
+        "overview": {"type": "string"},
+        "highlights": {"type": "array", "items": {"type": "string"}},
+        "estimatedBudget": {"type": "object"},
+        "days": {"type": "array", "items": DAY_SCHEMA}
+    }
+}
+
+PLAN_SUMMARY_SCHEMA = {
+    "type": "object",
+    "required": ["overview"],
+    "properties": {
+        "overview": {"type": "string"},
+        "highlights": {"type": "array", "items": {"type": "string"}},
+        "estimatedBudget": {"type": "object"}
+    }
+}
+
+INSIGHTS_SCHEMA = {
+    "type": "object",
+    "required": ["packingList", "weatherForecast", "localPhrases", "proTips"],
+    "properties": {
+        "packingList": {"type": "array", "items": {"type": "string"}},
+        "weatherForecast": {"type": "string"},
+        "localPhrases": {"type": "array", "items": {"type": "object", "required": ["phrase", "translation"]}},
+        "proTips": {"type": "array", "items": {"type": "string"}}
+    }
+}
+
+INSPIRATION_SCHEMA = {
+    "type": "object",
+    "required": ["posts", "tips"],
+    "properties": {
+        "posts": {"type": "array", "items": {"type": "object", "required": ["title", "category", "excerpt"]}},
+        "tips": {"type": "array", "items": {"type": "object", "required": ["title", "description"]}}
+    }
+}
+
+_FENCE = re.compile(r"^```[a-zA-Z]*\s*|\s*```\s*$")
+_TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+_CLOSERS = {"{": "}", "[": "]"}
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool
+}
+
+
+class StructuredOutputError(ValueError):
+    """The model's output could not be turned into the expected JSON; `text` is what it sent."""
+
+    def __init__(self, message, text=""):
+        super().__init__(message)
+        self.text = text
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def _is_type(value, expected):
+    if isinstance(value, bool) and expected in ("number", "integer"):
+        return False
+    return isinstance(value, _TYPES[expected])
+
+
+def conform(value, schema, path="$"):
+    """Check `value` against `schema` in place; returns how many invalid parts were dropped."""
+    expected = schema.get("type")
+    if expected and not _is_type(value, expected):
+        raise SchemaError(f"{path}: expected {expected}")
+
+    dropped = 0
+    if expected == "object":
+        for key in schema.get("required", ()):
+            if key not in value:
+                raise SchemaError(f"{path}: missing {key}")
+        for key, subschema in schema.get("properties", {}).items():
+            if key not in value:
+                continue
+            try:
+                dropped += conform(value[key], subschema, f"{path}.{key}")
+            except SchemaError:
+                if key in schema.get("required", ()):
+                    raise
+                del value[key]
+                dropped += 1
+    elif expected == "array" and "items" in schema:
+        kept = []
+        for index, item in enumerate(value):
+            try:
+                dropped += conform(item, schema["items"], f"{path}[{index}]")
+                kept.append(item)
+            except SchemaError:
+                dropped += 1
+        value[:] = kept
+    return dropped
+
+
+def _scan(text):
+    """
+    Walk the first JSON value in `text`. Returns (end, cuts, stack): `end` is
+    the index just past the value if it closed, `cuts` are positions where the
+    text can be cut and closed again, each with the open brackets at that point.
+    """
+    stack = []
+    cuts = []
+    in_string = escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append(char)
+            cuts.append((i + 1, tuple(stack)))
+        elif char in "}]":
+            if not stack:
+                break
+            stack.pop()
+            if not stack:
+                return i + 1, cuts, stack
+            cuts.append((i + 1, tuple(stack)))
+        elif char == "," and stack:
+            cuts.append((i, tuple(stack)))
+    return None, cuts, stack
+
+
+def _close_truncated(text, cuts, stack):
+    """
+    Close a document the model stopped writing. The cut goes back to the
+    outermost open array, so its partial trailing item (say, half a day or
+    half an activity) is dropped rather than kept with missing fields.
+    """
+    target = None
+    if "[" in stack:
+        target = tuple(stack[:stack.index("[") + 1])
+    for position, open_brackets in reversed(cuts):
+        if target is not None and open_brackets != target:
+            continue
+        candidate = text[:position].rstrip().rstrip(",")
+        candidate += "".join(_CLOSERS[bracket] for bracket in reversed(open_brackets))
+        try:
+            return loads(candidate)
+        except ValueError:
+            continue
+    raise ValueError("unrecoverable truncated JSON")
+
+
+def repair_json(text):
+    """Tolerant parse of model output. Returns (value, repairs); raises ValueError if nothing parses."""
+    text = (text or "").strip()
+    try:
+        return loads(text), []
+    except ValueError:
+        pass
+
+    repairs = []
+    unfenced = _FENCE.sub("", text)
+    if unfenced != text:
+        repairs.append("fence")
+        text = unfenced.strip()
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("no JSON value in model output")
+    if min(starts) > 0:
+        repairs.append("extracted")
+        text = text[min(starts):]
+
+    end, cuts, stack = _scan(text)
+    if end is not None:
+        if end < len(text) and "extracted" not in repairs:
+            repairs.append("extracted")
+        text = text[:end]
+        try:
+            return loads(text), repairs
+        except ValueError:
+            pass
+        repairs.append("trailing_comma")
+        return loads(_TRAILING_COMMA.sub(r"\1", text)), repairs
+
+    repairs.append("truncated")
+    return _close_truncated(text, cuts, stack), repairs
+
+
+def parse_json(text, schema=None, kind="json"):
+    """
+    repair_json plus schema validation, counted in llm_json_parses_total.
+    Returns (value, truncated).
+    """
+    try:
+        value, repairs = repair_json(text)
+        if schema is not None and conform(value, schema):
+            repairs.append("pruned")
+    except ValueError as e:
+        metrics.record_json_parse(kind, "failed")
+        raise StructuredOutputError(f"Model returned invalid JSON: {e}", text) from e
+
+    metrics.record_json_parse(kind, "repaired" if repairs else "ok", repairs)
+    return value, "truncated" in repairs
+
+
+def _failed_generation(error):
+    # With JSON mode Groq rejects output that does not parse and returns it here
+    body = error.body if isinstance(error.body, dict) else {}
+    if isinstance(body.get("error"), dict):
+        body = body["error"]
+    if body.get("code") != "json_validate_failed":
+        return None
+    return body.get("failed_generation")
+
+
+def create_json(schema, kind, **kwargs):
+    """
+    A JSON-mode completion routed by `kind` (see model_router.POLICIES),
+    parsed with parse_json. Returns (value, truncated).
+    """
+    try:
+        completion = router.complete(kind, response_format=JSON_MODE, **kwargs)
+    except groq.BadRequestError as e:
+        text = _failed_generation(e)
+        if text is None:
+            raise
+        return parse_json(text, schema, kind)
+    return parse_json(completion.choices[0].message.content, schema, kind)
+
+
+async def create_json_async(schema, kind, **kwargs):
+    try:
+        completion = await router.complete_async(kind, response_format=JSON_MODE, **kwargs)
+    except groq.BadRequestError as e:
+        text = _failed_generation(e)
+        if text is None:
+            raise
+        return parse_json(text, schema, kind)
+    return parse_json(completion.choices[0].message.content, schema, kind)
@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Read when config.py is imported, so they are set before any app module loads
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ["INSPIRATION_BACKGROUND_REFRESH"] = "0"
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+os.environ["AI_CACHE_ENABLED"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+
+@pytest.fixture
+def app():
+    from app import app as flask_app
+    from extensions import db
+
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class FakeLLM:
+    """
+    Stands in for model_router.router: answers every call with the queued
+    replies, the last one repeating. A reply may be a function of the call's kwargs.
+    """
+
+    def __init__(self):
+        self.replies = ["{}"]
+        self.calls = []
+
+    def reply(self, *texts):
+        self.replies = list(texts)
+
+    def _next(self, route, kwargs):
+        self.calls.append(dict(kwargs, route=route))
+        text = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if callable(text):
+            text = text(kwargs)
+        if isinstance(text, Exception):
+            raise text
+        if kwargs.get("stream"):
+            # A few characters per chunk, so parsers see values split across chunks
+            return [SimpleNamespace(model="fake", x_groq=None,
+                                    choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 7]))])
+                    for i in range(0, len(text), 7)]
+        return SimpleNamespace(model="fake", usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+
+    def complete(self, route, size=None, model=None, **kwargs):
+        return self._next(route, kwargs)
+
+    async def complete_async(self, route, size=None, model=None, **kwargs):
+        result = self._next(route, kwargs)
+        if not kwargs.get("stream"):
+            return result
+
+        async def stream():
+            for chunk in result:
+                yield chunk
+        return stream()
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    from model_router import router
+
+    fake = FakeLLM()
+    monkeypatch.setattr(router, "complete", fake.complete)
+    monkeypatch.setattr(router, "complete_async", fake.complete_async)
+    return fake
+
+
+@pytest.fixture
+def user_id(client):
+    response = client.post("/api/register", json={
+        "first_name": "Ada", "last_name": "Lovelace", "email": "ada@example.com", "password": "secret"
+    })
+    return response.get_json()["user_id"]
+
+
+@pytest.fixture
+def make_trip(client, user_id):
+    """Create a trip through the API; fields the create route does not take are set with a PUT."""
+    def make_trip(**fields):
+        created = {"user_id": user_id, "name": "Trip", "start_date": "2025-03-01", "end_date": "2025-03-05"}
+        for name in ("user_id", "name", "start_date", "end_date", "description"):
+            if name in fields:
+                created[name] = fields.pop(name)
+        trip_id = client.post("/api/trips", json=created).get_json()["trip"]["_id"]
+        if fields:
+            client.put(f"/api/trips/{trip_id}", json=fields)
+        return trip_id
+    return make_trip
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from ai_cache import AICache, normalize_place
+from extensions import db
+from models import AICacheEntry, User
+
+
+@pytest.fixture
+def cache(app):
+    cache = AICache("test-plans", memory_entries=2, max_rows=3)
+    cache.enabled = True
+    return cache
+
+
+def test_a_stored_value_is_served_from_memory(cache):
+    key = cache.make_key(destination="rome", days=3)
+    cache.set(key, {"days": [1, 2, 3]})
+
+    assert cache.get(key) == {"days": [1, 2, 3]}
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_the_table_serves_a_new_process(cache):
+    key = cache.make_key(destination="rome", days=3)
+    cache.set(key, {"days": [1]})
+
+    restarted = AICache("test-plans")
+    restarted.enabled = True
+
+    assert restarted.get(key) == {"days": [1]}
+    assert restarted.stats()["db_hits"] == 1
+
+
+def test_expired_rows_are_misses_and_are_deleted(cache):
+    key = cache.make_key(destination="oslo")
+    db.session.add(AICacheEntry(key=key, namespace="test-plans", payload="{}",
+                                expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+
+    assert cache.get(key) is None
+    db.session.expire_all()
+    assert db.session.get(AICacheEntry, key) is None
+
+
+def test_the_table_keeps_at_most_max_rows_per_namespace(cache):
+    for n in range(5):
+        cache.set(cache.make_key(n=n), n)
+
+    assert AICacheEntry.query.filter_by(namespace="test-plans").count() == 3
+
+
+def test_a_lookup_does_not_commit_the_callers_pending_changes(cache):
+    key = cache.make_key(destination="rome")
+    cache.set(key, {"days": []})
+    cache._memory.clear()
+    db.session.add(User(first_name="A", last_name="B", email="pending@example.com", password="x"))
+
+    assert cache.get(key) == {"days": []}
+    db.session.rollback()
+    assert User.query.filter_by(email="pending@example.com").first() is None
+
+
+def test_places_are_normalized_for_keys():
+    assert normalize_place("  New   York ") == "new york"
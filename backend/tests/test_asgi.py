@@ -0,0 +1,79 @@
+import asyncio
+import contextvars
+import json
+
+import pytest
+
+from async_bridge import run_sync
+from config import Config
+
+caller = contextvars.ContextVar("caller", default=None)
+
+
+def call(path, body=b"", method="POST", headers=()):
+    """Send one request through asgi.application and return (status, headers, body)."""
+    import asgi
+
+    sent = []
+    incoming = [{"type": "http.request", "body": body}]
+
+    async def receive():
+        return incoming.pop(0) if incoming else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    path, _, query = path.partition("?")
+    scope = {"type": "http", "method": method, "path": path, "query_string": query.encode(),
+             "headers": [(b"content-type", b"application/json")] + list(headers), "client": ("127.0.0.1", 1)}
+    asyncio.run(asgi.application(scope, receive, send))
+    start = sent[0]
+    return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_run_sync_carries_the_callers_context(app):
+    async def main():
+        caller.set("10.0.0.1")
+        return await run_sync(caller.get)
+
+    assert asyncio.run(main()) == "10.0.0.1"
+
+
+def test_chat_runs_on_the_event_loop(app, llm):
+    llm.reply("Try the gelato.")
+
+    status, headers, body = call("/api/chat", json.dumps({"message": "Rome?"}).encode())
+
+    assert status == 200
+    assert json.loads(body)["response"] == "Try the gelato."
+    assert llm.calls[0]["route"] == "chat"
+
+
+def test_chat_streams_tokens(app, llm):
+    llm.reply("Try the gelato.")
+
+    status, headers, body = call("/api/chat?stream=true", json.dumps({"message": "Rome?", "stream": True}).encode())
+
+    assert headers[b"content-type"].startswith(b"text/event-stream")
+    *tokens, done = body.decode().strip().split("\n\n")
+    assert "".join(json.loads(token[len("data: "):])["token"] for token in tokens) == "Try the gelato."
+    assert done.startswith("event: done\n")
+    assert json.loads(done.split("data: ", 1)[1])["response"] == "Try the gelato."
+
+
+def test_other_routes_are_served_by_flask(app):
+    status, _, body = call("/api/trips/999", method="GET")
+
+    assert status == 404
+    assert json.loads(body) == {"error": "Trip not found"}
+
+
+def test_oversized_bodies_are_refused(app, monkeypatch):
+    monkeypatch.setattr(Config, "ASGI_MAX_BODY_BYTES", 10)
+
+    assert call("/api/chat", b"x" * 11)[0] == 413
+
+
+@pytest.mark.parametrize("body", [b"{", b"[1"])
+def test_invalid_json_is_a_400(app, body):
+    assert call("/api/chat", body)[0] == 400
@@ -0,0 +1,79 @@
+from budget import budget_analytics, MAX_DAYS
+
+
+def trip_budget(client, trip_id):
+    return client.get(f"/api/trips/{trip_id}/budget").get_json()
+
+
+PLANNED = {"total": 1000, "transport": 300, "stay": 400, "food": 200, "activities": 100}
+ITINERARY = [{"city": "Rome", "activities": [
+    {"name": "Colosseum", "day": 1, "cost": 20},
+    {"name": "Vatican", "day": 2, "cost": 30},
+    {"name": "Cooking class", "cost": 50}
+]}]
+
+
+def test_fixed_costs_are_spread_over_the_days_and_activities_itemised(client, make_trip):
+    trip_id = make_trip(start_date="2025-03-01", end_date="2025-03-04", budget=PLANNED, destinations=ITINERARY)
+
+    breakdown = trip_budget(client, trip_id)
+
+    assert breakdown["days"] == 4
+    assert breakdown["categories"] == {"transport": 300, "stay": 400, "food": 200, "activities": 100}
+    assert breakdown["unscheduled_activities"] == 50
+    assert [day["date"] for day in breakdown["per_day"]] == ["2025-03-01", "2025-03-02", "2025-03-03", "2025-03-04"]
+    assert [day["activities"] for day in breakdown["per_day"]] == [20, 30, 0, 0]
+    assert breakdown["per_day"][0]["total"] == 75 + 100 + 50 + 20
+
+
+def test_ai_plans_accommodation_counts_as_stay(client, make_trip):
+    trip_id = make_trip(budget={"accommodation": 500})
+
+    assert trip_budget(client, trip_id)["categories"]["stay"] == 500
+
+
+def test_an_edit_replaces_the_memoized_breakdown(client, make_trip):
+    trip_id = make_trip(budget=PLANNED)
+    trip_budget(client, trip_id)
+
+    client.put(f"/api/trips/{trip_id}", json={"budget": dict(PLANNED, food=1200)})
+
+    assert trip_budget(client, trip_id)["categories"]["food"] == 1200
+
+
+def test_a_huge_date_range_is_capped(client, make_trip):
+    trip_id = make_trip(start_date="0001-01-01", end_date="9999-12-31", budget=PLANNED,
+                        destinations=[{"activities": [{"day": 10 ** 9, "cost": 40}]}])
+
+    breakdown = trip_budget(client, trip_id)
+
+    assert breakdown["days"] == len(breakdown["per_day"]) == MAX_DAYS
+    assert breakdown["total"] == 900 + 40
+    assert breakdown["unscheduled_activities"] == 40
+
+
+def test_undated_trips_size_the_breakdown_by_their_activity_days(client, make_trip):
+    trip_id = make_trip(start_date="", end_date="", destinations=[{"activities": [{"day": 3, "cost": 10}]}])
+
+    breakdown = trip_budget(client, trip_id)
+
+    assert breakdown["days"] == 3
+    assert breakdown["per_day"][2]["date"] is None
+
+
+def test_user_totals_count_only_days_in_range(client, user_id, make_trip):
+    make_trip(start_date="2025-03-30", end_date="2025-04-02", budget={"food": 400})
+    make_trip(start_date="2025-06-01", end_date="2025-06-02", budget={"food": 100})
+
+    march = client.get(f"/api/trips/user/{user_id}/budget", query_string={"to": "2025-03-31"}).get_json()
+    everything = client.get(f"/api/trips/user/{user_id}/budget").get_json()
+
+    assert march["trip_count"] == 1
+    assert march["total"] == 200
+    assert everything["by_month"] == {"2025-03": 200, "2025-04": 200, "2025-06": 100}
+    assert client.get(f"/api/trips/user/{user_id}/budget", query_string={"from": "03/01"}).status_code == 400
+
+
+def test_missing_trips_are_not_found(client):
+    assert client.get("/api/trips/999/budget").status_code == 404
+    assert budget_analytics.for_trips([]) == []
@@ -0,0 +1,73 @@
+import uuid
+
+import pytest
+
+import chat_sessions
+from chat_sessions import add_message, build_context, estimate_tokens, max_message_chars
+from extensions import db
+from models import ChatSession
+
+SYSTEM_PROMPT = {"role": "system", "content": "You are a travel concierge."}
+
+
+@pytest.fixture
+def summaries(monkeypatch):
+    calls = []
+
+    def summarize(previous, messages):
+        calls.append([m.content for m in messages])
+        return "summary"
+
+    monkeypatch.setattr(chat_sessions, "summarize", summarize)
+    return calls
+
+
+def new_session(*turns):
+    session = ChatSession(id=uuid.uuid4().hex)
+    db.session.add(session)
+    for role, content in turns:
+        add_message(session.id, role, content)
+    db.session.flush()
+    return session
+
+
+def test_turns_within_budget_are_sent_verbatim(app, summaries):
+    session = new_session(("user", "Rome in May?"), ("assistant", "Lovely."), ("user", "Budget?"))
+
+    messages = build_context(session, SYSTEM_PROMPT, budget=100)
+
+    assert summaries == []
+    assert messages == [SYSTEM_PROMPT,
+                        {"role": "user", "content": "Rome in May?"},
+                        {"role": "assistant", "content": "Lovely."},
+                        {"role": "user", "content": "Budget?"}]
+
+
+def test_oldest_turns_are_folded_into_the_summary(app, summaries):
+    session = new_session(("user", "a" * 200), ("assistant", "b" * 200), ("user", "c" * 40))
+
+    messages = build_context(session, SYSTEM_PROMPT, budget=100)
+
+    assert summaries == [["a" * 200, "b" * 200]]
+    assert session.summary == "summary"
+    assert session.summarized_through == session.messages.all()[1].id
+    assert messages[1]["content"].endswith("summary")
+    assert messages[2:] == [{"role": "user", "content": "c" * 40}]
+
+
+def test_single_oversized_message_is_cut_to_the_budget_without_folding(app, summaries):
+    session = new_session(("user", "x" * 13000))
+
+    messages = build_context(session, SYSTEM_PROMPT, budget=3000)
+
+    assert summaries == []
+    assert not session.summarized_through
+    assert len(messages[-1]["content"]) == max_message_chars(3000)
+    assert estimate_tokens(messages[-1]["content"]) <= 3000
+
+
+def test_chat_turns_away_a_message_over_the_context_budget(client):
+    response = client.post("/api/chat", json={"message": "x" * 13000})
+
+    assert response.status_code == 400
+    assert "too long" in response.get_json()["error"]
@@ -0,0 +1,73 @@
+from city_index import CityIndex, DEFAULT_CITIES, fold
+
+CITIES = DEFAULT_CITIES + [
+    {"name": "São Paulo", "country": "Brazil", "region": "South America", "cost_index": 5, "popularity": 70},
+    {"name": "Parma", "country": "Italy", "region": "Europe", "cost_index": 6, "popularity": 40},
+    {"name": "Paris", "country": "USA", "region": "North America", "cost_index": 4, "popularity": 10}
+]
+
+
+def names(results):
+    return [(city["name"], city["country"]) for city in results]
+
+
+def test_an_exact_name_outranks_longer_prefix_matches():
+    results, _ = CityIndex(CITIES).search("paris")
+
+    assert names(results)[:2] == [("Paris", "France"), ("Paris", "USA")]
+
+
+def test_prefixes_match_names_words_and_countries():
+    index = CityIndex(CITIES)
+
+    assert ("Parma", "Italy") in names(index.search("par")[0])
+    assert names(index.search("york")[0]) == [("New York", "USA")]
+    assert ("Rome", "Italy") in names(index.search("ital")[0])
+
+
+def test_accents_and_typos_still_match():
+    index = CityIndex(CITIES)
+
+    assert names(index.search("sao pa")[0]) == [("São Paulo", "Brazil")]
+    assert ("Barcelona", "Spain") in names(index.search("barcelonna")[0])
+
+
+def test_region_filters_results_but_facets_count_every_match():
+    results, facets = CityIndex(CITIES).search("pa", region="Europe")
+
+    assert {city["region"] for city in results} == {"Europe"}
+    assert facets["North America"] == 1
+
+
+def test_browsing_with_no_query_lists_by_popularity():
+    results, _ = CityIndex(CITIES).search("", limit=3)
+
+    assert [city["name"] for city in results] == ["Paris", "London", "New York"]
+
+
+def test_cost_sort_puts_cheaper_cities_first():
+    results, _ = CityIndex(CITIES).search("", sort="cost", limit=2)
+
+    assert [city["name"] for city in results] == ["Bangkok", "Bali"]
+
+
+def test_a_csv_gazetteer_is_loaded_and_pickled(tmp_path):
+    path = tmp_path / "cities.csv"
+    path.write_text("name,country,region,popularity\nKyoto,Japan,Asia,80\n", encoding="utf-8")
+
+    index = CityIndex.load(str(path))
+
+    assert names(index.search("kyo")[0]) == [("Kyoto", "Japan")]
+    assert (tmp_path / "cities.csv.index.pickle").exists()
+    assert names(CityIndex.load(str(path)).search("kyo")[0]) == [("Kyoto", "Japan")]
+
+
+def test_fold_strips_accents_and_punctuation():
+    assert fold("  Saint-Étienne ") == "saint etienne"
+
+
+def test_the_route_returns_results_and_facets(client):
+    response = client.get("/api/cities/search", query_string={"q": "ro", "facets": 1})
+
+    assert response.get_json()["results"][0]["name"] == "Rome"
+    assert response.get_json()["facets"]["region"]["Europe"] >= 1
@@ -0,0 +1,66 @@
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+import pytest
+from sqlalchemy import create_engine, text
+
+from config import Config
+from database import REPLICA_BIND, RoutingSession, engine_options
+
+
+def test_sqlite_gets_no_pool_settings():
+    assert engine_options("sqlite:///app.db") == {}
+    assert engine_options(None) == {}
+
+
+def test_server_databases_get_the_configured_pool():
+    options = engine_options("postgresql://db/app")
+
+    assert options["pool_size"] == Config.DB_POOL_SIZE
+    assert options["pool_pre_ping"] == Config.DB_POOL_PRE_PING
+
+
+def test_sqlite_connections_get_the_pragmas(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == Config.SQLITE_JOURNAL_MODE.lower()
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == Config.SQLITE_BUSY_TIMEOUT_MS
+    engine.dispose()
+
+
+@pytest.fixture
+def routed(tmp_path):
+    """A throwaway app whose primary and replica hold different rows, so reads show where they went."""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'primary.db'}"
+    app.config["SQLALCHEMY_BINDS"] = {REPLICA_BIND: f"sqlite:///{tmp_path / 'replica.db'}"}
+    db = SQLAlchemy(app, session_options={"class_": RoutingSession})
+
+    class Note(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        source = db.Column(db.String(20))
+
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            db.metadata.create_all(engine)
+            with engine.begin() as connection:
+                connection.execute(Note.__table__.insert(), {"source": bind or "primary"})
+    return app, db, Note
+
+
+def test_get_requests_read_from_the_replica(routed):
+    app, db, Note = routed
+
+    with app.test_request_context(method="GET"):
+        assert db.session.query(Note.source).scalar() == REPLICA_BIND
+    with app.test_request_context(method="POST"):
+        assert db.session.query(Note.source).scalar() == "primary"
+
+
+def test_a_request_reads_its_own_writes(routed):
+    app, db, Note = routed
+
+    with app.test_request_context(method="GET"):
+        db.session.add(Note(source="written"))
+        db.session.flush()
+        assert db.session.query(db.func.count(Note.id)).scalar() == 2
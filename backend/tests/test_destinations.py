@@ -0,0 +1,48 @@
+from extensions import db
+from models import Activity, Destination, Trip
+
+ITINERARY = [
+    {"city": "Rome", "country": "Italy", "budget": 300, "notes": "arrive by train", "activities": [
+        {"name": "Colosseum", "day": 1, "cost": 18.5, "duration": "2 hours", "booked": True},
+        {"name": "Trastevere", "day": 2, "duration": 1.5, "cost": None}
+    ]},
+    {"city": "Florence", "country": None, "start_date": 20250305, "activities": []}
+]
+
+
+def test_destinations_round_trip_through_the_tables(client, make_trip):
+    trip_id = make_trip(destinations=ITINERARY)
+
+    assert client.get(f"/api/trips/{trip_id}").get_json()["destinations"] == ITINERARY
+    assert Destination.query.filter_by(trip_id=trip_id).count() == 2
+    assert Activity.query.filter_by(trip_id=trip_id, day=1).one().name == "Colosseum"
+    assert db.session.get(Trip, trip_id).destinations is None
+
+
+def test_appending_an_activity_writes_only_the_new_row(client, make_trip):
+    trip_id = make_trip(destinations=ITINERARY)
+    ids = [activity.id for activity in Activity.query.order_by(Activity.id)]
+
+    changed = [dict(ITINERARY[0], activities=ITINERARY[0]["activities"] + [{"name": "Pantheon"}]), ITINERARY[1]]
+    client.put(f"/api/trips/{trip_id}", json={"destinations": changed})
+
+    assert [activity.id for activity in Activity.query.order_by(Activity.id)][:2] == ids
+    assert client.get(f"/api/trips/{trip_id}").get_json()["destinations"] == changed
+
+
+def test_removing_a_destination_removes_its_activities(client, make_trip):
+    trip_id = make_trip(destinations=ITINERARY)
+
+    client.put(f"/api/trips/{trip_id}", json={"destinations": ITINERARY[1:]})
+
+    assert Destination.query.filter_by(trip_id=trip_id).count() == 1
+    assert Activity.query.filter_by(trip_id=trip_id).count() == 0
+
+
+def test_legacy_json_destinations_are_still_served(client, make_trip):
+    trip_id = make_trip()
+    trip = db.session.get(Trip, trip_id)
+    trip.destinations = [{"city": "Oslo", "activities": []}]
+    db.session.commit()
+
+    assert client.get(f"/api/trips/{trip_id}").get_json()["destinations"] == [{"city": "Oslo", "activities": []}]
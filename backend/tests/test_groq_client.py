@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import groq
+import httpx
+import pytest
+
+import groq_client
+from groq_client import create_completion, create_completion_async, get_client, set_transport, stub_transport
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Serves each request with the next queued status; 200 answers like the stub transport."""
+    statuses, requests = [], []
+    ok = stub_transport(reply="hello")
+
+    def handler(request):
+        requests.append(request)
+        status = statuses.pop(0) if statuses else 200
+        if status != 200:
+            return httpx.Response(status, json={"error": {"message": "nope"}})
+        return ok.handle_request(request)
+
+    monkeypatch.setattr(groq_client, "_backoff", lambda attempt: 0)
+    set_transport(httpx.MockTransport(handler))
+    yield statuses, requests
+    set_transport(None)
+
+
+def test_the_client_is_shared(upstream):
+    assert get_client() is get_client()
+
+
+def test_server_errors_are_retried(upstream):
+    statuses, requests = upstream
+    statuses.extend([500, 503])
+
+    completion = create_completion(model="m", messages=MESSAGES)
+
+    assert completion.choices[0].message.content == "hello"
+    assert len(requests) == 3
+
+
+def test_retries_are_bounded(upstream):
+    statuses, requests = upstream
+    statuses.extend([500] * 10)
+
+    with pytest.raises(groq.InternalServerError):
+        create_completion(model="m", messages=MESSAGES)
+    assert len(requests) == 1 + groq_client.Config.GROQ_MAX_RETRIES
+
+
+def test_client_errors_are_not_retried(upstream):
+    statuses, requests = upstream
+    statuses.append(400)
+
+    with pytest.raises(groq.BadRequestError):
+        create_completion(model="m", messages=MESSAGES)
+    assert len(requests) == 1
+
+
+def test_no_retry_starts_past_the_deadline(upstream, monkeypatch):
+    statuses, requests = upstream
+    statuses.extend([500] * 10)
+    monkeypatch.setattr(groq_client, "_backoff", lambda attempt: 1.0)
+
+    started = time.monotonic()
+    with pytest.raises(groq.InternalServerError):
+        create_completion(deadline=0.5, model="m", messages=MESSAGES)
+    assert len(requests) == 1
+    assert time.monotonic() - started < 0.5
+
+
+def test_the_async_client_retries_too(upstream):
+    statuses, requests = upstream
+    statuses.append(500)
+
+    completion = asyncio.run(create_completion_async(model="m", messages=MESSAGES))
+
+    assert completion.choices[0].message.content == "hello"
+    assert len(requests) == 2
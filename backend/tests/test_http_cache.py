@@ -0,0 +1,62 @@
+def test_a_matching_etag_gets_304(client, user_id):
+    first = client.get(f"/api/user/{user_id}")
+
+    again = client.get(f"/api/user/{user_id}", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert first.status_code == 200
+    assert again.status_code == 304
+    assert again.data == b""
+
+
+def test_an_update_changes_the_etag(client, user_id):
+    etag = client.get(f"/api/user/{user_id}").headers["ETag"]
+
+    client.put(f"/api/user/{user_id}", json={"city": "Rome"})
+    response = client.get(f"/api/user/{user_id}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.get_json()["city"] == "Rome"
+
+
+def test_if_modified_since_revalidates_a_trip(client, make_trip):
+    trip_id = make_trip()
+    first = client.get(f"/api/trips/{trip_id}")
+
+    again = client.get(f"/api/trips/{trip_id}", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+
+    assert first.headers["Cache-Control"] == "no-cache"
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_if_none_match_wins_over_if_modified_since(client, make_trip):
+    trip_id = make_trip()
+    first = client.get(f"/api/trips/{trip_id}")
+
+    response = client.get(f"/api/trips/{trip_id}", headers={
+        "If-None-Match": '"stale"', "If-Modified-Since": first.headers["Last-Modified"]
+    })
+
+    assert response.status_code == 200
+
+
+def test_head_returns_validators_without_a_body(client, make_trip):
+    trip_id = make_trip()
+
+    response = client.head(f"/api/trips/{trip_id}")
+
+    assert response.status_code == 200
+    assert response.data == b""
+    assert response.headers["ETag"] == client.get(f"/api/trips/{trip_id}").headers["ETag"]
+
+
+def test_deleting_a_trip_changes_the_listing_etag(client, user_id, make_trip):
+    make_trip()
+    doomed = make_trip(name="Second")
+    etag = client.get(f"/api/trips/user/{user_id}").headers["ETag"]
+
+    client.delete(f"/api/trips/{doomed}")
+    response = client.get(f"/api/trips/user/{user_id}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == 1
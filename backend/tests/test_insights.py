@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from insights import get_destination_insights, insights_store, travel_month
+import model_router
+
+INSIGHTS = json.dumps({"packingList": ["Umbrella"], "weatherForecast": "Mild", "localPhrases": [],
+                       "proTips": ["Book the Vatican early"]})
+
+
+@pytest.fixture
+def store(app, monkeypatch):
+    monkeypatch.setattr(insights_store, "enabled", True)
+    monkeypatch.setattr(insights_store, "_memory", type(insights_store._memory)())
+    return insights_store
+
+
+def test_trips_in_the_same_month_share_one_generation(client, llm, store):
+    llm.reply(INSIGHTS)
+
+    first = client.post("/api/trip-insights", json={"city": "Rome", "country": "Italy", "startDate": "2025-03-02"})
+    second = client.post("/api/trip-insights", json={"city": " rome", "country": "ITALY", "startDate": "2025-03-28"})
+
+    assert first.get_json() == second.get_json() == json.loads(INSIGHTS)
+    assert len(llm.calls) == 1
+
+
+def test_another_month_or_place_is_generated_separately(llm, store):
+    llm.reply(INSIGHTS)
+
+    get_destination_insights("Rome", "Italy", 3)
+    get_destination_insights("Rome", "Italy", 8)
+    get_destination_insights("Milan", "Italy", 3)
+
+    assert len(llm.calls) == 3
+
+
+def test_refresh_regenerates_a_stored_entry(llm, store):
+    llm.reply(INSIGHTS)
+    get_destination_insights("Rome", "Italy", 3)
+
+    get_destination_insights("Rome", "Italy", 3, refresh=True)
+
+    assert len(llm.calls) == 2
+
+
+def test_a_new_routing_policy_starts_fresh_entries(llm, store, monkeypatch):
+    llm.reply(INSIGHTS)
+    get_destination_insights("Rome", "Italy", 3)
+
+    monkeypatch.setitem(model_router.POLICIES, "insights", model_router.Policy(["another-model"]))
+    get_destination_insights("Rome", "Italy", 3)
+
+    assert len(llm.calls) == 2
+
+
+def test_the_month_comes_from_the_start_date():
+    assert travel_month("2025-11-30") == 11
+    assert 1 <= travel_month("not a date") <= 12
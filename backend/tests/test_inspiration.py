@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+import json
+
+import pytest
+
+from config import Config
+from inspiration import InspirationFeed, add_images
+from model_router import policy_version
+from models import InspirationSet
+
+SET = json.dumps({"posts": [{"title": "Amalfi", "category": "Beach", "excerpt": "Sun."}],
+                  "tips": [{"title": "Go early", "description": "Beat the crowds."}]})
+
+
+@pytest.fixture
+def feed(app):
+    feed = InspirationFeed()
+    feed.app = app
+    return feed
+
+
+def test_an_empty_pool_generates_and_stores_a_set(feed, llm):
+    llm.reply(SET)
+
+    assert feed.get()["posts"][0]["title"] == "Amalfi"
+    assert InspirationSet.query.one().model == policy_version("inspiration")
+
+
+def test_a_restarted_feed_serves_stored_sets_without_generating(feed, llm):
+    llm.reply(SET)
+    feed.get()
+
+    restarted = InspirationFeed()
+    restarted.app = feed.app
+    llm.reply(RuntimeError("should not be called"))
+
+    assert restarted.get()["tips"][0]["title"] == "Go early"
+    assert len(llm.calls) == 1
+
+
+def test_the_pool_keeps_the_newest_sets(feed, llm, monkeypatch):
+    monkeypatch.setattr(Config, "INSPIRATION_POOL_SIZE", 2)
+    llm.reply(SET)
+    for _ in range(3):
+        feed.refresh()
+
+    assert len(feed._pool) == 2
+    assert InspirationSet.query.count() == 2
+
+
+def test_warming_generates_only_when_the_pool_is_stale(feed, llm):
+    llm.reply(SET)
+    feed.refresh()
+    feed._loaded = False
+
+    feed._warm()
+    assert len(llm.calls) == 1
+
+    feed._pool = [(datetime.utcnow() - timedelta(seconds=Config.INSPIRATION_MAX_AGE_SECONDS + 1), {})]
+    feed._warm()
+    assert len(llm.calls) == 2
+
+
+def test_a_failed_refresh_keeps_the_last_good_sets(feed, llm):
+    llm.reply(SET)
+    feed.get()
+    llm.reply(RuntimeError("model down"))
+
+    feed._refresh_once()
+
+    assert feed.get()["posts"][0]["title"] == "Amalfi"
+
+
+def test_every_post_gets_a_category_image():
+    data = add_images({"posts": [{"category": "Cultural heritage"}, {"category": "Street food"}]})
+
+    assert all(post["image"].startswith("https://images.unsplash.com/") for post in data["posts"])
+
+
+def test_the_route_serves_the_pool(client, llm):
+    llm.reply(SET)
+
+    response = client.get("/api/inspiration")
+
+    assert response.status_code == 200
+    assert response.get_json()["posts"][0]["image"]
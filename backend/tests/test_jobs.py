@@ -0,0 +1,49 @@
+import json
+
+from jobs import job_queue
+
+PLAN = {"city": "Rome", "country": "Italy", "startDate": "2025-03-01", "endDate": "2025-03-02"}
+ITINERARY = json.dumps({"overview": "o", "days": [{"title": "a", "activities": []}, {"title": "b", "activities": []}]})
+
+
+def statuses(response):
+    return [line[len("event: "):] for line in response.get_data(as_text=True).split("\n") if line.startswith("event: ")]
+
+
+def test_a_job_replays_the_route_and_keeps_its_result(client, llm):
+    llm.reply(ITINERARY)
+
+    submitted = client.post("/api/jobs", json={"kind": "ai-plan", "payload": PLAN})
+    assert submitted.status_code == 202
+    job = submitted.get_json()
+
+    events = client.get(job["events_url"])
+    assert statuses(events)[-1] == "succeeded"
+
+    finished = client.get(job["status_url"]).get_json()
+    assert finished["result_status"] == 200
+    assert finished["result"] == client.post("/api/generate-ai-plan", json=PLAN).get_json()
+
+
+def test_a_failing_route_fails_the_job(client, llm):
+    job = client.post("/api/jobs", json={"kind": "ai-plan", "payload": {"city": "Rome"}}).get_json()
+
+    assert statuses(client.get(job["events_url"]))[-1] == "failed"
+    finished = client.get(job["status_url"]).get_json()
+    assert finished["result_status"] == 400
+    assert "Missing required field" in finished["result"]["error"]
+
+
+def test_a_full_queue_asks_the_client_to_retry(client, monkeypatch):
+    monkeypatch.setattr(job_queue, "max_pending", 0)
+
+    response = client.post("/api/jobs", json={"kind": "ai-plan", "payload": PLAN})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_unknown_kinds_and_jobs_are_rejected(client):
+    assert client.post("/api/jobs", json={"kind": "nope"}).status_code == 400
+    assert client.get("/api/jobs/missing").status_code == 404
+    assert client.get("/api/jobs/missing/events").status_code == 404
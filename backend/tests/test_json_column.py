@@ -0,0 +1,49 @@
+import json
+
+from extensions import db
+from json_column import RawJSON, as_raw, dumps, encode_json, load_json
+from models import Trip
+
+
+def test_raw_json_is_parsed_once():
+    raw = RawJSON('{"food": 200}')
+
+    assert raw.parsed() == {"food": 200}
+    assert raw.parsed() is raw.parsed()
+    assert raw == '{"food": 200}'
+
+
+def test_dumps_is_compact_and_sorted():
+    assert dumps({"b": 1, "a": [1, 2]}) == '{"a":[1,2],"b":1}'
+
+
+def test_load_json_accepts_raw_text_objects_and_blanks():
+    assert load_json(RawJSON("[1,2]")) == [1, 2]
+    assert load_json({"a": 1}) == {"a": 1}
+    assert load_json("", default={}) == {}
+    assert load_json(None) is None
+
+
+def test_as_raw_wraps_whatever_the_attribute_holds():
+    raw = RawJSON("[1]")
+
+    assert as_raw(raw) is raw
+    assert as_raw({"a": 1}) == '{"a":1}'
+    assert as_raw(None, default=[]) == "[]"
+
+
+def test_encode_json_splices_raw_values_verbatim():
+    body = encode_json([{"name": "Rome", "budget": RawJSON('{"food":  200}')}, RawJSON("[]")])
+
+    assert body == '[{"budget":{"food":  200},"name":"Rome"},[]]'
+    assert json.loads(body) == [{"budget": {"food": 200}, "name": "Rome"}, []]
+
+
+def test_columns_round_trip_as_raw_json(app, make_trip):
+    trip_id = make_trip(budget={"food": 200})
+
+    with app.app_context():
+        budget = db.session.get(Trip, trip_id).budget
+        assert isinstance(budget, RawJSON)
+        assert load_json(budget) == {"food": 200}
+        assert json.loads(encode_json(db.session.get(Trip, trip_id).to_dict(raw=True)))["budget"] == {"food": 200}
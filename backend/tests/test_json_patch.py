@@ -0,0 +1,128 @@
+import pytest
+
+from json_patch import apply_patch, PatchError
+
+TRIP = {"name": "Rome", "budget": {"total": 100}, "destinations": [{"city": "Rome"}, {"city": "Florence"}]}
+
+
+def test_add_replace_and_remove():
+    patched = apply_patch(TRIP, [
+        {"op": "add", "path": "/description", "value": "Spring"},
+        {"op": "replace", "path": "/budget/total", "value": 250},
+        {"op": "remove", "path": "/destinations/0"}
+    ])
+
+    assert patched == {"name": "Rome", "description": "Spring", "budget": {"total": 250},
+                       "destinations": [{"city": "Florence"}]}
+
+
+def test_the_input_document_is_not_modified():
+    apply_patch(TRIP, [{"op": "add", "path": "/destinations/-", "value": {"city": "Venice"}}])
+
+    assert len(TRIP["destinations"]) == 2
+
+
+def test_dash_appends_and_an_index_inserts():
+    patched = apply_patch(TRIP, [
+        {"op": "add", "path": "/destinations/-", "value": {"city": "Venice"}},
+        {"op": "add", "path": "/destinations/1", "value": {"city": "Siena"}}
+    ])
+
+    assert [d["city"] for d in patched["destinations"]] == ["Rome", "Siena", "Florence", "Venice"]
+
+
+def test_move_and_copy():
+    patched = apply_patch(TRIP, [
+        {"op": "copy", "from": "/destinations/0", "path": "/destinations/-"},
+        {"op": "move", "from": "/budget/total", "path": "/total"}
+    ])
+
+    assert patched["destinations"][-1] == {"city": "Rome"}
+    assert patched["total"] == 100
+    assert patched["budget"] == {}
+
+
+def test_pointer_escapes():
+    patched = apply_patch({"a/b": 1, "c~d": 2}, [
+        {"op": "replace", "path": "/a~1b", "value": 3},
+        {"op": "remove", "path": "/c~0d"}
+    ])
+
+    assert patched == {"a/b": 3}
+
+
+def test_a_failed_test_operation_rejects_the_whole_patch():
+    with pytest.raises(PatchError, match="Test failed"):
+        apply_patch(TRIP, [
+            {"op": "replace", "path": "/name", "value": "Milan"},
+            {"op": "test", "path": "/budget/total", "value": 999}
+        ])
+
+
+@pytest.mark.parametrize("operations", [
+    {"op": "add", "path": "/x", "value": 1},
+    [{"op": "add", "path": "/x"}],
+    [{"op": "remove", "path": "/missing"}],
+    [{"op": "replace", "path": "/destinations/2", "value": {}}],
+    [{"op": "add", "path": "/destinations/01", "value": {}}],
+    [{"op": "move", "from": "/budget", "path": "/budget/inner"}],
+    [{"op": "remove", "path": ""}],
+    [{"op": "add", "path": "name", "value": 1}],
+    [{"op": "rename", "path": "/name"}]
+])
+def test_invalid_operations_raise_patch_error(operations):
+    with pytest.raises(PatchError):
+        apply_patch(TRIP, operations)
+
+
+def patch(client, trip_id, operations, if_match=None):
+    headers = {"If-Match": if_match} if if_match is not None else {}
+    return client.patch(f"/api/trips/{trip_id}", json=operations, headers=headers)
+
+
+ADD_ACTIVITY = [{"op": "add", "path": "/destinations/0/activities/-", "value": {"name": "Colosseum"}}]
+
+
+def test_a_patch_applies_and_returns_the_new_etag(client, make_trip):
+    trip_id = make_trip(destinations=[{"city": "Rome", "activities": []}])
+    etag = client.get(f"/api/trips/{trip_id}").headers["ETag"]
+
+    response = patch(client, trip_id, ADD_ACTIVITY, etag)
+
+    assert response.status_code == 200
+    assert response.get_json()["trip"]["destinations"][0]["activities"] == [{"name": "Colosseum"}]
+    assert response.headers["ETag"] != etag
+    assert patch(client, trip_id, ADD_ACTIVITY, etag).status_code == 412
+
+
+def test_if_match_is_required(client, make_trip):
+    trip_id = make_trip(destinations=[{"city": "Rome", "activities": []}])
+
+    response = patch(client, trip_id, ADD_ACTIVITY)
+
+    assert response.status_code == 428
+    assert response.headers["ETag"] == client.get(f"/api/trips/{trip_id}").headers["ETag"]
+
+
+def test_if_match_may_list_several_tags(client, make_trip):
+    trip_id = make_trip(destinations=[{"city": "Rome", "activities": []}])
+    etag = client.get(f"/api/trips/{trip_id}").headers["ETag"]
+
+    assert patch(client, trip_id, ADD_ACTIVITY, f'"stale", W/{etag}').status_code == 200
+    assert patch(client, trip_id, ADD_ACTIVITY, "*").status_code == 200
+
+
+def test_a_stale_tag_gets_the_current_trip(client, make_trip):
+    trip_id = make_trip(destinations=[{"city": "Rome", "activities": []}])
+
+    response = patch(client, trip_id, ADD_ACTIVITY, '"1-2000-01-01T00:00:00"')
+
+    assert response.status_code == 412
+    assert response.get_json()["trip"]["destinations"] == [{"city": "Rome", "activities": []}]
+
+
+def test_invalid_patches_are_unprocessable(client, make_trip):
+    trip_id = make_trip()
+
+    assert patch(client, trip_id, [{"op": "add", "path": "/owner", "value": 1}], "*").status_code == 422
+    assert patch(client, trip_id, [{"op": "remove", "path": "/destinations/3"}], "*").status_code == 422
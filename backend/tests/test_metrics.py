@@ -0,0 +1,47 @@
+import pytest
+from flask import Flask
+
+from metrics import Metrics
+
+
+@pytest.fixture
+def instrumented():
+    # Hooks wired by hand: init_app would also add global SQL listeners to the test process
+    metrics = Metrics()
+    app = Flask(__name__)
+    app.config["PROPAGATE_EXCEPTIONS"] = True
+    metrics.app = app
+    app.before_request(metrics._before_request)
+    app.after_request(metrics._after_request)
+    app.teardown_request(metrics._teardown_request)
+
+    @app.route("/ok")
+    def ok():
+        return "ok"
+
+    @app.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    return app, metrics
+
+
+def count_line(route, status):
+    return f'http_request_duration_seconds_count{{method="GET",route="{route}",status="{status}"}} 1'
+
+
+def test_requests_are_counted_by_status(instrumented):
+    app, metrics = instrumented
+
+    app.test_client().get("/ok")
+
+    assert count_line("/ok", 200) in metrics.render()
+
+
+def test_a_view_that_raises_is_counted_as_a_500(instrumented):
+    app, metrics = instrumented
+
+    with pytest.raises(RuntimeError):
+        app.test_client().get("/boom")
+
+    assert count_line("/boom", 500) in metrics.render()
@@ -0,0 +1,103 @@
+from concurrent.futures import Future
+import threading
+
+import pytest
+
+from config import Config
+import model_router
+from model_router import ModelRouter, Policy, policy_version
+
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setattr(Config, "ROUTER_EXPLORE_RATE", 0)
+    return ModelRouter()
+
+
+def record(router, route, model, seconds, first_token, samples=None):
+    for _ in range(samples or Config.ROUTER_MIN_SAMPLES):
+        router.stats.started(model)
+        router.stats.finished(route, model, seconds, True, first_token=first_token)
+
+
+def test_only_streamed_calls_hedge(router):
+    assert router._hedge_after("chat", {"stream": True}) == Config.ROUTER_HEDGE_AFTER
+    assert router._hedge_after("chat", {}) is None
+    assert router._hedge_after("plan-chunk", {"stream": True}) is None
+
+
+def test_the_policy_version_names_every_model_a_route_may_use(monkeypatch):
+    version = policy_version("itinerary")
+    assert Config.ROUTER_LARGE_MODEL in version and Config.ROUTER_FAST_MODEL in version
+
+    monkeypatch.setitem(model_router.POLICIES, "itinerary", Policy(["another-model"]))
+
+    assert policy_version("itinerary") != version
+    assert policy_version("itinerary", "insights").startswith("itinerary=another-model,insights=")
+
+
+def test_slow_full_completions_do_not_demote_the_first_choice(router):
+    record(router, "itinerary", Config.ROUTER_LARGE_MODEL, 20.0, first_token=False)
+    record(router, "itinerary", Config.ROUTER_FAST_MODEL, 2.0, first_token=False)
+
+    assert router.candidates("itinerary")[0] == Config.ROUTER_LARGE_MODEL
+
+
+def test_a_much_slower_first_token_gives_way(router):
+    record(router, "chat", Config.ROUTER_LARGE_MODEL, 3.0, first_token=True)
+    record(router, "chat", Config.ROUTER_FAST_MODEL, 0.5, first_token=True)
+
+    assert router.candidates("chat")[0] == Config.ROUTER_FAST_MODEL
+
+
+def test_exploring_skips_models_in_a_cooldown(monkeypatch):
+    monkeypatch.setattr(Config, "ROUTER_EXPLORE_RATE", 1)
+    router = ModelRouter()
+    for _ in range(Config.ROUTER_MIN_SAMPLES):
+        router.stats.started(Config.ROUTER_LARGE_MODEL)
+        router.stats.finished("chat", Config.ROUTER_LARGE_MODEL, 1.0, False)
+
+    # A failing model is still explored...
+    assert router.candidates("chat")[0] == Config.ROUTER_LARGE_MODEL
+
+    # ...but not one that is rate limited
+    router.stats.cool_down(Config.ROUTER_LARGE_MODEL, 60)
+    assert router.candidates("chat") == [Config.ROUTER_FAST_MODEL, Config.ROUTER_LARGE_MODEL]
+
+
+def test_a_hedge_answers_when_the_first_model_is_slow(router, monkeypatch):
+    release = threading.Event()
+
+    def call(route, model, kwargs):
+        if model == Config.ROUTER_LARGE_MODEL:
+            release.wait(5)
+        return model
+
+    monkeypatch.setattr(router, "_call", call)
+    try:
+        assert router._hedged("chat", Config.ROUTER_LARGE_MODEL, Config.ROUTER_FAST_MODEL, 0.05, {}) \
+            == Config.ROUTER_FAST_MODEL
+    finally:
+        release.set()
+
+
+def test_with_no_hedge_thread_free_the_call_runs_on_the_caller(router, monkeypatch):
+    threads = []
+    monkeypatch.setattr(model_router, "_slots", threading.BoundedSemaphore(1))
+    model_router._slots.acquire()
+    monkeypatch.setattr(router, "_call", lambda route, model, kwargs: threads.append(threading.current_thread()))
+
+    router._hedged("chat", Config.ROUTER_LARGE_MODEL, Config.ROUTER_FAST_MODEL, 0.05, {})
+
+    assert threads == [threading.current_thread()]
+
+
+def test_a_loser_that_has_not_started_is_cancelled(monkeypatch):
+    monkeypatch.setattr(model_router, "_slots", threading.BoundedSemaphore(1))
+    future = Future()
+    model_router._slots.acquire()
+
+    model_router._drop(future)
+
+    assert future.cancelled()
+    assert model_router._slots.acquire(blocking=False)
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+import app as app_module
+from config import Config
+from extensions import db
+import passwords
+from models import User
+from passwords import UnknownEmailCache, needs_rehash
+
+
+def login(client, email="ada@example.com", password="secret"):
+    return client.post("/api/login", json={"email": email, "password": password})
+
+
+def test_login_checks_the_password(client, user_id):
+    assert login(client).status_code == 200
+    assert login(client, password="wrong").status_code == 401
+
+
+def test_a_hash_with_another_work_factor_is_replaced_on_login(client, user_id, monkeypatch):
+    monkeypatch.setattr(Config, "BCRYPT_ROUNDS", 5)
+    assert needs_rehash(db.session.get(User, int(user_id)).password)
+
+    assert login(client).status_code == 200
+
+    db.session.expire_all()
+    stored = db.session.get(User, int(user_id)).password
+    assert stored.startswith(b"$2b$05$")
+    assert login(client).status_code == 200
+
+
+def test_repeated_unknown_emails_skip_the_dummy_check(client, monkeypatch):
+    checks = []
+    monkeypatch.setattr(app_module, "check_unknown_email", lambda password: checks.append(password))
+    monkeypatch.setattr(app_module, "unknown_emails", UnknownEmailCache(ttl_seconds=60))
+
+    assert login(client, email="nobody@example.com").status_code == 401
+    assert login(client, email="nobody@example.com").status_code == 401
+    assert len(checks) == 1
+
+
+def test_a_cached_unknown_email_does_not_block_a_new_user(client, monkeypatch):
+    cache = UnknownEmailCache(ttl_seconds=60)
+    cache.add("ada@example.com")  # as if another worker saw the miss before registration
+    monkeypatch.setattr(app_module, "unknown_emails", cache)
+
+    client.post("/api/register", json={
+        "first_name": "Ada", "last_name": "L", "email": "ada@example.com", "password": "secret"
+    })
+
+    assert login(client).status_code == 200
+
+
+def test_a_full_hashing_queue_turns_logins_away(client, user_id, monkeypatch):
+    monkeypatch.setattr(passwords, "_slots", threading.BoundedSemaphore(1))
+    passwords._slots.acquire()
+
+    response = login(client)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.parametrize("hashed, expected", [(b"$2b$04$abc", False), (b"$2b$12$abc", True), (b"plain", False)])
+def test_needs_rehash_reads_the_cost_from_the_hash(hashed, expected):
+    assert needs_rehash(hashed) is expected
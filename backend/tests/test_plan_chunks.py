@@ -0,0 +1,62 @@
+import json
+import re
+
+import pytest
+
+from plan_chunks import day_ranges, _collect, _join_days
+from structured_output import StructuredOutputError
+
+
+def test_day_ranges_split_a_trip_into_chunks():
+    assert day_ranges(7, chunk_days=3) == [(1, 3), (4, 6), (7, 7)]
+
+
+def test_day_ranges_start_at_the_first_missing_day():
+    assert day_ranges(7, chunk_days=3, first_day=5) == [(5, 7)]
+
+
+def test_day_ranges_of_a_short_trip_are_one_chunk():
+    assert day_ranges(2, chunk_days=3) == [(1, 2)]
+    assert day_ranges(0, chunk_days=3) == []
+
+
+def chunk(*titles):
+    return {"days": [{"title": title, "activities": []} for title in titles]}
+
+
+def test_a_short_chunk_is_asked_for_again_from_its_first_missing_day():
+    days = {}
+
+    short = _collect(days, [(1, 3), (4, 6)], [chunk("d1", "d2", "d3"), chunk("d4")])
+    assert short == [(5, 6)]
+
+    assert _collect(days, short, [chunk("d5", "d6", "extra")]) == []
+    assert [day["title"] for day in _join_days(days, [])] == ["d1", "d2", "d3", "d4", "d5", "d6"]
+
+
+def test_days_still_missing_fail_instead_of_shifting_dates():
+    with pytest.raises(StructuredOutputError, match="days 5-6"):
+        _join_days({1: {}, 2: {}}, [(5, 6)])
+
+
+def chunk_reply(kwargs):
+    prompt = kwargs["messages"][-1]["content"]
+    match = re.search(r"Plan ONLY days (\d+) to (\d+)", prompt)
+    if match is None:
+        return json.dumps({"overview": "A week in Rome", "highlights": ["Forum"], "estimatedBudget": {"total": 700}})
+    first, last = int(match.group(1)), int(match.group(2))
+    return json.dumps({"days": [{"title": f"Day {n}", "activities": []} for n in range(first, last + 1)]})
+
+
+def test_a_long_trip_is_planned_in_day_range_chunks(client, llm):
+    llm.reply(chunk_reply)
+
+    response = client.post("/api/generate-ai-plan", json={
+        "city": "Rome", "country": "Italy", "startDate": "2025-03-01", "endDate": "2025-03-07"
+    })
+
+    itinerary = response.get_json()["itinerary"]
+    assert [day["title"] for day in itinerary["days"]] == [f"Day {n}" for n in range(1, 8)]
+    assert itinerary["days"][-1]["date"] == "2025-03-07"
+    assert itinerary["overview"] == "A week in Rome"
+    assert sorted(call["route"] for call in llm.calls) == ["plan-chunk"] * 3 + ["plan-summary"]
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+import time
+
+import pytest
+
+from rate_limit import Bucket, MemoryStore, RateLimiter, client_key, user_key, _day
+
+
+def test_a_new_bucket_allows_a_full_burst_then_refuses():
+    bucket = Bucket("ai", per_minute=6, burst=3)
+    tokens, results = 3, []
+    for _ in range(4):
+        allowed, tokens, wait = bucket.take(tokens, 0, 0)
+        results.append(allowed)
+
+    assert results == [True, True, True, False]
+    assert wait == pytest.approx(10)
+
+
+def test_tokens_refill_at_the_configured_rate():
+    bucket = Bucket("ai", per_minute=6, burst=3)
+
+    allowed, tokens, _ = bucket.take(0, updated=0, now=10)
+
+    assert allowed
+    assert tokens == pytest.approx(0)
+
+
+def test_refill_is_capped_at_the_burst():
+    bucket = Bucket("crud", per_minute=60, burst=5)
+
+    _, tokens, _ = bucket.take(2, updated=0, now=3600)
+
+    assert tokens == pytest.approx(4)
+
+
+def test_a_clock_going_backwards_adds_no_tokens():
+    bucket = Bucket("crud", per_minute=60, burst=5)
+
+    allowed, tokens, _ = bucket.take(0.5, updated=100, now=50)
+
+    assert not allowed
+    assert tokens == pytest.approx(0.5)
+
+
+def test_reset_after_is_the_time_to_a_full_bucket():
+    assert Bucket("ai", per_minute=6, burst=3).reset_after(1) == 20
+
+
+def test_memory_store_keeps_a_bucket_per_client():
+    store, bucket = MemoryStore(), Bucket("ai", per_minute=6, burst=1)
+
+    assert store.take(bucket, "user:1", 0)[0]
+    assert not store.take(bucket, "user:1", 1)[0]
+    assert store.take(bucket, "user:2", 1)[0]
+
+
+def test_memory_store_counts_usage_per_day():
+    store = MemoryStore()
+    store.charge("user:1", "2025-01-01", 100)
+    store.charge("user:1", "2025-01-01", 50)
+    store.charge("user:1", "2025-01-02", 10)
+
+    assert store.used("user:1", "2025-01-02") == 10
+    assert store.used("user:1", "2025-01-01") == 0  # older days are dropped
+    assert store.used("user:2", "2025-01-02") == 0
+
+
+def test_day_and_seconds_to_utc_midnight():
+    assert _day(86400 * 3 + 3600) == ("1970-01-04", 82800)
+
+
+def limiter(daily_tokens=0):
+    limiter = RateLimiter()
+    limiter.enabled = True
+    limiter.store = MemoryStore()
+    limiter.buckets = {"ai": Bucket("ai", per_minute=6, burst=2)}
+    limiter.daily_tokens = daily_tokens
+    return limiter
+
+
+def test_new_user_ids_do_not_escape_the_ip_bucket():
+    rate_limiter = limiter()
+    decisions = [rate_limiter.check("ai", client_key("1.2.3.4"), user_key(n), now=0) for n in range(3)]
+
+    assert [decision.allowed for decision in decisions] == [True, True, False]
+
+
+def test_a_user_is_limited_across_ips():
+    rate_limiter = limiter()
+    decisions = [rate_limiter.check("ai", client_key(f"1.2.3.{n}"), user_key(7), now=0) for n in range(3)]
+
+    assert [decision.allowed for decision in decisions] == [True, True, False]
+
+
+def test_the_quota_is_charged_to_the_ip_not_the_named_user():
+    rate_limiter = limiter(daily_tokens=100)
+    rate_limiter.bind(client_key("6.6.6.6"))
+    rate_limiter.charge(SimpleNamespace(total_tokens=500))
+
+    assert not rate_limiter.check("ai", client_key("6.6.6.6"), user_key(7), now=time.time()).allowed
+    assert rate_limiter.check("ai", client_key("1.2.3.4"), user_key(7), now=time.time()).allowed
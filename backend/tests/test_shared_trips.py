@@ -0,0 +1,64 @@
+import pytest
+
+from config import Config
+
+
+@pytest.fixture
+def share(client):
+    def share(trip_id):
+        return client.post(f"/api/trips/{trip_id}/share").get_json()["share_token"]
+    return share
+
+
+def test_the_public_view_hides_private_fields(client, make_trip, share):
+    token = share(make_trip(name="Rome", budget={"total": 900}))
+
+    response = client.get(f"/api/shared/{token}")
+    trip = response.get_json()
+
+    assert response.status_code == 200
+    assert trip["name"] == "Rome"
+    assert trip["shared_by"] == "Ada"
+    assert "budget" not in trip and "user_id" not in trip
+    assert response.headers["Cache-Control"].startswith("public, max-age=")
+
+
+def test_a_matching_etag_gets_304(client, make_trip, share):
+    token = share(make_trip())
+    etag = client.get(f"/api/shared/{token}").headers["ETag"]
+
+    assert client.get(f"/api/shared/{token}", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_edits_show_once_the_memo_expires(client, make_trip, share, monkeypatch):
+    monkeypatch.setattr(Config, "SHARED_TRIP_MEMO_SECONDS", 0)
+    trip_id = make_trip()
+    token = share(trip_id)
+    etag = client.get(f"/api/shared/{token}").headers["ETag"]
+
+    client.put(f"/api/trips/{trip_id}", json={"name": "Rome again"})
+    response = client.get(f"/api/shared/{token}")
+
+    assert response.get_json()["name"] == "Rome again"
+    assert response.headers["ETag"] != etag
+
+
+def test_sharing_twice_keeps_the_token(make_trip, share):
+    trip_id = make_trip()
+
+    assert share(trip_id) == share(trip_id)
+
+
+def test_unsharing_revokes_the_link(client, make_trip, share):
+    trip_id = make_trip()
+    token = share(trip_id)
+    client.get(f"/api/shared/{token}")
+
+    client.delete(f"/api/trips/{trip_id}/share")
+
+    assert client.get(f"/api/shared/{token}").status_code == 404
+    assert share(trip_id) != token
+
+
+def test_unknown_tokens_are_not_found(client):
+    assert client.get("/api/shared/nope").status_code == 404
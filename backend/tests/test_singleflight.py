@@ -0,0 +1,76 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def run_together(flight, key, fn, callers=5):
+    """Start `callers` calls for `key` while the first is still in flight."""
+    with ThreadPoolExecutor(callers) as pool:
+        futures = [pool.submit(flight.do, "plans", key, fn) for _ in range(callers)]
+        while flight.stats()["calls"] + flight.stats()["deduplicated"] < callers:
+            time.sleep(0.001)
+        release.set()
+        return [future.exception() or future.result() for future in futures]
+
+
+release = threading.Event()
+
+
+@pytest.fixture(autouse=True)
+def reset_release():
+    release.clear()
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    flight, calls = SingleFlight(), []
+
+    def generate():
+        calls.append(1)
+        release.wait(5)
+        return {"days": []}
+
+    results = run_together(flight, ("rome", 3), generate)
+
+    assert calls == [1]
+    assert results == [{"days": []}] * 5
+    assert flight.stats()["by_route"]["plans"] == {"calls": 1, "deduplicated": 4}
+
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight()
+
+    def generate():
+        release.wait(5)
+        raise ValueError("model down")
+
+    results = run_together(flight, "k", generate, callers=3)
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_calls_that_do_not_overlap_are_not_shared():
+    flight = SingleFlight()
+
+    assert flight.do("plans", "k", lambda: 1) == 1
+    assert flight.do("plans", "k", lambda: 2) == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_coroutines_share_one_call():
+    flight, calls = SingleFlight(), []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "plan"
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("plans", "k", generate) for _ in range(4)))
+
+    assert asyncio.run(main()) == ["plan"] * 4
+    assert calls == [1]
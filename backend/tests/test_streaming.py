@@ -0,0 +1,63 @@
+import json
+
+from streaming import sse, stream_requested, DayStreamParser
+
+PLAN = {"city": "Rome", "country": "Italy", "startDate": "2025-03-01", "endDate": "2025-03-03"}
+
+
+def itinerary(days):
+    return json.dumps({
+        "tripName": "x", "overview": "o", "highlights": [],
+        "days": [{"dayNumber": 9, "date": "x", "title": "Day", "activities": []} for _ in range(days)]
+    })
+
+
+def events(response):
+    parsed = []
+    for message in response.get_data(as_text=True).strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in message.split("\n"))
+        parsed.append((lines.get("event"), json.loads(lines["data"])))
+    return parsed
+
+
+def test_sse_formats_an_event():
+    assert sse({"a": 1}, event="day") == 'event: day\ndata: {"a": 1}\n\n'
+    assert sse({"a": 1}) == 'data: {"a": 1}\n\n'
+
+
+def test_streaming_is_asked_for_by_query_accept_or_body():
+    assert stream_requested("true", None, None)
+    assert stream_requested(None, "text/event-stream", None)
+    assert stream_requested(None, None, {"stream": True})
+    assert not stream_requested(None, "application/json", {"stream": "yes"})
+
+
+def test_days_are_parsed_as_soon_as_they_close():
+    parser = DayStreamParser()
+
+    assert parser.feed('{"overview": "a {b}", "days": [{"title": "one }"}, {"ti') == [{"title": "one }"}]
+    assert parser.feed('tle": "two"}]}') == [{"title": "two"}]
+
+
+def test_a_streamed_plan_matches_the_plain_response(client, llm):
+    llm.reply(itinerary(3))
+
+    streamed = events(client.post("/api/generate-ai-plan?stream=1", json=PLAN))
+    plain = client.post("/api/generate-ai-plan", json=PLAN).get_json()
+
+    days = [data for event, data in streamed if event == "day"]
+    done = streamed[-1]
+    assert [day["date"] for day in days] == ["2025-03-01", "2025-03-02", "2025-03-03"]
+    assert [day["dayNumber"] for day in days] == [1, 2, 3]
+    assert done[0] == "done"
+    assert done[1]["itinerary"] == plain["itinerary"]
+
+
+def test_chat_streams_tokens_then_the_reply(client, llm):
+    llm.reply("Pack light for Rome.")
+
+    streamed = events(client.post("/api/chat", json={"message": "Tips?", "stream": True}))
+
+    assert "".join(data["token"] for event, data in streamed if event is None) == "Pack light for Rome."
+    assert streamed[-1][0] == "done"
+    assert streamed[-1][1]["response"] == "Pack light for Rome."
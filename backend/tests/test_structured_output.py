@@ -0,0 +1,83 @@
+import pytest
+
+from structured_output import (
+    conform, parse_json, repair_json, SchemaError, StructuredOutputError, DAYS_SCHEMA, ITINERARY_SCHEMA
+)
+
+
+def test_valid_json_needs_no_repair():
+    assert repair_json('{"days": []}') == ({"days": []}, [])
+
+
+def test_code_fences_are_stripped():
+    assert repair_json('```json\n{"days": []}\n```') == ({"days": []}, ["fence"])
+
+
+def test_prose_around_the_value_is_dropped():
+    value, repairs = repair_json('Here is your plan: {"days": [1, 2]} Enjoy!')
+
+    assert value == {"days": [1, 2]}
+    assert repairs == ["extracted"]
+
+
+def test_trailing_commas_are_removed():
+    value, repairs = repair_json('{"highlights": ["a", "b",], "days": [],}')
+
+    assert value == {"highlights": ["a", "b"], "days": []}
+    assert repairs == ["trailing_comma"]
+
+
+def test_a_truncated_document_keeps_only_its_complete_items():
+    text = '{"overview": "x", "days": [{"activities": [{"title": "a"}]}, {"activities": [{"tit'
+
+    value, repairs = repair_json(text)
+
+    assert value == {"overview": "x", "days": [{"activities": [{"title": "a"}]}]}
+    assert repairs == ["truncated"]
+
+
+def test_brackets_inside_strings_do_not_confuse_the_scanner():
+    value, _ = repair_json('{"days": [{"activities": [{"title": "a [b] {c}"}]}, {"act')
+
+    assert value == {"days": [{"activities": [{"title": "a [b] {c}"}]}]}
+
+
+def test_text_without_json_is_an_error():
+    with pytest.raises(ValueError):
+        repair_json("Sorry, I can't help with that.")
+
+
+def test_conform_drops_invalid_items_and_optional_properties():
+    value = {"days": [
+        {"activities": [{"title": "a", "cost": "free"}, {"time": "9:00"}]},
+        {"title": "no activities"}
+    ]}
+
+    dropped = conform(value, DAYS_SCHEMA)
+
+    assert value == {"days": [{"activities": [{"title": "a"}]}]}
+    assert dropped == 3
+
+
+def test_conform_rejects_a_missing_required_property():
+    with pytest.raises(SchemaError, match="missing days"):
+        conform({"overview": "x"}, ITINERARY_SCHEMA)
+
+
+def test_conform_does_not_take_booleans_for_numbers():
+    with pytest.raises(SchemaError):
+        conform(True, {"type": "number"})
+
+
+def test_parse_json_reports_truncation():
+    value, truncated = parse_json('{"days": [{"activities": []}, {"activ', ITINERARY_SCHEMA, "itinerary")
+
+    assert value == {"days": [{"activities": []}]}
+    assert truncated
+
+
+def test_parse_json_keeps_the_text_of_a_failed_parse():
+    with pytest.raises(StructuredOutputError) as error:
+        parse_json('{"overview": "x"}', ITINERARY_SCHEMA, "itinerary")
+
+    assert error.value.text == '{"overview": "x"}'
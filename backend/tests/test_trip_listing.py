@@ -0,0 +1,55 @@
+def listing(client, user_id, **params):
+    return client.get(f"/api/trips/user/{user_id}", query_string=params)
+
+
+def test_pages_follow_the_next_cursor_newest_first(client, user_id, make_trip):
+    ids = [make_trip(name=f"Trip {n}") for n in range(5)]
+
+    seen, cursor = [], None
+    while True:
+        response = listing(client, user_id, limit=2, **({"cursor": cursor} if cursor else {}))
+        seen += [trip["_id"] for trip in response.get_json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == ids[::-1]
+
+
+def test_without_a_limit_every_trip_is_listed(client, user_id, make_trip):
+    for _ in range(3):
+        make_trip()
+
+    assert len(listing(client, user_id).get_json()) == 3
+
+
+def test_summary_and_fields_project_the_rows(client, user_id, make_trip):
+    make_trip(destinations=[{"city": "Rome", "activities": []}])
+
+    summary = listing(client, user_id, summary=1).get_json()[0]
+    fields = listing(client, user_id, fields="_id,name").get_json()[0]
+
+    assert "destinations" not in summary
+    assert set(fields) == {"_id", "name"}
+
+
+def test_status_and_visibility_filter_the_listing(client, user_id, make_trip):
+    make_trip(name="Done", status="completed")
+    make_trip(name="Open")
+
+    assert [trip["name"] for trip in listing(client, user_id, status="completed").get_json()] == ["Done"]
+    assert len(listing(client, user_id, visibility="private").get_json()) == 2
+
+
+def test_the_listing_etag_changes_when_a_trip_is_deleted(client, user_id, make_trip):
+    trip_id = make_trip()
+    make_trip()
+    etag = listing(client, user_id).headers["ETag"]
+
+    assert client.get(f"/api/trips/user/{user_id}", headers={"If-None-Match": etag}).status_code == 304
+    client.delete(f"/api/trips/{trip_id}")
+    assert client.get(f"/api/trips/user/{user_id}", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_a_bad_cursor_is_rejected(client, user_id):
+    assert listing(client, user_id, cursor="nope", limit=2).status_code == 400
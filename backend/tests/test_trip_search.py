@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import text
+
+from extensions import db
+from trip_search import highlight, trip_search, MARK_START, MARK_END
+
+
+@pytest.fixture(autouse=True)
+def empty_index(app):
+    # The FTS table is not a model, so drop_all between tests leaves its rows behind
+    if trip_search.enabled:
+        db.session.execute(text("DELETE FROM trip_search"))
+        db.session.commit()
+
+
+def search(client, user_id, q, **params):
+    return client.get(f"/api/trips/user/{user_id}/search", query_string=dict(params, q=q))
+
+
+def trip_names(response):
+    return [hit["trip"]["name"] for hit in response.get_json()["results"]]
+
+
+def test_trips_are_found_by_name_place_and_activity(client, user_id, make_trip):
+    make_trip(name="Roman holiday")
+    make_trip(name="Spring break", destinations=[{"city": "Rome", "activities": [{"name": "Colosseum tour"}]}])
+    make_trip(name="Oslo", destinations=[{"city": "Oslo", "activities": []}])
+
+    assert trip_names(search(client, user_id, "rom")) == ["Roman holiday", "Spring break"]
+    assert trip_names(search(client, user_id, "colosseum")) == ["Spring break"]
+
+
+def test_snippets_escape_trip_text_around_the_marks(client, user_id, make_trip):
+    make_trip(name="Rome <script>alert(1)</script>")
+
+    snippet = search(client, user_id, "rome").get_json()["results"][0]["snippet"]
+
+    assert "<script>" not in snippet
+    assert "<mark>Rome</mark>" in snippet
+
+
+def test_edits_and_deletes_update_the_index(client, user_id, make_trip):
+    trip_id = make_trip(name="Lisbon")
+
+    client.put(f"/api/trips/{trip_id}", json={"name": "Porto"})
+    assert trip_names(search(client, user_id, "lisbon")) == []
+    assert trip_names(search(client, user_id, "porto")) == ["Porto"]
+
+    client.delete(f"/api/trips/{trip_id}")
+    assert trip_names(search(client, user_id, "porto")) == []
+
+
+def test_other_users_trips_are_not_searched(client, user_id, make_trip):
+    make_trip(name="Kyoto")
+
+    assert trip_names(search(client, int(user_id) + 1, "kyoto")) == []
+
+
+def test_like_matching_is_used_without_fts(client, user_id, make_trip, monkeypatch):
+    make_trip(name="Spring break", destinations=[{"city": "Rome", "activities": []}])
+    monkeypatch.setattr(trip_search, "enabled", False)
+
+    response = search(client, user_id, "rome")
+
+    assert trip_names(response) == ["Spring break"]
+    assert response.get_json()["results"][0]["snippet"] is None
+
+
+def test_a_query_is_required(client, user_id):
+    assert search(client, user_id, " ").status_code == 400
+
+
+def test_highlight_marks_only_the_sentinels():
+    assert highlight(f"a&b {MARK_START}x{MARK_END}") == "a&amp;b <mark>x</mark>"
@@ -0,0 +1,181 @@
+import html
+import re
+
+from sqlalchemy import event, or_, text
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+from models import Trip, Destination, Activity
+
+# bm25 weights for name, description, places, activities
+COLUMN_WEIGHTS = (10.0, 2.0, 5.0, 1.0)
+# FTS5 wraps matches in these; they become <mark> tags once the trip text is escaped
+MARK_START, MARK_END = "\x02", "\x03"
+
+
+def highlight(snippet):
+    """HTML-escape a snippet's trip text, then turn the match markers into <mark> tags."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+class TripSearch:
+    """
+    Full-text search over a user's trips, backed by an SQLite FTS5 table that
+    is kept in sync from session events, so every write path (routes, jobs,
+    migrations) updates it in the same transaction. Other databases fall
+    back to LIKE matching.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        event.listen(db.session, "after_flush", self._collect)
+        event.listen(db.session, "before_commit", self._sync)
+        event.listen(db.session, "after_rollback", self._forget)
+
+        with app.app_context():
+            if db.engine.dialect.name != "sqlite":
+                return
+            try:
+                self._ensure_table()
+            except OperationalError as e:
+                app.logger.warning("Trip search index unavailable: %s", e)
+
+    def _ensure_table(self):
+        exists = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'trip_search'")
+        ).first()
+        if exists:
+            self.enabled = True
+            return
+
+        db.session.execute(text(
+            "CREATE VIRTUAL TABLE trip_search USING fts5("
+            "name, description, places, activities, "
+            "trip_id UNINDEXED, user_id UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+        db.session.commit()
+        self.enabled = True
+        try:
+            self.rebuild()
+        except OperationalError:
+            # Fresh database without a trips table yet
+            db.session.rollback()
+
+    def rebuild(self, batch_size=500):
+        """Index every trip from scratch."""
+        db.session.execute(text("DELETE FROM trip_search"))
+        last_id = 0
+        while True:
+            trip_ids = [trip_id for (trip_id,) in db.session.query(Trip.id)
+                        .filter(Trip.id > last_id).order_by(Trip.id).limit(batch_size)]
+            if not trip_ids:
+                break
+            db.session.info.setdefault("search_reindex", set()).update(trip_ids)
+            db.session.commit()
+            last_id = trip_ids[-1]
+        db.session.commit()
+
+    # ------------------ keeping the index in sync ------------------
+
+    def _collect(self, session, flush_context):
+        if not self.enabled:
+            return
+        reindex = session.info.setdefault("search_reindex", set())
+        removed = session.info.setdefault("search_remove", set())
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, Trip):
+                reindex.add(obj.id)
+            elif isinstance(obj, (Destination, Activity)) and obj.trip_id:
+                reindex.add(obj.trip_id)
+        for obj in session.deleted:
+            if isinstance(obj, Trip):
+                removed.add(obj.id)
+            elif isinstance(obj, (Destination, Activity)) and obj.trip_id:
+                reindex.add(obj.trip_id)
+
+    def _sync(self, session):
+        if not self.enabled:
+            return
+        session.flush()
+        reindex = session.info.pop("search_reindex", set())
+        removed = session.info.pop("search_remove", set())
+        if not reindex and not removed:
+            return
+
+        for trip_id in reindex | removed:
+            session.execute(text("DELETE FROM trip_search WHERE trip_id = :trip_id"), {"trip_id": trip_id})
+
+        for trip_id in reindex - removed:
+            trip = session.get(Trip, trip_id)
+            if trip is None:
+                continue
+            destinations = trip.destinations_list()
+            session.execute(text(
+                "INSERT INTO trip_search (name, description, places, activities, trip_id, user_id) "
+                "VALUES (:name, :description, :places, :activities, :trip_id, :user_id)"
+            ), {
+                "name": trip.name or "",
+                "description": trip.description or "",
+                "places": " ".join(
+                    f"{d.get('city') or ''} {d.get('country') or ''}" for d in destinations
+                ),
+                "activities": " ".join(
+                    str(a.get("name") or a.get("title") or "")
+                    for d in destinations for a in d.get("activities") or []
+                ),
+                "trip_id": trip.id,
+                "user_id": trip.user_id
+            })
+
+    def _forget(self, session):
+        session.info.pop("search_reindex", None)
+        session.info.pop("search_remove", None)
+
+    # ------------------ queries ------------------
+
+    def search(self, user_id, query, limit=20, offset=0):
+        """Return [(trip_id, snippet, score)] best first."""
+        terms = re.findall(r"\w+", query.lower())
+        if not terms:
+            return []
+
+        if not self.enabled:
+            return self._search_like(user_id, terms, limit, offset)
+
+        # Quote every term so user input is never parsed as FTS syntax;
+        # the last term is a prefix so results update while typing
+        match = " ".join(f'"{term}"' for term in terms) + "*"
+        rows = db.session.execute(text(
+            "SELECT trip_id, "
+            "snippet(trip_search, -1, :mark_start, :mark_end, '…', 12) AS snippet, "
+            f"bm25(trip_search, {', '.join(str(w) for w in COLUMN_WEIGHTS)}) AS score "
+            "FROM trip_search WHERE trip_search MATCH :match AND user_id = :user_id "
+            "ORDER BY score LIMIT :limit OFFSET :offset"
+        ), {"match": match, "user_id": user_id, "limit": limit, "offset": offset,
+            "mark_start": MARK_START, "mark_end": MARK_END})
+        return [(row.trip_id, highlight(row.snippet), -row.score) for row in rows]
+
+    def _search_like(self, user_id, terms, limit, offset):
+        query = Trip.query.filter_by(user_id=user_id)
+        for term in terms:
+            pattern = f"%{term}%"
+            query = query.filter(or_(
+                Trip.name.ilike(pattern),
+                Trip.description.ilike(pattern),
+                Trip.id.in_(db.session.query(Destination.trip_id).filter(or_(
+                    Destination.city.ilike(pattern), Destination.country.ilike(pattern)
+                ))),
+                Trip.id.in_(db.session.query(Activity.trip_id).filter(Activity.name.ilike(pattern)))
+            ))
+        trips = query.order_by(Trip.created_at.desc()).limit(limit).offset(offset).with_entities(Trip.id)
+        return [(trip_id, None, None) for (trip_id,) in trips]
+
+
+trip_search = TripSearch()
@@ -0,0 +1,25 @@
+import argparse
+from datetime import datetime
+
+from app import app
+from city_index import city_index
+from insights import get_destination_insights
+
+parser = argparse.ArgumentParser(description="Pre-generate seasonal trip insights for the most popular cities")
+parser.add_argument("--top", type=int, default=10, help="number of cities, by popularity")
+parser.add_argument("--months", type=int, nargs="*", help="months to warm (default: this month and the next two)")
+parser.add_argument("--refresh", action="store_true", help="regenerate entries that are already stored")
+args = parser.parse_args()
+
+this_month = datetime.utcnow().month
+months = args.months or [(this_month + offset - 1) % 12 + 1 for offset in range(3)]
+cities = city_index.top(args.top)
+
+with app.app_context():
+    for city in cities:
+        for month in months:
+            try:
+                get_destination_insights(city["name"], city["country"], month, refresh=args.refresh)
+                print(f"✅ {city['name']}, {city['country']} ({month})")
+            except Exception as e:
+                print(f"❌ {city['name']}, {city['country']} ({month}): {e}")
@@ -41,7 +41,8 @@ const AIPlanGenerator = ({ user, onLogout }) => {
                     startDate: tripData.startDate,
                     endDate: tripData.endDate,
                     tripName: tripData.tripName,
-                    description: tripData.description
+                    description: tripData.description,
+                    user_id: user?._id
                 })
             });
 
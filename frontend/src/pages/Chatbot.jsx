@@ -6,6 +6,7 @@ const Chatbot = ({ user }) => {
     const [isOpen, setIsOpen] = useState(false);
     const [message, setMessage] = useState('');
     const [history, setHistory] = useState([]);
+    const [sessionId, setSessionId] = useState(null);
     const [loading, setLoading] = useState(false);
     const messagesEndRef = useRef(null);
 
@@ -33,13 +34,15 @@ const Chatbot = ({ user }) => {
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     message: currentMessage,
-                    history: history
+                    session_id: sessionId,
+                    user_id: user?._id
                 })
             });
 
             const data = await response.json();
 
             if (response.ok) {
+                setSessionId(data.session_id);
                 setHistory(prev => [...prev, { role: 'assistant', content: data.response }]);
             } else {
                 setHistory(prev => [...prev, { role: 'assistant', content: "I'm sorry, I'm having trouble connecting to my travel servers. Please try again later." }]);